@@ -1,12 +1,19 @@
 from flask import Flask, redirect, request, url_for, render_template, send_from_directory
 from flask_babel import Babel
 from flask_mail import Mail
-from modules.courses import courses_bp, extract_city, COUNTRY_LABELS
+from modules.courses import (
+    courses_bp, load_course_page, count_course_cards, load_city_facets,
+    page_request_args, next_page_url, CARD_SORTS, LIST_ARGS, COUNTRY_LABELS
+)
 from modules.admin import admin_bp
-from modules.booking import booking_bp
+from modules.booking import booking_bp, booking_assets_bp
 from modules.auth import auth_bp
+from modules.fx import fx_bp
+from modules.db import get_db, init_app as init_db
+from modules.cache import cached_page, conditional_page, catalog_stamp, init_app as init_cache
+from modules.gallery import init_app as init_gallery
+from modules.images import init_app as init_images
 import os
-import sqlite3
 
 # Khởi tạo Mail ở cấp module, để có thể import từ modules khác
 mail = Mail()
@@ -21,6 +28,33 @@ def create_app():
     app = Flask(__name__, template_folder="templates", static_folder="static")
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'change-me')
 
+    # ---------- Cấu hình SQLite connection pool ----------
+    app.config['DATABASE'] = os.environ.get(
+        'DATABASE', os.path.join(app.root_path, "data", "teetimevn_dev.db"))
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 4))
+    app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    app.config['DB_CONN_MAX_LIFETIME'] = int(os.environ.get('DB_CONN_MAX_LIFETIME', 3600))
+    # production | bulk-load | test  (xem DB_PROFILES trong modules/db.py)
+    app.config['DB_PROFILE'] = os.environ.get('DB_PROFILE', 'production')
+    # Tự động chạy migrations (modules/migrations.py) khi khởi động
+    app.config['DB_AUTO_MIGRATE'] = os.environ.get('DB_AUTO_MIGRATE', '1') == '1'
+    init_db(app)
+
+    # ---------- Page cache cho khách chưa đăng nhập ----------
+    # lru (mỗi worker) | file (dùng chung giữa các worker) | none
+    app.config['PAGE_CACHE'] = os.environ.get('PAGE_CACHE', 'lru')
+    app.config['PAGE_CACHE_SIZE'] = int(os.environ.get('PAGE_CACHE_SIZE', 512))
+    if os.environ.get('PAGE_CACHE_DIR'):
+        app.config['PAGE_CACHE_DIR'] = os.environ['PAGE_CACHE_DIR']
+    init_cache(app)
+
+    # ---------- Gallery manifest (bảng course_gallery) ----------
+    # Đồng bộ static/media/<slug>/gallery vào DB khi khởi động
+    app.config['GALLERY_SYNC_ON_START'] = os.environ.get('GALLERY_SYNC_ON_START', '1') == '1'
+    init_gallery(app)
+    # Ảnh responsive (static/media/_derived, data/build_image_derivatives.py)
+    init_images(app)
+
     # ---------- Cấu hình Flask-Mail ----------
     # Ví dụ: nếu bạn dùng Gmail, cần set đúng biến môi trường:
     #   MAIL_USERNAME: địa chỉ Gmail hoặc App Password
@@ -77,6 +111,8 @@ def create_app():
     app.register_blueprint(courses_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(booking_bp)
+    app.register_blueprint(booking_assets_bp)
+    app.register_blueprint(fx_bp)
 
     @app.route("/")
     def root():
@@ -85,6 +121,8 @@ def create_app():
         return redirect(f"/{lang}/")
 
     @app.route("/<lang>/")
+    @conditional_page(catalog_stamp)
+    @cached_page(args=LIST_ARGS, skip_args=('lat', 'lng'))
     def index(lang):
         if lang not in SUPPORTED_URL_LANGS:
             lang = DEFAULT_LANG
@@ -93,84 +131,33 @@ def create_app():
         location = request.args.get('location', type=str)
         rating = request.args.get('rating', type=float)
 
-        db_path = os.path.join(app.root_path, "data", "teetimevn_dev.db")
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        conn = get_db()
 
         seo = conn.execute(
             "SELECT * FROM static_page_i18n WHERE page_id = ? AND lang = ?",
             ('home', lang)
         ).fetchone()
 
-        query = "SELECT DISTINCT gc.id, gc.slug FROM golf_course gc"
-        conds, params = [], []
-
-        if location:
-            query += " JOIN golf_course_i18n gci ON gc.id = gci.course_id"
-            conds.append("gci.address LIKE ?")
-            params.append(f"%{location}%")
-
-        if discount:
-            query += " JOIN course_price cp ON gc.id = cp.course_id"
-            conds.append("(100 - (cp.discount_price_vnd * 100.0 / cp.rack_price_vnd)) >= ?")
-            params.append(discount)
-
-        if rating:
-            query += " JOIN course_evaluation ce ON gc.id = ce.course_id"
-            avg_expr = "(ce.design_layout + ce.turf_maintenance + ce.facilities_services + ce.landscape_environment + ce.playability_access) / 5.0"
-            conds.append(f"{avg_expr} >= ?")
-            params.append(rating)
-
-        if conds:
-            query += " WHERE " + " AND ".join(conds)
-
-        query += " ORDER BY gc.id"
-        rows = conn.execute(query, params).fetchall()
-
-        courses = []
-        for r in rows:
-            text = conn.execute(
-                "SELECT name, address FROM golf_course_i18n WHERE course_id = ? AND lang = ?",
-                (r['id'], lang)
-            ).fetchone()
-
-            avg = conn.execute(
-                "SELECT ROUND((design_layout + turf_maintenance + facilities_services + landscape_environment + playability_access) / 5.0, 1) AS avg_rating FROM course_evaluation WHERE course_id = ?",
-                (r['id'],)
-            ).fetchone()
-
-            if text:
-                courses.append({
-                    'slug': r['slug'],
-                    'name': text['name'],
-                    'address': text['address'],
-                    'avg_rating': avg['avg_rating'] if avg and avg['avg_rating'] else None
-                })
-
-        loc_rows = conn.execute(
-            "SELECT DISTINCT address FROM golf_course_i18n WHERE lang = ?", (lang,)
-        ).fetchall()
-        locations = {
-            extract_city(r['address'], lang)
-            for r in loc_rows if r['address'].strip()
-        }
-
-        conn.close()
+        courses, cursor = load_course_page(
+            conn, lang, discount=discount, location=location, rating=rating,
+            **page_request_args()
+        )
+
         return render_template(
             "index.html",
             lang=lang,
             seo=seo,
             courses=courses,
-            locations=sorted(locations),
+            total=count_course_cards(conn, lang, discount, location, rating),
+            sorts=CARD_SORTS,
+            next_url=next_page_url(lang, cursor),
+            locations=load_city_facets(conn, lang),
             banner=True
         )
 
     @app.route("/sitemap.xml")
     def sitemap():
-        db_path = os.path.join(app.root_path, "data", "teetimevn_dev.db")
-        conn = sqlite3.connect(db_path)
-        rows = conn.execute("SELECT slug FROM golf_course").fetchall()
-        conn.close()
+        rows = get_db().execute("SELECT slug FROM golf_course").fetchall()
 
         slugs = [row[0] for row in rows]
         base = request.url_root.rstrip('/')
@@ -196,15 +183,10 @@ def create_app():
         if lang not in SUPPORTED_URL_LANGS:
             return "⛔ Unsupported language", 400
 
-        db_path = os.path.join(app.root_path, "data", "teetimevn_dev.db")
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-
-        row = conn.execute(
+        row = get_db().execute(
             "SELECT * FROM static_page_i18n WHERE page_id = ? AND lang = ?",
             ("home", lang)
         ).fetchone()
-        conn.close()
 
         if not row:
             return f"⚠️ No SEO record found for lang = '{lang}'"
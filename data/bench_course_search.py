@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+bench_course_search.py
+------------------------------------------------------------
+Benchmark cho course search (/<lang>/courses/search, FTS5 trigram).
+Script copy DB, chạy migrations, seed thêm N sân golf giả lập x 6 ngôn ngữ,
+rồi đo latency của search_courses() cho các câu truy vấn Latin / CJK.
+FAIL (exit 1) nếu p50 của câu tìm theo tên sân vượt --budget-ms; các từ
+khóa phổ biến (khớp hàng nghìn bản dịch) chỉ được báo cáo.
+
+    python data/bench_course_search.py                   # 10k sân
+    python data/bench_course_search.py --courses 50000 --repeat 500
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, connect
+from modules.courses import search_courses
+from modules.migrations import migrate
+
+# Tên / mô tả giả lập: ghép âm tiết ngẫu nhiên để số trigram gần với dữ liệu thật
+SYLLABLES = {
+    'latin': ['an', 'binh', 'chau', 'dao', 'dong', 'giang', 'ha', 'hai', 'hoa', 'hung',
+              'khanh', 'lam', 'linh', 'long', 'minh', 'nam', 'ngoc', 'phong', 'phu',
+              'quang', 'son', 'tam', 'tan', 'thanh', 'thuy', 'tien', 'trung', 'van',
+              'vinh', 'xuan', 'yen', 'bay', 'crest', 'dune', 'glen', 'harbor', 'ridge'],
+    'ja': list('アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン'),
+    'ko': list('가나다라마바사아자차카타파하강남동란린무반봉산선성안양영원정진천탄평한해호'),
+    'zh': list('安宝北滨昌城川大德东峰港海和河湖华江金景京乐林龙南宁平清泉山水松台天湾西祥新阳园云州'),
+}
+SUFFIX = {
+    'vi': 'Sân golf', 'en': 'Golf Club', 'ja': 'ゴルフ場', 'ko': '골프장',
+    'zh-CN': '高尔夫球场', 'zh-TW': '高爾夫球場',
+}
+SCRIPT = {'vi': 'latin', 'en': 'latin', 'ja': 'ja', 'ko': 'ko', 'zh-CN': 'zh', 'zh-TW': 'zh'}
+PLACES = ['Hà Nội', 'Đà Nẵng', 'Hạ Long', 'Phú Quốc', 'Đà Lạt', 'Vũng Tàu', 'Nha Trang', 'Huế']
+DESIGNERS = ['Nicklaus Design', 'Greg Norman', 'Colin Montgomerie', 'Luke Donald',
+             'Robert Trent Jones Jr.', 'IMG Design', 'Schmidt-Curley', 'Nick Faldo']
+
+
+def word(rnd, script):
+    pool = SYLLABLES[script]
+    if script == 'latin':
+        return ''.join(rnd.choice(pool) for _ in range(rnd.randint(1, 2))).title()
+    return ''.join(rnd.choice(pool) for _ in range(rnd.randint(2, 4)))
+
+
+def seed(conn, courses):
+    rnd = random.Random(42)
+    base = conn.execute("SELECT COALESCE(MAX(id), 0) FROM golf_course").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO golf_course (id, slug, lat, lng) VALUES (?, ?, ?, ?)",
+        [(base + i, f'bench-{i}', 10 + rnd.random() * 12, 104 + rnd.random() * 5)
+         for i in range(1, courses + 1)]
+    )
+    rows = []
+    for i in range(1, courses + 1):
+        place, designer = rnd.choice(PLACES), rnd.choice(DESIGNERS)
+        for lang, suffix in SUFFIX.items():
+            script = SCRIPT[lang]
+            name = f"{word(rnd, script)} {word(rnd, script)} {suffix}"
+            overview = ' '.join(word(rnd, script) for _ in range(60)) + f" {place}. {designer}."
+            rows.append((base + i, lang, name, f"{place}, Vietnam", designer, overview))
+    conn.executemany(
+        """INSERT INTO golf_course_i18n
+           (course_id, lang, name, address, designer_name, overview)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        rows
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def queries(conn):
+    """
+    ('lookup', ...) : tìm theo tên sân cụ thể -> phải dưới --budget-ms.
+    ('broad', ...)  : từ khóa phổ biến (tỉnh, designer) khớp hàng nghìn bản
+                      dịch; chỉ một số ứng viên đầu được xếp hạng, chỉ báo cáo.
+    Tên giữ cả 'Sân' / 'Golf' như người dùng gõ: các từ ngắn phổ biến này
+    không được dùng để lọc trước (modules.courses.LOOKUP_TERMS).
+    """
+    out = []
+    for lang in SUFFIX:
+        name = conn.execute(
+            "SELECT name FROM golf_course_i18n WHERE lang = ? AND course_id = "
+            "(SELECT MAX(course_id) FROM golf_course_i18n) - 4711", (lang,)
+        ).fetchone()[0]
+        out.append(('lookup', lang, name.rsplit(' ', 1)[0] if lang in ('vi', 'en')
+                    else name.split(' ')[0] + ' ' + name.split(' ')[1]))
+    out += [('broad', 'vi', 'Phú Quốc'), ('broad', 'en', 'Montgomerie')]
+    return out
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description="FTS5 course search benchmark")
+    ap.add_argument('--db', default=str(DB_PATH), help='DB nguồn (sẽ được copy)')
+    ap.add_argument('--courses', type=int, default=10000)
+    ap.add_argument('--repeat', type=int, default=200)
+    ap.add_argument('--limit', type=int, default=20)
+    ap.add_argument('--budget-ms', type=float, default=1.0, help='ngưỡng p50 (ms)')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / 'search.db'
+        shutil.copyfile(args.db, db_path)
+        conn = connect(db_path, profile='bulk-load')
+        migrate(conn)
+        t0 = time.monotonic()
+        seed(conn, args.courses)
+        total = conn.execute("SELECT COUNT(*) FROM golf_course_i18n").fetchone()[0]
+        print(f"Seeded {args.courses} courses ({total} translations) "
+              f"in {time.monotonic() - t0:.1f}s")
+        conn.close()
+
+        conn = connect(db_path, profile='production')
+        failed = False
+        print(f"{'kind':<7} {'lang':<6} {'query':<24} {'hits':>4} {'p50 ms':>8} {'p99 ms':>8}")
+        for kind, lang, q in queries(conn):
+            hits = len(search_courses(conn, lang, q, args.limit))
+            timings = []
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                search_courses(conn, lang, q, args.limit)
+                timings.append(time.perf_counter() - t)
+            p50, p99 = pct(timings, .5), pct(timings, .99)
+            over = kind == 'lookup' and p50 > args.budget_ms
+            failed |= over
+            print(f"{kind:<7} {lang:<6} {q:<24} {hits:>4} {p50:8.3f} {p99:8.3f}"
+                  f"{'  ❌' if over else ''}")
+        conn.close()
+
+    print("❌ FAIL" if failed else "✅ PASS")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+bench_geo_search.py
+------------------------------------------------------------
+Benchmark cho proximity search (/<lang>/courses/nearby, R*Tree course_geo).
+Với mỗi kích thước (mặc định 10k và 100k sân), script copy DB, chạy
+migrations, seed sân golf giả lập rải khắp Việt Nam, rồi đo latency của
+nearby_courses() tại các điểm ngẫu nhiên, so với quét toàn bảng + haversine.
+FAIL (exit 1) nếu kết quả khác với quét toàn bảng hoặc p50 vượt --budget-ms.
+
+    python data/bench_geo_search.py                       # 10k, 100k sân
+    python data/bench_geo_search.py --sizes 1000,10000 --k 20
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, connect
+from modules.courses import haversine_km, nearby_courses
+from modules.migrations import migrate
+
+# Vùng seed: khung bao lãnh thổ Việt Nam, tập trung quanh vài thành phố lớn
+HOTSPOTS = [(21.03, 105.85), (10.78, 106.70), (16.05, 108.20), (20.86, 106.68),
+            (12.24, 109.19), (10.22, 103.96), (11.94, 108.44)]
+
+
+def random_point(rnd):
+    if rnd.random() < 0.7:
+        lat, lng = rnd.choice(HOTSPOTS)
+        return lat + rnd.gauss(0, 0.4), lng + rnd.gauss(0, 0.4)
+    return 8.5 + rnd.random() * 15, 102.2 + rnd.random() * 7.3
+
+
+def seed(conn, courses):
+    rnd = random.Random(42)
+    base = conn.execute("SELECT COALESCE(MAX(id), 0) FROM golf_course").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO golf_course (id, slug, lat, lng) VALUES (?, ?, ?, ?)",
+        [(base + i, f'geo-{i}', *random_point(rnd)) for i in range(1, courses + 1)]
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def brute_force(points, lat, lng, k):
+    """Quét toàn bộ sân + haversine: baseline và đáp án đúng."""
+    return [cid for _, cid in sorted(
+        (haversine_km(lat, lng, plat, plng), cid) for cid, plat, plng in points
+    )[:k]]
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def run(db_src, courses, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / 'geo.db'
+        shutil.copyfile(db_src, db_path)
+        conn = connect(db_path, profile='bulk-load')
+        migrate(conn)
+        t0 = time.monotonic()
+        seed(conn, courses)
+        total = conn.execute("SELECT COUNT(*) FROM course_geo").fetchone()[0]
+        print(f"\nSeeded {courses} courses ({total} in course_geo) "
+              f"in {time.monotonic() - t0:.1f}s")
+        conn.close()
+
+        conn = connect(db_path, profile='production')
+        points = [tuple(r) for r in conn.execute(
+            "SELECT id, lat, lng FROM golf_course WHERE lat IS NOT NULL AND lng IS NOT NULL")]
+        rnd = random.Random(7)
+        origins = [random_point(rnd) for _ in range(args.repeat)]
+
+        mismatches, rtree_t, scan_t = 0, [], []
+        for lat, lng in origins:
+            t = time.perf_counter()
+            got = [r['id'] for r in nearby_courses(conn, 'en', lat, lng, k=args.k)]
+            rtree_t.append(time.perf_counter() - t)
+
+            t = time.perf_counter()
+            rows = conn.execute(
+                "SELECT id, lat, lng FROM golf_course WHERE lat IS NOT NULL").fetchall()
+            want = brute_force([tuple(r) for r in rows], lat, lng, args.k)
+            scan_t.append(time.perf_counter() - t)
+            mismatches += got != want
+        conn.close()
+
+    p50 = pct(rtree_t, .5)
+    over = p50 > args.budget_ms
+    print(f"{'method':<16} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'R*Tree + bbox':<16} {p50:8.3f} {pct(rtree_t, .99):8.3f}{'  ❌' if over else ''}")
+    print(f"{'full scan':<16} {pct(scan_t, .5):8.3f} {pct(scan_t, .99):8.3f}")
+    if mismatches:
+        print(f"  ❌ {mismatches}/{len(origins)} queries differ from the full scan")
+    return over or mismatches > 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="R*Tree proximity search benchmark")
+    ap.add_argument('--db', default=str(DB_PATH), help='DB nguồn (sẽ được copy)')
+    ap.add_argument('--sizes', default='10000,100000', help='số sân, cách nhau bởi dấu phẩy')
+    ap.add_argument('--repeat', type=int, default=100)
+    ap.add_argument('--k', type=int, default=10)
+    ap.add_argument('--budget-ms', type=float, default=5.0, help='ngưỡng p50 (ms)')
+    args = ap.parse_args()
+
+    failed = False
+    for size in (int(s) for s in args.sizes.split(',')):
+        failed |= run(args.db, size, args)
+
+    print("\n❌ FAIL" if failed else "\n✅ PASS")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
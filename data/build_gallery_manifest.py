@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+build_gallery_manifest.py
+------------------------------------------------------------
+Đồng bộ bảng course_gallery (tên file, dung lượng, kích thước ảnh, mtime)
+với các folder static/media/<slug>/gallery. App tự đồng bộ khi khởi động và
+khi admin lưu sân; chạy script này sau khi chép ảnh vào folder bằng tay.
+
+    python data/build_gallery_manifest.py
+    python data/build_gallery_manifest.py --check   # chỉ so sánh, exit 1 nếu lệch
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, connect
+from modules.gallery import sync_gallery
+from modules.migrations import migrate
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sync the course_gallery manifest")
+    ap.add_argument('--db', default=str(DB_PATH))
+    ap.add_argument('--static', default=str(project_root / 'static'))
+    ap.add_argument('--check', action='store_true',
+                    help='chỉ so sánh course_gallery với các folder gallery')
+    args = ap.parse_args()
+
+    conn = connect(args.db, profile='bulk-load')
+    try:
+        migrate(conn)
+        stale = []
+        for row in conn.execute("SELECT id, slug FROM golf_course ORDER BY id").fetchall():
+            if sync_gallery(conn, args.static, row['id'], row['slug']):
+                stale.append(row['slug'])
+
+        if args.check:
+            conn.rollback()
+            if stale:
+                print(f"❌ {len(stale)} course(s) with a stale gallery manifest: "
+                      f"{', '.join(stale[:20])}")
+                return 1
+            print("✅ course_gallery is up to date")
+            return 0
+
+        conn.commit()
+        total = conn.execute("SELECT COUNT(*) FROM course_gallery").fetchone()[0]
+        print(f"✅ Synced {len(stale)} course gallery(ies), {total} image(s) in the manifest")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+build_image_derivatives.py
+------------------------------------------------------------
+Tạo ảnh responsive (320/640/1280px, AVIF nếu Pillow hỗ trợ, WebP, JPEG)
+cho ảnh đại diện sân, gallery và ảnh review trong static/media, vào
+static/media/_derived kèm manifest.json mà template dùng để render srcset.
+Chỉ encode ảnh mới hoặc đã đổi nội dung (theo SHA-256); chạy lại sau khi
+thêm ảnh, hoặc định kỳ cho ảnh review mới upload.
+
+    python data/build_image_derivatives.py
+    python data/build_image_derivatives.py --jobs 4 --force   # encode lại tất cả
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.images import build_derivatives
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build responsive image derivatives")
+    ap.add_argument('--static', default=str(project_root / 'static'))
+    ap.add_argument('--jobs', type=int, default=None, help='số process (mặc định: số CPU)')
+    ap.add_argument('--force', action='store_true', help='encode lại mọi ảnh')
+    ap.add_argument('--no-prune', action='store_true',
+                    help='giữ lại file derivative không còn ảnh gốc')
+    args = ap.parse_args()
+
+    t0 = time.monotonic()
+    sources, encoded, failed = build_derivatives(
+        args.static, jobs=args.jobs, force=args.force, prune=not args.no_prune)
+    print(f"{'❌' if failed else '✅'} {sources} image(s) in the manifest, "
+          f"{encoded} derivative file(s) encoded, {failed} failed in {time.monotonic() - t0:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
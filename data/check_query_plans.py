@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+check_query_plans.py
+------------------------------------------------------------
+EXPLAIN QUERY PLAN regression check cho mọi câu SQL trong app.py và
+modules/*.py.
+
+- Câu SQL tĩnh (chuỗi literal truyền vào .execute()) được trích tự động
+  bằng AST, nên câu mới thêm vào cũng được kiểm tra.
+- Câu SQL ghép động (query += ..., f-string) phải được đăng ký trong
+  DYNAMIC_QUERIES theo (file, function) bằng driver gọi chính hàm đó; câu
+  SQL thật được ghi lại lúc chạy. FAIL nếu call site động chưa đăng ký,
+  không được driver nào chạy tới, hoặc đăng ký không còn call site động.
+
+Script tạo một bản sao DB, chạy migrations, seed dữ liệu lớn cho các bảng
+nóng, ANALYZE, rồi FAIL (exit 1) nếu có câu nào SCAN toàn bộ một bảng lớn
+thay vì SEARCH qua index. Các scan có chủ đích (thống kê admin, ...) nằm
+trong ALLOWED_SCANS kèm lý do.
+
+    python data/check_query_plans.py
+    python data/check_query_plans.py --verbose     # in plan của mọi câu
+"""
+
+import argparse
+import ast
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from flask import g
+
+from modules.db import DB_PATH, connect, profile_pragmas
+from modules.courses import (
+    CARD_SORTS, REVIEW_SORTS, count_course_cards, encode_cursor, helpful_review_ids,
+    load_course_cards, load_course_page, load_reviews_page, lookup_courses, nearby_courses,
+    refresh_cities, search_courses,
+)
+from modules.gallery import sync_gallery
+from modules.migrations import migrate
+from modules.teesheet import DEFAULT_TEMPLATE, template_times
+
+# Các file có SQL chạy trong request
+SOURCE_FILES = ['app.py'] + sorted(
+    f'modules/{p.name}' for p in (project_root / 'modules').glob('*.py')
+    if p.name not in ('__init__.py', 'db.py', 'migrations.py')
+)
+
+LARGE_TABLES = {'bookings', 'reviews', 'review_helpful', 'golf_course_i18n', 'course_card',
+                'tee_slot_inventory'}
+
+# Câu SQL ghép động: (file, function) -> các driver gọi CHÍNH hàm đó của
+# modules/ với tham số đại diện (mọi mode của CARD_SORTS / REVIEW_SORTS, có và
+# không có cursor / filter). Câu SQL được ghi lại lúc chạy trên một
+# RecordingConnection, nên checker luôn thấy đúng câu mà code đang sinh ra.
+# Mỗi driver có dạng driver(db, env); env chứa app Flask, id mẫu, thư mục tạm.
+CURSOR = encode_cursor(1, 1)
+ORIGIN = (10.8, 106.7)
+FILTERS = [{}, {'location': 'City 1', 'discount': 10, 'rating': 3}]
+
+
+def admin_view(endpoint, method='GET', query='', form=None, id_of=None):
+    """Driver gọi thẳng một view admin (bỏ qua check đăng nhập)."""
+    def drive(db, env):
+        app = env['app']
+        view_args = {'lang': 'en'}
+        if id_of:
+            view_args['id'] = env['ids'][id_of]
+        data = {k: v.format(**env['ids']) if isinstance(v, str) else v
+                for k, v in (form or {}).items()}
+        with app.test_request_context(f'/en/admin/?{query}', method=method, data=data):
+            g.db = db
+            try:
+                app.view_functions[endpoint](**view_args)
+            finally:
+                g.pop('db', None)
+    return drive
+
+
+def sync_stale_gallery(db, env):
+    """sync_gallery() với một ảnh đã bị xóa khỏi đĩa => DELETE ... IN (...)."""
+    course_id = env['ids']['golf_course']
+    db.execute("INSERT OR REPLACE INTO course_gallery (course_id, file_name, size_bytes, mtime_ns)"
+               " VALUES (?, 'gone.jpg', 1, 1)", (course_id,))
+    sync_gallery(db, env['tmp'], course_id, 'no-such-course')
+
+
+DYNAMIC_QUERIES = {
+    ('modules/courses.py', 'load_course_cards'): [
+        lambda db, env, order_by=order_by, f=f: load_course_cards(db, 'en', order_by=order_by, **f)
+        for order_by in ('id', 'name') for f in FILTERS
+    ],
+    ('modules/courses.py', 'load_course_page'): [
+        lambda db, env, sort=sort, after=after, f=f: load_course_page(
+            db, 'en', sort=sort, after=after, origin=ORIGIN, **f)
+        for sort in (None, *CARD_SORTS) for after in (None, CURSOR) for f in FILTERS
+    ],
+    ('modules/courses.py', 'count_course_cards'): [
+        lambda db, env, f=f: count_course_cards(db, 'en', **f) for f in FILTERS
+    ],
+    ('modules/courses.py', 'nearby_courses'): [
+        lambda db, env: nearby_courses(db, 'en', *ORIGIN, k=3),
+    ],
+    ('modules/courses.py', 'load_reviews_page'): [
+        lambda db, env, sort=sort, after=after: load_reviews_page(
+            db, env['ids']['golf_course'], sort=sort, after=after)
+        for sort in REVIEW_SORTS for after in (None, CURSOR)
+    ],
+    ('modules/courses.py', 'helpful_review_ids'): [
+        lambda db, env: helpful_review_ids(db, 1, [1, 2, 3]),
+    ],
+    ('modules/courses.py', 'refresh_cities'): [
+        lambda db, env: refresh_cities(db),
+    ],
+    # Tên / địa chỉ (course_lookup), chỉ có trong overview (course_search), 1-2 ký tự (LIKE)
+    ('modules/courses.py', 'lookup_courses'): [
+        lambda db, env: lookup_courses(db, ['Seed', 'City'], 120),
+    ],
+    ('modules/courses.py', 'search_courses'): [
+        lambda db, env, q=q: search_courses(db, 'en', q) for q in ('Seed', 'fairway', 'Se')
+    ],
+    ('modules/gallery.py', 'sync_gallery'): [sync_stale_gallery],
+    ('modules/admin.py', 'booking_list'): [
+        admin_view('admin.booking_list'),
+        admin_view('admin.booking_list', query='status=pending&date=2025-01-02&course_id=1'),
+    ],
+    ('modules/admin.py', 'review_list'): [
+        admin_view('admin.review_list'),
+        admin_view('admin.review_list', query='course_id=1&rating=5&q=seed'),
+    ],
+    ('modules/admin.py', 'i18n_edit'): [
+        admin_view('admin.i18n_edit', 'POST', form={'course_id': '{i18n_course}', 'lang': '{i18n_lang}', 'name': 'Seed'},
+                   id_of='golf_course_i18n'),
+    ],
+    ('modules/admin.py', 'fx_edit'): [
+        admin_view('admin.fx_edit', 'POST', id_of='fx_rate',
+                   form={'rate_date': '2025-01-01', 'currency': 'USD', 'rate_to_vnd': '25000'}),
+    ],
+    ('modules/admin.py', 'price_create'): [
+        admin_view('admin.price_create', 'POST',
+                   form={'course_id': '{golf_course}', 'tier_type': 'weekday',
+                         'rack_price_vnd': '1000000'}),
+    ],
+    ('modules/admin.py', 'price_edit'): [
+        admin_view('admin.price_edit', 'POST', id_of='course_price',
+                   form={'course_id': '{golf_course}', 'tier_type': 'weekday',
+                         'rack_price_vnd': '1000000'}),
+    ],
+    ('modules/admin.py', 'evaluation_edit'): [
+        admin_view('admin.evaluation_edit', 'POST', id_of='course_evaluation',
+                   form={'course_id': '{evaluation_course}', 'design_layout': '8'}),
+    ],
+    ('modules/admin.py', 'review_bulk_action'): [
+        admin_view('admin.review_bulk_action', 'POST',
+                   form={'action': 'delete', 'review_ids[]': ['999999991', '999999992']}),
+    ],
+}
+
+# Scan có chủ đích: (file, function, table) -> lý do
+ALLOWED_SCANS = {
+    ('modules/admin.py', 'dashboard', 'bookings'):
+        'dashboard totals / monthly revenue aggregate the whole table',
+    ('modules/admin.py', 'booking_list', 'bookings'):
+        'admin list shows every booking (filters are optional)',
+    ('modules/admin.py', 'review_list', 'reviews'):
+        'admin list / stats cover every review (filters are optional)',
+    ('modules/courses.py', 'rebuild_course_cards', 'course_card'):
+        'offline rebuild rewrites / counts every card',
+    ('modules/courses.py', 'rebuild_review_stats', 'reviews'):
+        'offline rebuild aggregates every review',
+    ('modules/courses.py', 'refresh_cities', 'golf_course_i18n'):
+        'walks the partial index idx_i18n_city_pending (rows with city NULL only)',
+    ('modules/courses.py', 'search_courses', 'golf_course_i18n'):
+        'LIKE fallback only for 1-2 character queries the trigram index cannot match',
+    ('modules/admin.py', 'i18n_list', 'golf_course_i18n'):
+        'admin translation list shows every row',
+}
+
+
+class RecordingConnection(sqlite3.Connection):
+    """Ghi lại (file, function, dòng, sql, params) của mọi execute() từ code trong repo."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    def _record(self, sql, params):
+        frame = sys._getframe(2)
+        try:
+            path = Path(frame.f_code.co_filename).resolve().relative_to(project_root)
+        except ValueError:
+            return
+        self.calls.append((path.as_posix(), frame.f_code.co_name, frame.f_lineno, sql, params))
+
+    def execute(self, sql, params=()):
+        self._record(sql, params)
+        return super().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        self._record(sql, seq_of_params[0] if seq_of_params else ())
+        return super().executemany(sql, seq_of_params)
+
+
+def recording_connection(db_path):
+    conn = sqlite3.connect(str(db_path), factory=RecordingConnection)
+    conn.row_factory = sqlite3.Row
+    for name, value in profile_pragmas('test'):
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def flask_app(db_path):
+    """App dùng DB tạm, cho các driver gọi view admin."""
+    os.environ.update({
+        'DATABASE': str(db_path), 'DB_PROFILE': 'test', 'DB_AUTO_MIGRATE': '0',
+        'PAGE_CACHE': 'none', 'GALLERY_SYNC_ON_START': '0',
+    })
+    from app import create_app
+    return create_app()
+
+
+def extract_statements(path):
+    """Yield (function, lineno, sql | None) for every .execute() call site."""
+    tree = ast.parse((project_root / path).read_text(encoding='utf-8'))
+    parents = {}
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+
+    def enclosing_function(node):
+        while node in parents:
+            node = parents[node]
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                return node.name
+        return '<module>'
+
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ('execute', 'executemany') and node.args):
+            arg = node.args[0]
+            sql = arg.value if isinstance(arg, ast.Constant) and isinstance(arg.value, str) else None
+            yield enclosing_function(node), node.lineno, sql
+
+
+def table_aliases(sql):
+    """Map alias/table name -> table name from FROM/JOIN/UPDATE clauses."""
+    aliases = {}
+    pattern = r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?'
+    for table, alias in re.findall(pattern, sql, flags=re.I):
+        aliases[table] = table
+        if alias and alias.upper() not in ('ON', 'WHERE', 'SET', 'JOIN', 'LEFT',
+                                           'INNER', 'ORDER', 'GROUP', 'LIMIT',
+                                           'VALUES', 'USING', 'AS'):
+            aliases[alias] = table
+    return aliases
+
+
+def explain(conn, sql, params=None):
+    if params is None:
+        params = [1] * sql.count('?')
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def full_scans(sql, plan, large_tables):
+    aliases = table_aliases(sql)
+    scans = []
+    for detail in plan:
+        m = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+        if m and aliases.get(m.group(1), m.group(1)) in large_tables:
+            scans.append((aliases.get(m.group(1), m.group(1)), detail))
+    return scans
+
+
+def seed(conn, courses=2000, users=2000, bookings=50000, reviews=30000):
+    """Dữ liệu tổng hợp để planner thấy các bảng nóng là bảng lớn."""
+    langs = ['vi', 'en', 'ja', 'ko', 'zh-CN', 'zh-TW']
+    base = conn.execute("SELECT COALESCE(MAX(id), 0) FROM golf_course").fetchone()[0]
+    ubase = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO golf_course (id, slug, lat, lng) VALUES (?, ?, ?, ?)",
+        [(base + i, f'seed-course-{i}', 10 + i % 12, 104 + i % 5) for i in range(1, courses + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO golf_course_i18n (course_id, lang, name, address) VALUES (?, ?, ?, ?)",
+        [(base + i, lang, f'Seed {i}', f'District {i % 50}, City {i % 40}, Vietnam')
+         for i in range(1, courses + 1) for lang in langs]
+    )
+    refresh_cities(conn)
+    conn.executemany(
+        "INSERT INTO course_price (course_id, tier_type, rack_price_vnd, discount_price_vnd, discount_note) "
+        "VALUES (?, ?, 2000000, 1800000, '-10%')",
+        [(base + i, t) for i in range(1, courses + 1) for t in ('weekday', 'weekend', 'twilight')]
+    )
+    conn.executemany(
+        "INSERT INTO users (id, email, username, password_hash) VALUES (?, ?, ?, 'x')",
+        [(ubase + i, f'seed{i}@example.com', f'seed{i}') for i in range(1, users + 1)]
+    )
+    statuses = ['pending', 'confirmed', 'completed', 'cancelled']
+    conn.executemany(
+        """INSERT INTO bookings (user_id, course_id, play_date, play_time, players,
+                                 green_fee, services_fee, insurance_fee, total_amount, status)
+           VALUES (?, ?, date('2025-01-01', ?), '07:00', 2, 1, 0, 0, 1, ?)""",
+        [(ubase + 1 + i % users, base + 1 + i % courses, f'+{i % 365} day', statuses[i % 4])
+         for i in range(bookings)]
+    )
+    conn.executemany(
+        "INSERT INTO tee_slot_inventory (course_id, play_date, tee_time, capacity, booked) "
+        "VALUES (?, date('2025-01-01', ?), ?, 4, ?)",
+        [(base + 1 + i, f'+{d} day', t, d % 5)
+         for i in range(courses // 10) for d in range(30) for t in template_times(DEFAULT_TEMPLATE)]
+    )
+    conn.executemany(
+        "INSERT INTO reviews (course_id, user_id, rating, comment, created_at) "
+        "VALUES (?, ?, ?, 'seed', datetime('2025-01-01', ?))",
+        [(base + 1 + i % courses, ubase + 1 + (i * 7) % users, 1 + i % 5, f'+{i} minutes')
+         for i in range(reviews)]
+    )
+    first_review = conn.execute("SELECT MIN(id) FROM reviews WHERE comment='seed'").fetchone()[0]
+    conn.executemany(
+        "INSERT OR IGNORE INTO review_helpful (review_id, user_id) VALUES (?, ?)",
+        [(first_review + i % reviews, ubase + 1 + (i * 13) % users) for i in range(reviews * 2)]
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN regression check")
+    ap.add_argument('--db', default=str(DB_PATH), help='DB nguồn (sẽ được copy)')
+    ap.add_argument('--verbose', '-v', action='store_true')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / 'plans.db'
+        shutil.copyfile(args.db, db_path)
+        conn = connect(db_path, profile='test')
+        migrate(conn)
+        seed(conn)
+
+        failures, checked, unregistered = [], 0, []
+
+        def check(path, func, lineno, stmt, params=None):
+            nonlocal checked
+            if re.match(r'\s*(PRAGMA|BEGIN|COMMIT|ROLLBACK|CREATE|DROP|ANALYZE)', stmt, re.I):
+                return
+            checked += 1
+            try:
+                plan = explain(conn, stmt, params)
+            except sqlite3.Error as e:
+                failures.append(f"{path}:{lineno} ({func}) cannot EXPLAIN: {e}")
+                return
+            if args.verbose:
+                print(f"{path}:{lineno} ({func})")
+                for detail in plan:
+                    print(f"    {detail}")
+            for table, detail in full_scans(stmt, plan, LARGE_TABLES):
+                if (path, func, table) in ALLOWED_SCANS:
+                    continue
+                failures.append(f"{path}:{lineno} ({func}) full scan: {detail}")
+
+        # Câu tĩnh: lấy thẳng từ AST; call site động: (file, function) -> dòng
+        dynamic_sites = {}
+        for path in SOURCE_FILES:
+            for func, lineno, sql in extract_statements(path):
+                if sql is not None:
+                    check(path, func, lineno, sql)
+                elif (path, func) in DYNAMIC_QUERIES:
+                    dynamic_sites.setdefault((path, func), set()).add(lineno)
+                else:
+                    unregistered.append(f"{path}:{lineno} ({func})")
+
+        # Câu động: chạy driver, EXPLAIN đúng câu SQL (và params) đã ghi lại
+        env = {
+            'app': flask_app(db_path),
+            'tmp': tmp,
+            'ids': {t: conn.execute(f"SELECT MIN(id) FROM {t}").fetchone()[0]
+                    for t in ('golf_course', 'golf_course_i18n', 'fx_rate',
+                              'course_price', 'course_evaluation')},
+        }
+        # Form sửa một dòng giữ nguyên khóa UNIQUE của chính dòng đó
+        env['ids']['evaluation_course'] = conn.execute(
+            "SELECT course_id FROM course_evaluation WHERE id = ?",
+            (env['ids']['course_evaluation'],)).fetchone()[0]
+        env['ids']['i18n_course'], env['ids']['i18n_lang'] = conn.execute(
+            "SELECT course_id, lang FROM golf_course_i18n WHERE id = ?",
+            (env['ids']['golf_course_i18n'],)).fetchone()
+        rec = recording_connection(db_path)
+        for (path, func), drivers in DYNAMIC_QUERIES.items():
+            lines = dynamic_sites.get((path, func))
+            if not lines:
+                failures.append(f"{path} ({func}) registered in DYNAMIC_QUERIES "
+                                f"but has no dynamic call site")
+                continue
+            reached, seen = set(), set()
+            for driver in drivers:
+                rec.calls.clear()
+                try:
+                    driver(rec, env)
+                except Exception as e:
+                    failures.append(f"{path} ({func}) driver failed: {e!r}")
+                if rec.in_transaction:
+                    rec.rollback()
+                for call_path, call_func, lineno, stmt, params in rec.calls:
+                    if (call_path, call_func) != (path, func) or lineno not in lines:
+                        continue
+                    reached.add(lineno)
+                    if stmt not in seen:
+                        seen.add(stmt)
+                        check(path, func, lineno, stmt, params)
+            for lineno in sorted(lines - reached):
+                failures.append(f"{path}:{lineno} ({func}) dynamic SQL not reached "
+                                f"by its DYNAMIC_QUERIES drivers")
+        rec.close()
+        conn.close()
+
+    print(f"🔎 Checked {checked} statements in {len(SOURCE_FILES)} files")
+    for site in unregistered:
+        print(f"  ❓ dynamic SQL not registered in DYNAMIC_QUERIES: {site}")
+    for f in failures:
+        print(f"  ❌ {f}")
+    if failures or unregistered:
+        print("❌ FAIL")
+        return 1
+    print("✅ PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
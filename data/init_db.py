@@ -1,39 +1,27 @@
 # file: init_db.py
 from pathlib import Path
 import sqlite3
+import sys
 from werkzeug.security import generate_password_hash
 
-# Đường dẫn tới file SQLite DB (thư mục "data" sẽ nằm cùng cấp với file này)
-DB_PATH = Path("data/teetimevn_dev.db")
+# Dùng chung cấu hình PRAGMA (profile) với app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from modules.db import DB_PATH, connect
+from modules.migrations import migrate
 
 def init_db():
-    # 1. Định nghĩa SQL tạo bảng users (nếu chưa tồn tại)
-    sql_create = """
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        email TEXT NOT NULL UNIQUE,
-        phone TEXT,
-        username TEXT NOT NULL UNIQUE,
-        password_hash TEXT NOT NULL,
-        role TEXT NOT NULL DEFAULT 'user',
-        fullname TEXT,
-        created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-        updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
-    );
-    """
-
-    # 2. Kết nối và tạo bảng
-    conn = sqlite3.connect(DB_PATH)
+    # 1. Tạo / cập nhật schema bằng migration runner (bao gồm bảng users)
+    conn = connect(DB_PATH, profile='production')
     try:
-        conn.execute(sql_create)
-        conn.commit()
-        print("Đã tạo hoặc kiểm tra thành công bảng 'users'.")
+        for version, name in migrate(conn):
+            print(f"Đã áp dụng migration {version:03d}: {name}")
+        print("Đã tạo hoặc kiểm tra thành công schema (bảng 'users').")
     except sqlite3.Error as e:
-        print(f"Lỗi khi tạo bảng users: {e}")
+        print(f"Lỗi khi chạy migrations: {e}")
         conn.close()
         return
 
-    # 3. Chuẩn bị chèn 2 tài khoản mẫu (Admin và User)
+    # 2. Chuẩn bị chèn 2 tài khoản mẫu (Admin và User)
     try:
         # Tạo hash cho 2 mật khẩu
         admin_plain  = "admin123"
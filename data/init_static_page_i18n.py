@@ -1,12 +1,13 @@
-import sqlite3
+import sys
 from pathlib import Path
 
-# Đường dẫn đến database
-DB_PATH = Path(__file__).resolve().parent / "teetimevn_dev.db"
+# Dùng chung cấu hình PRAGMA (profile) với app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from modules.db import DB_PATH, connect
 
 
 def create_and_insert_static_page_seo():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH, profile='production')
     cursor = conn.cursor()
 
     # Tạo bảng nếu chưa có
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+migrate.py
+------------------------------------------------------------
+Chạy các schema migration trong modules/migrations.py (thay cho các script
+create_*.py chạy tay trước đây). An toàn khi chạy nhiều lần.
+
+    python data/migrate.py               # áp dụng tất cả migration còn thiếu
+    python data/migrate.py --status      # xem version hiện tại
+    python data/migrate.py --target 2    # chỉ áp dụng tới version 2
+    python data/migrate.py --profile bulk-load   # DB offline (synchronous=OFF)
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, DB_PROFILES, connect
+from modules.migrations import MIGRATIONS, current_version, migrate, pending_migrations
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Apply schema migrations")
+    ap.add_argument('--db', default=str(DB_PATH))
+    ap.add_argument('--profile', default='production', choices=list(DB_PROFILES))
+    ap.add_argument('--target', type=int, default=None)
+    ap.add_argument('--status', action='store_true')
+    args = ap.parse_args()
+
+    conn = connect(args.db, profile=args.profile)
+    try:
+        if args.status:
+            print(f"📁 Database: {args.db}")
+            print(f"📌 Schema version: {current_version(conn)} "
+                  f"(latest {max(m[0] for m in MIGRATIONS)})")
+            for version, name, _ in pending_migrations(conn):
+                print(f"  ⏳ pending {version:03d}: {name}")
+            return 0
+
+        applied = migrate(conn, target=args.target, log=lambda m: print(f"✅ {m}"))
+        if not applied:
+            print("✨ Schema đã ở version mới nhất.")
+        print(f"📌 Schema version: {current_version(conn)}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+open_tee_sheets.py
+------------------------------------------------------------
+Mở trước tee_slot_inventory cho N ngày tới của mọi sân, và dựng lại các ngày
+đã mở từ tee_sheet_template / tee_sheet_blackout / bookings hiện tại. Chạy sau
+khi sửa template hoặc blackout của một sân (app chỉ tự mở một ngày khi có
+người book ngày đó).
+
+    python data/open_tee_sheets.py --days 60
+    python data/open_tee_sheets.py --check     # chỉ so sánh, exit 1 nếu lệch
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, connect
+from modules.migrations import migrate
+from modules.teesheet import open_day, refresh_day
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Open and re-sync the tee sheet inventory")
+    ap.add_argument('--db', default=str(DB_PATH))
+    ap.add_argument('--days', type=int, default=30, help='số ngày mở trước, tính từ hôm nay')
+    ap.add_argument('--check', action='store_true',
+                    help='chỉ so sánh các ngày đã mở với template + bookings')
+    args = ap.parse_args()
+
+    conn = connect(args.db, profile='production')
+    try:
+        migrate(conn)
+        today = date.today().isoformat()
+        course_ids = [r['id'] for r in conn.execute("SELECT id FROM golf_course ORDER BY id")]
+
+        # Các ngày đã mở từ hôm nay trở đi
+        open_days = conn.execute("""
+            SELECT DISTINCT course_id, play_date FROM tee_slot_inventory
+            WHERE play_date >= ? ORDER BY course_id, play_date
+        """, (today,)).fetchall()
+        stale = 0
+        for row in open_days:
+            if refresh_day(conn, row['course_id'], row['play_date']):
+                stale += 1
+
+        if args.check:
+            conn.rollback()
+            if stale:
+                print(f"❌ {stale} open tee sheet day(s) out of sync with template/bookings")
+                return 1
+            print(f"✅ {len(open_days)} open tee sheet day(s) are up to date")
+            return 0
+
+        opened = 0
+        for course_id in course_ids:
+            for offset in range(args.days):
+                play_date = (date.today() + timedelta(days=offset)).isoformat()
+                opened += open_day(conn, course_id, play_date)
+        conn.commit()
+        print(f"✅ Re-synced {stale} day(s), opened {opened} new day(s) "
+              f"for {len(course_ids)} course(s)")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+rebuild_course_cards.py
+------------------------------------------------------------
+Build lại bảng course_card (card đã resolve ngôn ngữ cho trang list/home)
+từ view course_card_source. Bình thường trigger giữ bảng luôn đúng; chạy
+script này sau khi backfill / import dữ liệu trực tiếp hoặc để kiểm tra.
+Script cũng điền city / city_key cho các bản dịch mới hoặc vừa đổi address
+(ví dụ sau khi chạy các script update_address*.py).
+
+    python data/rebuild_course_cards.py
+    python data/rebuild_course_cards.py --check   # chỉ so sánh, exit 1 nếu lệch
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, connect
+from modules.courses import rebuild_course_cards, refresh_cities
+from modules.migrations import migrate
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild the course_card table")
+    ap.add_argument('--db', default=str(DB_PATH))
+    ap.add_argument('--check', action='store_true',
+                    help='chỉ so sánh course_card với course_card_source')
+    args = ap.parse_args()
+
+    conn = connect(args.db, profile='bulk-load')
+    try:
+        migrate(conn)
+        if args.check:
+            stale = conn.execute("""
+                SELECT
+                  (SELECT COUNT(*) FROM (SELECT * FROM course_card_source
+                                         EXCEPT SELECT * FROM course_card))
+                + (SELECT COUNT(*) FROM (SELECT * FROM course_card
+                                         EXCEPT SELECT * FROM course_card_source))
+                """).fetchone()[0]
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM golf_course_i18n WHERE city IS NULL"
+            ).fetchone()[0]
+            if pending:
+                print(f"❌ {pending} translation(s) without city")
+            if stale:
+                print(f"❌ {stale} course_card row(s) out of date")
+            if pending or stale:
+                return 1
+            print("✅ course_card is up to date")
+            return 0
+
+        cities = refresh_cities(conn)
+        if cities:
+            print(f"✅ Extracted city for {cities} translation(s)")
+        count = rebuild_course_cards(conn)
+        print(f"✅ Rebuilt {count} course cards")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
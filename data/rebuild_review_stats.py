@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+rebuild_review_stats.py
+------------------------------------------------------------
+Build lại bảng course_review_stats (số review, tổng điểm, phân bố sao,
+helpful, review mới nhất theo sân) từ view course_review_stats_source.
+Bình thường trigger trên reviews giữ bảng luôn đúng; chạy script này sau
+khi import / sửa reviews trực tiếp hoặc để kiểm tra.
+
+    python data/rebuild_review_stats.py
+    python data/rebuild_review_stats.py --check   # chỉ so sánh, exit 1 nếu lệch
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, connect
+from modules.courses import rebuild_review_stats
+from modules.migrations import migrate
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rebuild the course_review_stats table")
+    ap.add_argument('--db', default=str(DB_PATH))
+    ap.add_argument('--check', action='store_true',
+                    help='chỉ so sánh course_review_stats với course_review_stats_source')
+    args = ap.parse_args()
+
+    conn = connect(args.db, profile='bulk-load')
+    try:
+        migrate(conn)
+        if args.check:
+            stale = conn.execute("""
+                SELECT course_id FROM (
+                    SELECT * FROM course_review_stats_source
+                    EXCEPT SELECT * FROM course_review_stats)
+                UNION
+                SELECT course_id FROM (
+                    SELECT * FROM course_review_stats
+                    EXCEPT SELECT * FROM course_review_stats_source)
+                """).fetchall()
+            if stale:
+                ids = ', '.join(str(r[0]) for r in stale[:20])
+                print(f"❌ {len(stale)} course(s) with stale review stats: {ids}")
+                return 1
+            print("✅ course_review_stats is up to date")
+            return 0
+
+        count = rebuild_review_stats(conn)
+        print(f"✅ Rebuilt review stats for {count} course(s)")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,11 +15,15 @@ script_path  = Path(__file__).resolve()
 project_root = script_path.parent.parent      # nếu script nằm trong thư mục data/
 DB_PATH      = project_root / "data" / "teetimevn_dev.db"
 
+# Dùng chung cấu hình PRAGMA (profile) với app
+sys.path.insert(0, str(project_root))
+from modules.db import connect
+
 if not DB_PATH.exists():
     print(f"❌ Không tìm thấy database tại {DB_PATH}", file=sys.stderr)
     sys.exit(1)
 
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH, profile='bulk-load')
 cur  = conn.cursor()
 
 # 2) Tạo bảng nếu chưa có...
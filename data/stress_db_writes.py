@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+stress_db_writes.py
+------------------------------------------------------------
+Stress test cho DB profile: nhiều process (giống gunicorn workers) cùng ghi
+bookings / reviews / review_helpful trong khi các reader đọc trang course.
+Script chạy trên một BẢN SAO của teetimevn_dev.db và thất bại (exit 1) nếu
+có lỗi "database is locked", không đạt write rate mục tiêu, hoặc có tee time
+bị overbook (bookings giữ chỗ qua modules/teesheet.reserve_slot như app).
+
+    python data/stress_db_writes.py --profile production --writers 4 \
+        --readers 4 --rate 200 --duration 10
+"""
+
+import argparse
+import multiprocessing as mp
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, DB_PROFILES, connect
+from modules.migrations import migrate
+from modules.teesheet import (DEFAULT_TEMPLATE, SlotUnavailable, reservation,
+                              reserve_slot, template_times)
+
+TEE_TIMES = template_times(DEFAULT_TEMPLATE)
+
+
+def is_lock_error(exc):
+    msg = str(exc).lower()
+    return 'locked' in msg or 'busy' in msg
+
+
+def writer(db_path, profile, rate, duration, seed, out):
+    """Ghi với tốc độ `rate` lần/giây; mỗi lần là 1 transaction."""
+    conn = connect(db_path, profile=profile)
+    course_ids = [r[0] for r in conn.execute("SELECT id FROM golf_course")]
+    user_ids = [r[0] for r in conn.execute("SELECT id FROM users")]
+    play_date = (date.today() + timedelta(days=7)).isoformat()
+    done, lock_errors, latencies = 0, 0, []
+    interval = 1.0 / rate
+    start = time.monotonic()
+    n = 0
+    while time.monotonic() - start < duration:
+        n += 1
+        cid = course_ids[(seed + n) % len(course_ids)]
+        uid = user_ids[(seed * 7 + n) % len(user_ids)]
+        t0 = time.monotonic()
+        try:
+            if n % 3 == 0:
+                cur = conn.execute(
+                    "INSERT INTO reviews (course_id, user_id, rating, comment, created_at) "
+                    "VALUES (?, ?, ?, 'stress', datetime('now'))",
+                    (cid, uid, 1 + n % 5)
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO review_helpful (review_id, user_id) VALUES (?, ?)",
+                    (cur.lastrowid, uid)
+                )
+            else:
+                # Slot đầy (SlotUnavailable) vẫn là một transaction hoàn tất
+                tee_time = TEE_TIMES[(seed + n) % len(TEE_TIMES)]
+                try:
+                    with reservation(conn):
+                        reserve_slot(conn, cid, play_date, tee_time, 2)
+                        conn.execute(
+                            """INSERT INTO bookings
+                               (user_id, course_id, play_date, play_time, players,
+                                green_fee, services_fee, insurance_fee, total_amount,
+                                status, created_at)
+                               VALUES (?, ?, ?, ?, 2, 1, 0, 0, 1, 'pending', datetime('now'))""",
+                            (uid, cid, play_date, tee_time)
+                        )
+                except SlotUnavailable:
+                    pass
+            conn.commit()
+            done += 1
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            if not is_lock_error(e):
+                raise
+            lock_errors += 1
+        latencies.append(time.monotonic() - t0)
+        # Giữ đúng nhịp rate mục tiêu
+        sleep_for = start + n * interval - time.monotonic()
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+    conn.close()
+    out.put(('writer', done, lock_errors, latencies))
+
+
+def reader(db_path, profile, duration, out):
+    """Đọc liên tục như trang /courses/<slug>/."""
+    conn = connect(db_path, profile=profile)
+    course_ids = [r[0] for r in conn.execute("SELECT id FROM golf_course")]
+    done, lock_errors, latencies = 0, 0, []
+    start = time.monotonic()
+    while time.monotonic() - start < duration:
+        cid = course_ids[done % len(course_ids)]
+        t0 = time.monotonic()
+        try:
+            conn.execute("SELECT * FROM course_price WHERE course_id=?", (cid,)).fetchall()
+            conn.execute("SELECT COUNT(*), AVG(rating) FROM reviews WHERE course_id=?", (cid,)).fetchone()
+            conn.execute(
+                "SELECT id FROM bookings WHERE course_id=? AND status IN ('confirmed', 'completed') LIMIT 1",
+                (cid,)
+            ).fetchone()
+            done += 1
+        except sqlite3.OperationalError as e:
+            if not is_lock_error(e):
+                raise
+            lock_errors += 1
+        latencies.append(time.monotonic() - t0)
+    conn.close()
+    out.put(('reader', done, lock_errors, latencies))
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--db', default=str(DB_PATH), help='DB nguồn (sẽ được copy)')
+    ap.add_argument('--profile', default='production', choices=list(DB_PROFILES))
+    ap.add_argument('--writers', type=int, default=4)
+    ap.add_argument('--readers', type=int, default=4)
+    ap.add_argument('--rate', type=float, default=200, help='tổng số write/giây mục tiêu')
+    ap.add_argument('--duration', type=float, default=10, help='giây')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / 'stress.db'
+        shutil.copyfile(args.db, db_path)
+        # Áp dụng journal_mode của profile + migrations một lần trước khi fork
+        conn = connect(db_path, profile=args.profile)
+        migrate(conn)
+        conn.close()
+
+        out = mp.Queue()
+        procs = [
+            mp.Process(target=writer, args=(db_path, args.profile,
+                                            args.rate / args.writers,
+                                            args.duration, i, out))
+            for i in range(args.writers)
+        ] + [
+            mp.Process(target=reader, args=(db_path, args.profile, args.duration, out))
+            for _ in range(args.readers)
+        ]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+        # Không slot nào được nhận quá capacity, và booked khớp với bookings
+        conn = connect(db_path)
+        overbooked = conn.execute("""
+            SELECT COUNT(*) FROM tee_slot_inventory i
+            WHERE i.booked > i.capacity
+               OR i.booked != (SELECT COALESCE(SUM(b.players), 0) FROM bookings b
+                               WHERE b.course_id = i.course_id AND b.play_date = i.play_date
+                                 AND b.play_time = i.tee_time AND b.status != 'cancelled')
+        """).fetchone()[0]
+        conn.close()
+
+    totals = {}
+    for kind, done, errors, lat in results:
+        t = totals.setdefault(kind, {'done': 0, 'errors': 0, 'lat': []})
+        t['done'] += done
+        t['errors'] += errors
+        t['lat'] += lat
+
+    print(f"Profile: {args.profile}  writers={args.writers} readers={args.readers} "
+          f"target={args.rate:.0f} w/s  duration={args.duration:.0f}s")
+    for kind, t in totals.items():
+        print(f"  {kind:<7} ops={t['done']:<7} rate={t['done'] / args.duration:8.1f}/s "
+              f"lock_errors={t['errors']:<4} p50={pct(t['lat'], .5):.2f}ms "
+              f"p99={pct(t['lat'], .99):.2f}ms")
+    print(f"  tee slots overbooked or out of sync: {overbooked}")
+
+    w = totals.get('writer', {'done': 0, 'errors': 0})
+    lock_errors = sum(t['errors'] for t in totals.values())
+    achieved = w['done'] / args.duration
+    ok = lock_errors == 0 and achieved >= args.rate * 0.95 and overbooked == 0
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,13 @@
-import sqlite3
+import sys
 from datetime import date
+from pathlib import Path
 
-conn = sqlite3.connect('data/teetimevn_dev.db')
+# Dùng chung cấu hình PRAGMA (profile) với app
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+from modules.db import DB_PATH, connect
+
+conn = connect(DB_PATH, profile='production')
 cursor = conn.cursor()
 
 # 1. Xóa toàn bộ dữ liệu trong fx_rate
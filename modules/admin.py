@@ -1,10 +1,26 @@
 # file: modules/admin.py
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, g, session, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, session, current_app, jsonify
 from flask_babel import _
 import sqlite3, os
 from datetime import datetime
 import json
+from modules.db import get_db, get_pool
+from modules.cache import bump_catalog_version, get_page_cache
+from modules.courses import load_course_cards, refresh_cities
+from modules.gallery import load_gallery, sync_gallery
+from modules.fx import invalidate_fx_cache
+from modules.teesheet import release_slot, reservation, reserve_slot
+
+# Các view admin ghi dữ liệu catalog (sân, bản dịch, giá, đánh giá, review,
+# tỷ giá) mà trang công khai hiển thị; booking không nằm trong cache trang
+CATALOG_ENDPOINTS = frozenset(f'admin.{name}' for name in (
+    'i18n_edit', 'fx_edit',
+    'course_create', 'course_edit', 'course_delete',
+    'price_create', 'price_edit', 'price_delete',
+    'evaluation_edit', 'evaluation_delete',
+    'review_create', 'review_edit', 'delete_review_admin', 'review_bulk_action',
+))
 
 def create_admin_bp():
     bp = Blueprint('admin', __name__, url_prefix='/<lang>/admin')
@@ -23,21 +39,14 @@ def create_admin_bp():
             flash(_("You do not have permission to access the Admin area."), 'warning')
             return redirect(url_for('courses.course_list', lang=lang))
 
-    @bp.before_app_request
-    def before_request():
-        """
-        Mở kết nối DB trước mỗi request (ứng dụng chung cho admin).
-        """
-        from modules.courses import get_db
-        get_db()
-
-    @bp.teardown_app_request
-    def teardown_request(exc):
-        """
-        Đóng kết nối DB sau mỗi request.
-        """
-        from modules.courses import close_db
-        close_db()
+    @bp.after_request
+    def invalidate_page_cache(response):
+        """Thao tác ghi dữ liệu catalog của admin làm mới cache trang công khai"""
+        if (request.method == 'POST' and request.endpoint in CATALOG_ENDPOINTS
+                and response.status_code < 400 and 'db' in g):
+            bump_catalog_version(get_db())
+            get_db().commit()
+        return response
 
     # -----------------------
     # Dashboard
@@ -49,22 +58,22 @@ def create_admin_bp():
         stats = {}
         
         # Tổng số bookings
-        total_bookings = g.db.execute("SELECT COUNT(*) as count FROM bookings").fetchone()
+        total_bookings = get_db().execute("SELECT COUNT(*) as count FROM bookings").fetchone()
         stats['total_bookings'] = total_bookings['count'] if total_bookings else 0
         
         # Tổng số courses
-        total_courses = g.db.execute("SELECT COUNT(*) as count FROM golf_course").fetchone()
+        total_courses = get_db().execute("SELECT COUNT(*) as count FROM golf_course").fetchone()
         stats['total_courses'] = total_courses['count'] if total_courses else 0
         
         # Bookings đang chờ xử lý
-        pending = g.db.execute(
+        pending = get_db().execute(
             "SELECT COUNT(*) as count FROM bookings WHERE status = 'pending'"
         ).fetchone()
         stats['pending_bookings'] = pending['count'] if pending else 0
         
         # Doanh thu tháng này
         current_month = datetime.now().strftime('%Y-%m')
-        revenue = g.db.execute("""
+        revenue = get_db().execute("""
             SELECT SUM(total_amount) as total 
             FROM bookings 
             WHERE strftime('%Y-%m', play_date) = ? 
@@ -73,7 +82,7 @@ def create_admin_bp():
         stats['monthly_revenue'] = revenue['total'] if revenue and revenue['total'] else 0
         
         # Lấy 10 booking gần nhất
-        recent_bookings = g.db.execute("""
+        recent_bookings = get_db().execute("""
             SELECT b.id, b.play_date, b.status,
                    u.username, u.fullname,
                    gci.name as course_name
@@ -104,17 +113,27 @@ def create_admin_bp():
                              monthly_revenue=stats['monthly_revenue'],
                              recent_bookings=formatted_bookings)
 
+    @bp.route('/db-pool/')
+    def db_pool_stats(lang):
+        """Thống kê connection pool SQLite của worker hiện tại (JSON)"""
+        return jsonify(get_pool().stats())
+
+    @bp.route('/page-cache/')
+    def page_cache_stats(lang):
+        """Thống kê page cache (hit/miss) của worker hiện tại (JSON)"""
+        return jsonify(get_page_cache().stats())
+
     # -----------------------
     # I18n routes
     # -----------------------
     @bp.route('/i18n/')
     def i18n_list(lang):
-        rows = g.db.execute('SELECT * FROM golf_course_i18n').fetchall()
+        rows = get_db().execute('SELECT * FROM golf_course_i18n').fetchall()
         return render_template('admin/i18n_list.html', lang=lang, rows=rows)
 
     @bp.route('/i18n/edit/<int:id>/', methods=('GET', 'POST'))
     def i18n_edit(lang, id):
-        row = g.db.execute('SELECT * FROM golf_course_i18n WHERE id=?', (id,)).fetchone()
+        row = get_db().execute('SELECT * FROM golf_course_i18n WHERE id=?', (id,)).fetchone()
         if not row:
             flash(_('Translation not found'), 'warning')
             return redirect(url_for('admin.i18n_list', lang=lang))
@@ -127,11 +146,12 @@ def create_admin_bp():
             ]
             values = [request.form.get(f) for f in fields] + [id]
             set_clause = ', '.join(f"{f}=?" for f in fields)
-            g.db.execute(
+            get_db().execute(
                 f"UPDATE golf_course_i18n SET {set_clause} WHERE id=?",
                 values
             )
-            g.db.commit()
+            refresh_cities(get_db())
+            get_db().commit()
             flash(_('Translation updated'), 'success')
             return redirect(url_for('admin.i18n_list', lang=lang))
 
@@ -142,12 +162,12 @@ def create_admin_bp():
     # -----------------------
     @bp.route('/fx/')
     def fx_list(lang):
-        rows = g.db.execute('SELECT * FROM fx_rate').fetchall()
+        rows = get_db().execute('SELECT * FROM fx_rate').fetchall()
         return render_template('admin/fx_list.html', lang=lang, rows=rows)
 
     @bp.route('/fx/edit/<int:id>/', methods=('GET', 'POST'))
     def fx_edit(lang, id):
-        row = g.db.execute('SELECT * FROM fx_rate WHERE id=?', (id,)).fetchone()
+        row = get_db().execute('SELECT * FROM fx_rate WHERE id=?', (id,)).fetchone()
         if not row:
             flash(_('FX rate not found'), 'warning')
             return redirect(url_for('admin.fx_list', lang=lang))
@@ -156,11 +176,13 @@ def create_admin_bp():
             fields = ['rate_date', 'currency', 'rate_to_vnd', 'source']
             values = [request.form.get(f) for f in fields] + [id]
             set_clause = ', '.join(f"{f}=?" for f in fields)
-            g.db.execute(
+            get_db().execute(
                 f"UPDATE fx_rate SET {set_clause} WHERE id=?",
                 values
             )
-            g.db.commit()
+            get_db().commit()
+            # Các worker khác thấy catalog_version đổi (trigger trên fx_rate)
+            invalidate_fx_cache()
             flash(_('FX rate updated'), 'success')
             return redirect(url_for('admin.fx_list', lang=lang))
 
@@ -171,7 +193,7 @@ def create_admin_bp():
     # -----------------------
     @bp.route('/courses/')
     def course_list(lang):
-        courses = g.db.execute('SELECT * FROM golf_course').fetchall()
+        courses = get_db().execute('SELECT * FROM golf_course').fetchall()
         return render_template('admin/course_list.html', lang=lang, courses=courses)
 
     @bp.route('/courses/create/', methods=('GET', 'POST'))
@@ -190,14 +212,15 @@ def create_admin_bp():
                 request.form.get('scorecard_pdf')
             )
             try:
-                g.db.execute(
+                cur = get_db().execute(
                     """INSERT INTO golf_course
                        (slug, holes, par, length_yards, opened_year,
                         lat, lng, maps_url, scorecard_pdf)
                        VALUES (?,?,?,?,?,?,?,?,?)""",
                     data
                 )
-                g.db.commit()
+                sync_gallery(get_db(), current_app.static_folder, cur.lastrowid, data[0])
+                get_db().commit()
                 flash(_('Course created successfully'), 'success')
                 return redirect(url_for('admin.course_list', lang=lang))
             except sqlite3.IntegrityError as e:
@@ -209,7 +232,7 @@ def create_admin_bp():
 
     @bp.route('/courses/edit/<int:id>/', methods=('GET', 'POST'))
     def course_edit(lang, id):
-        course = g.db.execute('SELECT * FROM golf_course WHERE id=?', (id,)).fetchone()
+        course = get_db().execute('SELECT * FROM golf_course WHERE id=?', (id,)).fetchone()
         if not course:
             flash(_('Course not found'), 'warning')
             return redirect(url_for('admin.course_list', lang=lang))
@@ -228,26 +251,24 @@ def create_admin_bp():
                 id
             )
             try:
-                g.db.execute(
+                get_db().execute(
                     """UPDATE golf_course
                        SET slug=?, holes=?, par=?, length_yards=?, opened_year=?,
                            lat=?, lng=?, maps_url=?, scorecard_pdf=?
                        WHERE id=?""",
                     upd
                 )
-                g.db.commit()
+                sync_gallery(get_db(), current_app.static_folder, id, request.form['slug'])
+                get_db().commit()
                 flash(_('Course updated successfully'), 'success')
                 return redirect(url_for('admin.course_list', lang=lang))
             except sqlite3.IntegrityError as e:
                 flash(_('Error: %(error)s', error=str(e)), 'danger')
 
-        # Lấy danh sách ảnh hiện có trong folder media nếu có
-        folder = os.path.join(current_app.static_folder,
-                              'media', str(course['slug']), 'gallery')
-        existing_images = sorted([
-            f for f in os.listdir(folder)
-            if os.path.splitext(f)[1].lower() in ('.jpg', '.jpeg', '.png', '.gif')
-        ]) if os.path.isdir(folder) else []
+        # Đồng bộ manifest với folder media/<slug>/gallery rồi đọc từ bảng
+        if sync_gallery(get_db(), current_app.static_folder, id, course['slug']):
+            get_db().commit()
+        existing_images = [img['file_name'] for img in load_gallery(get_db(), id)]
 
         return render_template('admin/course_form.html',
                                lang=lang,
@@ -256,8 +277,8 @@ def create_admin_bp():
 
     @bp.route('/courses/delete/<int:id>/', methods=('POST',))
     def course_delete(lang, id):
-        g.db.execute('DELETE FROM golf_course WHERE id=?', (id,))
-        g.db.commit()
+        get_db().execute('DELETE FROM golf_course WHERE id=?', (id,))
+        get_db().commit()
         flash(_('Course deleted'), 'success')
         return redirect(url_for('admin.course_list', lang=lang))
 
@@ -266,59 +287,51 @@ def create_admin_bp():
     # -----------------------
     @bp.route('/prices/')
     def price_list(lang):
-        rows = g.db.execute('SELECT * FROM course_price').fetchall()
+        rows = get_db().execute('SELECT * FROM course_price').fetchall()
         return render_template('admin/price_list.html', lang=lang, rows=rows)
 
     @bp.route('/prices/create/', methods=('GET', 'POST'))
     def price_create(lang):
         if request.method == 'POST':
-            rack = float(request.form.get('rack_price_vnd', 0))
-            discount_note = request.form.get('discount_note', '0%').replace('%', '').replace('-', '')
-            discount_rate = float(discount_note) / 100 if discount_note else 0
-            discount_price = int(rack - rack * discount_rate)
-
-            fields = ['course_id', 'tier_type', 'rack_price_vnd', 'discount_price_vnd',
+            # discount_price_vnd is derived from discount_note by SQLite
+            # (generated effective_price_vnd column + trigger, migration 4)
+            fields = ['course_id', 'tier_type', 'rack_price_vnd',
                       'discount_note', 'inc_caddie', 'inc_cart', 'inc_tax']
             values = [
                 request.form.get('course_id'),
                 request.form.get('tier_type'),
-                rack,
-                discount_price,
+                float(request.form.get('rack_price_vnd', 0)),
                 request.form.get('discount_note'),
                 request.form.get('inc_caddie'),
                 request.form.get('inc_cart'),
                 request.form.get('inc_tax')
             ]
             placeholders = ','.join('?' for _ in fields)
-            g.db.execute(
+            get_db().execute(
                 f"INSERT INTO course_price ({','.join(fields)}) VALUES ({placeholders})",
                 values
             )
-            g.db.commit()
+            get_db().commit()
             flash(_('Price created'), 'success')
             return redirect(url_for('admin.price_list', lang=lang))
         return render_template('admin/price_form.html', lang=lang, row={})
 
     @bp.route('/prices/edit/<int:id>/', methods=('GET', 'POST'))
     def price_edit(lang, id):
-        row = g.db.execute('SELECT * FROM course_price WHERE id=?', (id,)).fetchone()
+        row = get_db().execute('SELECT * FROM course_price WHERE id=?', (id,)).fetchone()
         if not row:
             flash(_('Price not found'), 'warning')
             return redirect(url_for('admin.price_list', lang=lang))
 
         if request.method == 'POST':
-            rack = float(request.form.get('rack_price_vnd', 0))
-            discount_note = request.form.get('discount_note', '0%').replace('%', '').replace('-', '')
-            discount_rate = float(discount_note) / 100 if discount_note else 0
-            discount_price = int(rack - rack * discount_rate)
-
-            fields = ['course_id', 'tier_type', 'rack_price_vnd', 'discount_price_vnd',
+            # discount_price_vnd is derived from discount_note by SQLite
+            # (generated effective_price_vnd column + trigger, migration 4)
+            fields = ['course_id', 'tier_type', 'rack_price_vnd',
                       'discount_note', 'inc_caddie', 'inc_cart', 'inc_tax']
             values = [
                 request.form.get('course_id'),
                 request.form.get('tier_type'),
-                rack,
-                discount_price,
+                float(request.form.get('rack_price_vnd', 0)),
                 request.form.get('discount_note'),
                 request.form.get('inc_caddie'),
                 request.form.get('inc_cart'),
@@ -326,19 +339,19 @@ def create_admin_bp():
                 id
             ]
             set_clause = ', '.join(f"{f}=?" for f in fields)
-            g.db.execute(
+            get_db().execute(
                 f"UPDATE course_price SET {set_clause} WHERE id=?",
                 values
             )
-            g.db.commit()
+            get_db().commit()
             flash(_('Price updated'), 'success')
             return redirect(url_for('admin.price_list', lang=lang))
         return render_template('admin/price_form.html', lang=lang, row=row)
 
     @bp.route('/prices/delete/<int:id>/', methods=('POST',))
     def price_delete(lang, id):
-        g.db.execute('DELETE FROM course_price WHERE id=?', (id,))
-        g.db.commit()
+        get_db().execute('DELETE FROM course_price WHERE id=?', (id,))
+        get_db().commit()
         flash(_('Price deleted'), 'success')
         return redirect(url_for('admin.price_list', lang=lang))
 
@@ -347,14 +360,14 @@ def create_admin_bp():
     # -----------------------
     @bp.route('/evaluations/')
     def evaluation_list(lang):
-        rows = g.db.execute(
+        rows = get_db().execute(
             'SELECT * FROM course_evaluation ORDER BY course_id'
         ).fetchall()
         return render_template('admin/evaluation_list.html', lang=lang, rows=rows)
 
     @bp.route('/evaluations/edit/<int:id>/', methods=('GET', 'POST'))
     def evaluation_edit(lang, id):
-        row = g.db.execute(
+        row = get_db().execute(
             'SELECT * FROM course_evaluation WHERE id=?', (id,)
         ).fetchone()
         if not row:
@@ -372,11 +385,11 @@ def create_admin_bp():
             ]
             values = [request.form.get(f) for f in fields] + [id]
             set_clause = ', '.join(f"{f}=?" for f in fields)
-            g.db.execute(
+            get_db().execute(
                 f"UPDATE course_evaluation SET {set_clause} WHERE id=?",
                 values
             )
-            g.db.commit()
+            get_db().commit()
             flash(_('Evaluation updated'), 'success')
             return redirect(url_for('admin.evaluation_list', lang=lang))
 
@@ -384,8 +397,8 @@ def create_admin_bp():
 
     @bp.route('/evaluations/delete/<int:id>/', methods=('POST',))
     def evaluation_delete(lang, id):
-        g.db.execute('DELETE FROM course_evaluation WHERE id=?', (id,))
-        g.db.commit()
+        get_db().execute('DELETE FROM course_evaluation WHERE id=?', (id,))
+        get_db().commit()
         flash(_('Evaluation deleted'), 'success')
         return redirect(url_for('admin.evaluation_list', lang=lang))
 
@@ -426,18 +439,13 @@ def create_admin_bp():
             
         query += " ORDER BY b.created_at DESC"
         
-        bookings = g.db.execute(query, params).fetchall()
+        bookings = get_db().execute(query, params).fetchall()
         
         # Get courses for filter dropdown
-        courses = g.db.execute("""
-            SELECT gc.id, gci.name 
-            FROM golf_course gc
-            JOIN golf_course_i18n gci ON gc.id = gci.course_id AND gci.lang = ?
-            ORDER BY gci.name
-        """, (lang,)).fetchall()
+        courses = load_course_cards(get_db(), lang, order_by='name')
         
         # Calculate statistics
-        stats = g.db.execute("""
+        stats = get_db().execute("""
             SELECT 
                 COUNT(*) as total,
                 SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending,
@@ -461,7 +469,7 @@ def create_admin_bp():
     @bp.route('/bookings/<int:booking_id>/')
     def booking_detail_admin(lang, booking_id):
         """Xem chi tiết booking cho admin"""
-        booking = g.db.execute("""
+        booking = get_db().execute("""
             SELECT b.*, gc.slug, gc.par, gc.holes, gc.length_yards,
                    gci.name as course_name, gci.address, gci.designer_name,
                    u.username, u.fullname, u.email, u.phone,
@@ -479,7 +487,7 @@ def create_admin_bp():
             return redirect(url_for('admin.booking_list', lang=lang))
         
         # Get status history if exists
-        status_history = g.db.execute("""
+        status_history = get_db().execute("""
             SELECT * FROM booking_status_history 
             WHERE booking_id = ? 
             ORDER BY created_at DESC
@@ -502,7 +510,7 @@ def create_admin_bp():
         
         try:
             # Get current booking
-            booking = g.db.execute("""
+            booking = get_db().execute("""
                 SELECT b.*, u.email, u.fullname, u.username,
                        gci.name as course_name
                 FROM bookings b
@@ -516,23 +524,35 @@ def create_admin_bp():
                 flash(_('Booking not found'), 'warning')
                 return redirect(url_for('admin.booking_list', lang=lang))
             
-            old_status = booking['status']
-            
-            # Update booking status
-            g.db.execute("""
-                UPDATE bookings 
-                SET status = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (new_status, booking_id))
-            
-            # Log status change
-            g.db.execute("""
-                INSERT INTO booking_status_history 
-                (booking_id, old_status, new_status, changed_by, notes, created_at)
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (booking_id, old_status, new_status, session.get('username'), notes))
-            
-            g.db.commit()
+            slot = (booking['course_id'], booking['play_date'],
+                    booking['play_time'], booking['players'])
+
+            with reservation(get_db()):
+                # Đọc lại status sau khi đã giữ write lock
+                old_status = get_db().execute(
+                    "SELECT status FROM bookings WHERE id = ?", (booking_id,)
+                ).fetchone()['status']
+
+                # Cancel trả chỗ về tee sheet, mở lại booking đã cancel thì
+                # giữ chỗ lại (lỗi SlotUnavailable nếu slot đã đầy)
+                if old_status != 'cancelled' and new_status == 'cancelled':
+                    release_slot(get_db(), *slot)
+                elif old_status == 'cancelled' and new_status != 'cancelled':
+                    reserve_slot(get_db(), *slot)
+
+                # Update booking status
+                get_db().execute("""
+                    UPDATE bookings 
+                    SET status = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (new_status, booking_id))
+
+                # Log status change
+                get_db().execute("""
+                    INSERT INTO booking_status_history 
+                    (booking_id, old_status, new_status, changed_by, notes, created_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (booking_id, old_status, new_status, session.get('username'), notes))
             
             # Send email notification to user
             if new_status != old_status:
@@ -541,7 +561,7 @@ def create_admin_bp():
             flash(_('Booking status updated successfully'), 'success')
             
         except Exception as e:
-            g.db.rollback()
+            get_db().rollback()
             flash(_('Error updating booking status: %(error)s', error=str(e)), 'danger')
         
         return redirect(url_for('admin.booking_detail_admin', lang=lang, booking_id=booking_id))
@@ -552,16 +572,16 @@ def create_admin_bp():
         notes = request.form.get('notes', '')
         
         try:
-            g.db.execute("""
+            get_db().execute("""
                 UPDATE bookings 
                 SET notes = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
             """, (notes, booking_id))
-            g.db.commit()
+            get_db().commit()
             
             flash(_('Note added successfully'), 'success')
         except Exception as e:
-            g.db.rollback()
+            get_db().rollback()
             flash(_('Error adding note: %(error)s', error=str(e)), 'danger')
         
         return redirect(url_for('admin.booking_detail_admin', lang=lang, booking_id=booking_id))
@@ -604,7 +624,7 @@ def create_admin_bp():
             
         query += " ORDER BY r.created_at DESC"
         
-        reviews = g.db.execute(query, params).fetchall()
+        reviews = get_db().execute(query, params).fetchall()
         
         # Format reviews
         formatted_reviews = []
@@ -621,24 +641,20 @@ def create_admin_bp():
             formatted_reviews.append(review_dict)
         
         # Get courses for filter
-        courses = g.db.execute("""
-            SELECT gc.id, gci.name 
-            FROM golf_course gc
-            JOIN golf_course_i18n gci ON gc.id = gci.course_id AND gci.lang = ?
-            ORDER BY gci.name
-        """, (lang,)).fetchall()
+        courses = load_course_cards(get_db(), lang, order_by='name')
         
         # Calculate statistics
-        stats = g.db.execute("""
+        # Cộng các dòng course_review_stats (1 dòng / sân) thay vì quét reviews
+        stats = get_db().execute("""
             SELECT 
-                COUNT(*) as total,
-                AVG(rating) as avg_rating,
-                SUM(CASE WHEN rating = 5 THEN 1 ELSE 0 END) as five_star,
-                SUM(CASE WHEN rating = 4 THEN 1 ELSE 0 END) as four_star,
-                SUM(CASE WHEN rating = 3 THEN 1 ELSE 0 END) as three_star,
-                SUM(CASE WHEN rating = 2 THEN 1 ELSE 0 END) as two_star,
-                SUM(CASE WHEN rating = 1 THEN 1 ELSE 0 END) as one_star
-            FROM reviews
+                COALESCE(SUM(review_count), 0) as total,
+                SUM(rating_sum) * 1.0 / SUM(review_count) as avg_rating,
+                SUM(star_5) as five_star,
+                SUM(star_4) as four_star,
+                SUM(star_3) as three_star,
+                SUM(star_2) as two_star,
+                SUM(star_1) as one_star
+            FROM course_review_stats
         """).fetchone()
         
         return render_template('admin/review_list.html',
@@ -669,28 +685,28 @@ def create_admin_bp():
                     return redirect(url_for('admin.review_create', lang=lang))
                 
                 # Insert review
-                g.db.execute("""
-                    INSERT INTO reviews (course_id, user_id, rating, comment, created_at)
-                    VALUES (?, ?, ?, ?, datetime('now'))
-                """, (course_id, user_id, int(rating), comment))
-                g.db.commit()
+                get_db().execute("""
+                    INSERT INTO reviews (course_id, user_id, rating, comment,
+                                         verified_booking, created_at)
+                    VALUES (?, ?, ?, ?,
+                            EXISTS (SELECT 1 FROM bookings
+                                    WHERE user_id = ? AND course_id = ?
+                                    AND status IN ('confirmed', 'completed')),
+                            datetime('now'))
+                """, (course_id, user_id, int(rating), comment, user_id, course_id))
+                get_db().commit()
                 
                 flash(_('Review created successfully'), 'success')
                 return redirect(url_for('admin.review_list', lang=lang))
                 
             except Exception as e:
-                g.db.rollback()
+                get_db().rollback()
                 flash(_('Error creating review: %(error)s', error=str(e)), 'danger')
         
         # GET: Hiển thị form
-        courses = g.db.execute("""
-            SELECT gc.id, gci.name 
-            FROM golf_course gc
-            JOIN golf_course_i18n gci ON gc.id = gci.course_id AND gci.lang = ?
-            ORDER BY gci.name
-        """, (lang,)).fetchall()
+        courses = load_course_cards(get_db(), lang, order_by='name')
         
-        users = g.db.execute("""
+        users = get_db().execute("""
             SELECT id, username, fullname, email 
             FROM users 
             ORDER BY username
@@ -706,7 +722,7 @@ def create_admin_bp():
     def review_edit(lang, review_id):
         """Admin sửa review"""
         # Lấy review hiện tại
-        review = g.db.execute("""
+        review = get_db().execute("""
             SELECT r.*, u.username, u.fullname, gci.name as course_name
             FROM reviews r
             JOIN users u ON r.user_id = u.id
@@ -725,29 +741,24 @@ def create_admin_bp():
                 rating = request.form.get('rating')
                 comment = request.form.get('comment')
                 
-                g.db.execute("""
+                get_db().execute("""
                     UPDATE reviews 
                     SET rating = ?, comment = ?, updated_at = datetime('now')
                     WHERE id = ?
                 """, (int(rating), comment, review_id))
-                g.db.commit()
+                get_db().commit()
                 
                 flash(_('Review updated successfully'), 'success')
                 return redirect(url_for('admin.review_list', lang=lang))
                 
             except Exception as e:
-                g.db.rollback()
+                get_db().rollback()
                 flash(_('Error updating review: %(error)s', error=str(e)), 'danger')
         
         # GET: Hiển thị form với dữ liệu hiện tại
-        courses = g.db.execute("""
-            SELECT gc.id, gci.name 
-            FROM golf_course gc
-            JOIN golf_course_i18n gci ON gc.id = gci.course_id AND gci.lang = ?
-            ORDER BY gci.name
-        """, (lang,)).fetchall()
+        courses = load_course_cards(get_db(), lang, order_by='name')
         
-        users = g.db.execute("""
+        users = get_db().execute("""
             SELECT id, username, fullname, email 
             FROM users 
             ORDER BY username
@@ -772,7 +783,7 @@ def create_admin_bp():
     @bp.route('/reviews/<int:review_id>/delete/', methods=['POST'])
     def delete_review_admin(lang, review_id):
         """Admin xóa review"""
-        review = g.db.execute(
+        review = get_db().execute(
             "SELECT * FROM reviews WHERE id = ?", (review_id,)
         ).fetchone()
         
@@ -792,13 +803,13 @@ def create_admin_bp():
                         pass
             
             # Xóa review và helpful votes
-            g.db.execute("DELETE FROM review_helpful WHERE review_id = ?", (review_id,))
-            g.db.execute("DELETE FROM reviews WHERE id = ?", (review_id,))
-            g.db.commit()
+            get_db().execute("DELETE FROM review_helpful WHERE review_id = ?", (review_id,))
+            get_db().execute("DELETE FROM reviews WHERE id = ?", (review_id,))
+            get_db().commit()
             
             flash(_('Review deleted successfully'), 'success')
         except Exception as e:
-            g.db.rollback()
+            get_db().rollback()
             flash(_('Error deleting review: %(error)s', error=str(e)), 'danger')
         
         return redirect(url_for('admin.review_list', lang=lang))
@@ -806,7 +817,7 @@ def create_admin_bp():
     @bp.route('/reviews/<int:review_id>/')
     def review_detail_admin(lang, review_id):
         """Xem chi tiết review"""
-        review = g.db.execute("""
+        review = get_db().execute("""
             SELECT r.*, 
                    gc.slug, gci.name as course_name, gci.address,
                    u.username, u.fullname, u.email, u.phone,
@@ -834,7 +845,7 @@ def create_admin_bp():
             review_dict['images'] = []
         
         # Get helpful votes
-        helpful_users = g.db.execute("""
+        helpful_users = get_db().execute("""
             SELECT u.username, u.fullname, rh.created_at
             FROM review_helpful rh
             JOIN users u ON rh.user_id = u.id
@@ -861,7 +872,7 @@ def create_admin_bp():
             if action == 'delete':
                 # Xóa nhiều reviews
                 for review_id in review_ids:
-                    review = g.db.execute(
+                    review = get_db().execute(
                         "SELECT images FROM reviews WHERE id = ?", 
                         (review_id,)
                     ).fetchone()
@@ -878,9 +889,9 @@ def create_admin_bp():
                 
                 # Xóa reviews và helpful votes
                 placeholders = ','.join('?' * len(review_ids))
-                g.db.execute(f"DELETE FROM review_helpful WHERE review_id IN ({placeholders})", review_ids)
-                g.db.execute(f"DELETE FROM reviews WHERE id IN ({placeholders})", review_ids)
-                g.db.commit()
+                get_db().execute(f"DELETE FROM review_helpful WHERE review_id IN ({placeholders})", review_ids)
+                get_db().execute(f"DELETE FROM reviews WHERE id IN ({placeholders})", review_ids)
+                get_db().commit()
                 
                 flash(_('%(count)d reviews deleted successfully', count=len(review_ids)), 'success')
                 
@@ -889,7 +900,7 @@ def create_admin_bp():
                 flash(_('Reviews approved'), 'success')
                 
         except Exception as e:
-            g.db.rollback()
+            get_db().rollback()
             flash(_('Error processing bulk action: %(error)s', error=str(e)), 'danger')
         
         return redirect(url_for('admin.review_list', lang=lang))
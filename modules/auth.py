@@ -8,7 +8,7 @@ from flask import (
 )
 from werkzeug.security import generate_password_hash, check_password_hash
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
-from modules.courses import get_db, close_db
+from modules.db import get_db
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/<lang>/auth')
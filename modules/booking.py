@@ -1,13 +1,61 @@
 # modules/booking.py
 
-from flask import Blueprint, render_template, request, flash, redirect, url_for, g, session
+from flask import (Blueprint, render_template, request, flash, redirect, url_for, session,
+                   jsonify, current_app)
 from flask_babel import _
+import hashlib
+import json
 import sqlite3
-from datetime import datetime
-from modules.courses import get_db, close_db
+from datetime import date, datetime
+from modules.db import get_db
+from modules.cache import catalog_stamp
+from modules.courses import load_course_cards
+from modules.teesheet import (DEFAULT_TEMPLATE, SlotUnavailable, load_availability,
+                              month_availability, release_slot, reservation, reserve_slot,
+                              slot_tier, template_times)
 from functools import wraps
 
 booking_bp = Blueprint('booking', __name__, url_prefix='/<lang>/booking')
+# Asset không phụ thuộc ngôn ngữ: một URL cho mọi trang booking
+booking_assets_bp = Blueprint('booking_assets', __name__, url_prefix='/booking')
+
+PRICE_ASSET_MAX_AGE = 365 * 24 * 3600
+
+# (catalog stamp, digest, JSON body) của price-matrix, build lại khi catalog
+# đổi (admin ghi, trigger golf_course.updated_at khi course_price đổi)
+_price_asset = (None, None, None)
+
+
+def price_matrix_asset(db):
+    """
+    (digest, JSON body) của { course_id: { tier: effective_price_vnd } } cho
+    mọi sân. Digest là hash nội dung nên URL chỉ đổi khi giá thật sự đổi.
+    """
+    global _price_asset
+    stamp = catalog_stamp(db)[1]
+    if _price_asset[0] != stamp:
+        matrix = {}
+        for r in db.execute("SELECT course_id, tier_type, effective_price_vnd FROM course_price"):
+            tier = r['tier_type'].lower()  # weekday/weekend/twilight
+            matrix.setdefault(str(r['course_id']), {})[tier] = r['effective_price_vnd'] or 0
+        body = json.dumps(matrix, sort_keys=True, separators=(',', ':')).encode()
+        _price_asset = (stamp, hashlib.sha256(body).hexdigest()[:16], body)
+    return _price_asset[1], _price_asset[2]
+
+
+@booking_assets_bp.route('/prices.<digest>.json')
+def price_matrix(digest):
+    """Price-matrix của trang booking, cache 1 năm (URL đổi khi nội dung đổi)."""
+    current, body = price_matrix_asset(get_db())
+    if digest != current:
+        # Trang cũ tham chiếu bản cũ: chuyển sang bản hiện tại, không cache lâu
+        resp = redirect(url_for('booking_assets.price_matrix', digest=current))
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp
+    resp = current_app.response_class(body, mimetype='application/json')
+    resp.set_etag(current)
+    resp.headers['Cache-Control'] = f'public, max-age={PRICE_ASSET_MAX_AGE}, immutable'
+    return resp.make_conditional(request)
 
 # Import mail từ app
 def send_booking_email(booking_data):
@@ -79,36 +127,16 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-@booking_bp.before_app_request
-def before_request():
-    get_db()
-
-@booking_bp.teardown_app_request
-def teardown_request(exc):
-    close_db()
-
 @booking_bp.route('/', methods=['GET', 'POST'])
 def booking(lang):
-    db = g.db
+    db = get_db()
 
     # 1) Load list of courses (id, name)
-    courses = db.execute(
-        "SELECT gc.id, gci.name FROM golf_course gc "
-        "JOIN golf_course_i18n gci ON gc.id=gci.course_id AND gci.lang=?",
-        (lang,)
-    ).fetchall()
+    courses = load_course_cards(db, lang)
 
-    # 2) Build price‐matrix: { course_id: { weekday:…, weekend:…, twilight:… } }
-    tier_prices_by_course = {}
-    rows = db.execute("SELECT course_id, tier_type, rack_price_vnd, discount_note FROM course_price").fetchall()
-    for r in rows:
-        cid = r['course_id']
-        tier = r['tier_type'].lower()  # weekday/weekend/twilight
-        orig = r['rack_price_vnd'] or 0
-        disc_txt = r['discount_note'] or '0%'
-        disc = float(disc_txt.replace('%','').replace('-',''))/100
-        price = int(orig*(1-disc))
-        tier_prices_by_course.setdefault(cid, {})[tier] = price
+    # 2) Price-matrix { course_id: { weekday:…, weekend:…, twilight:… } } là
+    #    asset JSON riêng (price_matrix_asset), trang chỉ giữ URL có hash
+    prices_url = url_for('booking_assets.price_matrix', digest=price_matrix_asset(db)[0])
 
     # 3) static service prices
     service_prices = {
@@ -118,14 +146,8 @@ def booking(lang):
         'insurance':  100000
     }
 
-    # 4) generate time slots half‐hourly
-    time_slots = []
-    h,m = 5,30
-    while h<18 or (h==18 and m==0):
-        time_slots.append(f"{h:02d}:{m:02d}")
-        m+=30
-        if m==60:
-            m=0; h+=1
+    # 4) tee times mặc định; JS tải tee times + chỗ trống của sân/ngày đã chọn
+    time_slots = template_times(DEFAULT_TEMPLATE)
 
     if request.method=='POST':
         # Kiểm tra login trước khi xử lý POST
@@ -176,20 +198,15 @@ def booking(lang):
             (course_id, lang)
         ).fetchone()
         
-        # Tính toán giá
-        day_of_week = play_datetime.weekday()
-        hour = play_datetime.hour
-        
-        # Xác định tier
-        if hour >= 14:
-            tier = 'twilight'
-        elif day_of_week in [5, 6]:  # Saturday, Sunday
-            tier = 'weekend'
-        else:
-            tier = 'weekday'
+        # Xác định tier: twilight từ TWILIGHT_FROM, weekend thứ 7 / CN
+        tier = slot_tier(play_date, play_time)
         
         # Tính toán chi phí
-        green_fee_unit = tier_prices_by_course.get(int(course_id), {}).get(tier, 0)
+        price = db.execute(
+            "SELECT effective_price_vnd FROM course_price WHERE course_id = ? AND tier_type = ?",
+            (course_id, tier)
+        ).fetchone()
+        green_fee_unit = (price['effective_price_vnd'] or 0) if price else 0
         green_fee = green_fee_unit * players
         
         caddy_fee = service_prices['caddy'] * players if has_caddy else 0
@@ -201,19 +218,21 @@ def booking(lang):
         total_amount = green_fee + services_fee + insurance_fee
         
         try:
-            # Lưu booking vào database
-            cursor = db.execute(
-                """INSERT INTO bookings 
-                   (user_id, course_id, play_date, play_time, players, 
-                    has_caddy, has_cart, has_rent_clubs,
-                    green_fee, services_fee, insurance_fee, total_amount,
-                    status, created_at)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', datetime('now'))""",
-                (user_id, course_id, play_date, play_time, players,
-                 has_caddy, has_cart, has_rent_clubs,
-                 green_fee, services_fee, insurance_fee, total_amount)
-            )
-            db.commit()
+            # Giữ chỗ + lưu booking trong một transaction BEGIN IMMEDIATE:
+            # slot đầy thì không có booking nào được ghi
+            with reservation(db):
+                reserve_slot(db, int(course_id), play_date, play_time, players)
+                cursor = db.execute(
+                    """INSERT INTO bookings 
+                       (user_id, course_id, play_date, play_time, players, 
+                        has_caddy, has_cart, has_rent_clubs,
+                        green_fee, services_fee, insurance_fee, total_amount,
+                        status, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', datetime('now'))""",
+                    (user_id, course_id, play_date, play_time, players,
+                     has_caddy, has_cart, has_rent_clubs,
+                     green_fee, services_fee, insurance_fee, total_amount)
+                )
             booking_id = cursor.lastrowid
             
             # Chuẩn bị dữ liệu để gửi email
@@ -247,7 +266,11 @@ def booking(lang):
             
             # Redirect đến trang booking detail
             return redirect(url_for('booking.booking_detail', lang=lang, booking_id=booking_id))
-                
+
+        except SlotUnavailable:
+            flash(_('This tee time is no longer available for %(players)s player(s). Please choose another time.',
+                    players=players), 'warning')
+            return redirect(url_for('booking.booking', lang=lang))
         except Exception as e:
             db.rollback()
             flash(_('An error occurred while processing your booking. Please try again.'), 'danger')
@@ -258,16 +281,56 @@ def booking(lang):
         'booking.html',
         lang=lang,
         courses=courses,
-        tier_prices_by_course=tier_prices_by_course,
+        prices_url=prices_url,
         service_prices=service_prices,
         time_slots=time_slots,
     )
 
+@booking_bp.route('/availability')
+def availability(lang):
+    """
+    Chỗ trống của một sân (JSON):
+        ?course_id=&date=YYYY-MM-DD   tee times + số chỗ còn lại của ngày đó
+        ?course_id=&month=YYYY-MM     từng ngày trong tháng: số chỗ còn lại,
+                                      tier rẻ nhất còn bán, còn slot twilight
+    """
+    course_id = request.args.get('course_id', type=int)
+    db = get_db()
+    if not course_id or not db.execute(
+            "SELECT 1 FROM golf_course WHERE id = ?", (course_id,)).fetchone():
+        return jsonify({'error': 'course not found'}), 404
+
+    if request.args.get('month'):
+        try:
+            month = datetime.strptime(request.args['month'], '%Y-%m').strftime('%Y-%m')
+        except ValueError:
+            return jsonify({'error': 'month must be YYYY-MM'}), 400
+        payload = {
+            'course_id': course_id,
+            'month': month,
+            'currency': 'VND',
+            'days': month_availability(db, course_id, month),
+        }
+    else:
+        try:
+            play_date = date.fromisoformat(request.args.get('date', '')).isoformat()
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+        payload = {
+            'course_id': course_id,
+            'date': play_date,
+            'slots': load_availability(db, course_id, play_date),
+        }
+
+    resp = jsonify(payload)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
 @booking_bp.route('/my-bookings')
 @login_required
 def my_bookings(lang):
     """Display user's booking history"""
-    db = g.db
+    db = get_db()
     user_id = session.get('user_id')
     
     # Lấy danh sách bookings của user
@@ -291,7 +354,7 @@ def my_bookings(lang):
 @login_required
 def booking_detail(lang, booking_id):
     """Display single booking details"""
-    db = g.db
+    db = get_db()
     user_id = session.get('user_id')
     
     # Lấy thông tin booking
@@ -322,7 +385,7 @@ def booking_detail(lang, booking_id):
 @login_required
 def cancel_booking(lang, booking_id):
     """Cancel a booking"""
-    db = g.db
+    db = get_db()
     user_id = session.get('user_id')
     
     # Lấy thông tin booking để kiểm tra quyền và gửi email
@@ -356,12 +419,17 @@ def cancel_booking(lang, booking_id):
         return redirect(url_for('booking.booking_detail', lang=lang, booking_id=booking_id))
     
     try:
-        # Cập nhật status thành cancelled
-        db.execute(
-            "UPDATE bookings SET status = 'cancelled', updated_at = datetime('now') WHERE id = ?",
-            (booking_id,)
-        )
-        db.commit()
+        # Cập nhật status thành cancelled và trả chỗ về tee sheet; điều kiện
+        # status != 'cancelled' để hai request cancel cùng lúc chỉ trả chỗ một lần
+        with reservation(db):
+            cur = db.execute(
+                "UPDATE bookings SET status = 'cancelled', updated_at = datetime('now') "
+                "WHERE id = ? AND status != 'cancelled'",
+                (booking_id,)
+            )
+            if cur.rowcount:
+                release_slot(db, booking['course_id'], booking['play_date'],
+                             booking['play_time'], booking['players'])
         
         # Gửi email thông báo cho admin
         send_cancellation_email(booking)
@@ -0,0 +1,315 @@
+# modules/cache.py
+
+"""
+Full-page response cache for anonymous visitors.
+
+Pages are keyed by (endpoint, lang, normalized query args, logged-in flag)
+plus the global catalog version (catalog_version table, migration 9).
+Admin writes bump the version, so every cached page of the old catalog
+stops matching at once and ages out of the backend.
+
+Backends:
+    lru   in-process OrderedDict, per gunicorn worker
+    file  one file per entry in a directory shared by all workers
+    none  caching disabled
+
+conditional_page() answers If-None-Match / If-Modified-Since with 304
+from a single stamp query (updated_at columns maintained by the triggers
+of migration 10) before the view runs any of its own queries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+
+from flask import current_app, request, session
+
+from modules.db import get_db
+
+
+def catalog_version(db):
+    row = db.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def bump_catalog_version(db):
+    """Invalidate every cached page. Does not commit."""
+    db.execute("""
+        UPDATE catalog_version
+        SET version = version + 1, updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+        WHERE id = 1
+    """)
+
+
+def parse_stamp(value):
+    """SQLite datetime('now') text (UTC) -> aware datetime, or None."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def catalog_stamp(db, **view_args):
+    """Stamp of the list pages: last course change and catalog version."""
+    row = db.execute("""
+        SELECT (SELECT MAX(updated_at) FROM golf_course) AS courses,
+               cv.updated_at, cv.version
+        FROM catalog_version cv WHERE cv.id = 1
+    """).fetchone()
+    stamps = [parse_stamp(row['courses']), parse_stamp(row['updated_at'])]
+    return (max(filter(None, stamps), default=datetime.fromtimestamp(0, timezone.utc)),
+            [row['courses'], row['version']])
+
+
+class LRUBackend:
+    """Bounded in-process LRU of cached responses."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileBackend:
+    """
+    Cached responses as files in `directory`, shared by every worker on
+    the host. Writes are atomic (temp file + rename); the oldest files are
+    pruned once more than max_entries exist.
+    """
+
+    PRUNE_EVERY = 64
+
+    def __init__(self, directory, max_entries=2048):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def _path(self, key):
+        return self.directory / (hashlib.sha256(key.encode()).hexdigest() + '.page')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                meta, body = f.read().split(b'\n', 1)
+        except (OSError, ValueError):
+            return None
+        status, headers = json.loads(meta)
+        return status, [tuple(h) for h in headers], body
+
+    def set(self, key, entry):
+        status, headers, body = entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps([status, headers]).encode() + b'\n' + body)
+        os.replace(tmp, self._path(key))
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        files = sorted(self.directory.glob('*.page'), key=lambda p: p.stat().st_mtime)
+        for path in files[:max(0, len(files) - self.max_entries)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def __len__(self):
+        return sum(1 for _ in self.directory.glob('*.page'))
+
+
+class PageCache:
+    """Backend + hit/miss counters for one worker."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'stores': 0, 'bypass': 0}
+
+    def count(self, metric):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._metrics)
+        lookups = data['hits'] + data['misses']
+        data['hit_ratio'] = round(data['hits'] / lookups, 4) if lookups else 0
+        data['backend'] = type(self.backend).__name__
+        data['entries'] = len(self.backend) if self.backend else 0
+        return data
+
+
+def _deploy_salt(app):
+    """Changes whenever templates, translations or code are redeployed."""
+    root = Path(app.root_path)
+    files = [root / 'app.py', *(root / 'modules').glob('*.py'),
+             *(root / app.template_folder).rglob('*.html'),
+             *(root / 'translations').rglob('*.mo')]
+    return str(max((f.stat().st_mtime_ns for f in files if f.is_file()), default=0))
+
+
+def get_page_cache(app=None):
+    app = app or current_app
+    return app.extensions['page_cache']
+
+
+def init_app(app):
+    """Create the worker's page cache from app config."""
+    app.config.setdefault('PAGE_CACHE', 'lru')
+    app.config.setdefault('PAGE_CACHE_SIZE', 512)
+    app.config.setdefault('PAGE_CACHE_DIR',
+                          os.path.join(tempfile.gettempdir(), 'teetimevn-pages'))
+    app.config.setdefault('ETAG_SALT', _deploy_salt(app))
+
+    kind = app.config['PAGE_CACHE']
+    if kind == 'lru':
+        backend = LRUBackend(app.config['PAGE_CACHE_SIZE'])
+    elif kind == 'file':
+        backend = FileBackend(app.config['PAGE_CACHE_DIR'], app.config['PAGE_CACHE_SIZE'])
+    elif kind == 'none':
+        backend = None
+    else:
+        raise ValueError(f"Unknown PAGE_CACHE '{kind}' (expected lru, file or none)")
+    app.extensions['page_cache'] = PageCache(backend)
+
+
+def _cache_key(args, version):
+    query = sorted(
+        (name, value.strip())
+        for name in args
+        for value in request.args.getlist(name)
+        if value.strip()
+    )
+    return json.dumps([
+        current_app.config['ETAG_SALT'],
+        version,
+        request.endpoint,
+        (request.view_args or {}).get('lang'),
+        query,
+        bool(session.get('user_id')),
+    ], ensure_ascii=False, separators=(',', ':'))
+
+
+def cached_page(args=(), skip_args=()):
+    """
+    Serve a GET view from the page cache for visitors with an empty
+    session (no login, flash messages or redirect target). `args` are the
+    query parameters that change the page; others are left out of the key.
+    Requests carrying any of `skip_args` (e.g. a visitor's position) are
+    never cached. Keys include the deploy salt, so a file cache that
+    outlives a redeploy does not serve pages of the old templates.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*a, **kw):
+            cache = get_page_cache()
+            if (cache.backend is None or request.method != 'GET' or session
+                    or any(request.args.get(name) for name in skip_args)):
+                cache.count('bypass')
+                return view(*a, **kw)
+
+            key = _cache_key(args, catalog_version(get_db()))
+            entry = cache.backend.get(key)
+            if entry is not None:
+                cache.count('hits')
+                status, headers, body = entry
+                response = current_app.response_class(body, status=status, headers=headers)
+                response.headers['X-Page-Cache'] = 'hit'
+                return response
+
+            cache.count('misses')
+            response = current_app.make_response(view(*a, **kw))
+            # Rendering may have written to the session (flash, next_url)
+            if (response.status_code == 200 and not session.modified
+                    and 'Set-Cookie' not in response.headers):
+                cache.backend.set(key, (
+                    response.status_code,
+                    [(k, v) for k, v in response.headers.items()
+                     if k not in ('Content-Length', 'Vary')],
+                    response.get_data(),
+                ))
+                cache.count('stores')
+            response.headers['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
+
+def _session_state():
+    """ETag component for what base.html renders from the session."""
+    if not session.get('user_id'):
+        return 'anon'
+    return [session.get('user_id'), session.get('username'), session.get('role')]
+
+
+def conditional_page(stamp):
+    """
+    Conditional GET for a page whose content is described by
+    stamp(db, **view_args) -> (last_modified datetime, etag parts), or
+    None when the page does not exist. The weak ETag also covers the
+    language, the session state, the local date (booking forms default to
+    today) and the deployed templates/code. Pages with pending flash
+    messages or a redirect target in the session are always rendered.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*a, **kw):
+            if request.method != 'GET' or '_flashes' in session or 'next_url' in session:
+                return view(*a, **kw)
+            stamped = stamp(get_db(), **kw)
+            if stamped is None:
+                return view(*a, **kw)
+
+            last_modified, parts = stamped
+            today = datetime.now().astimezone().replace(hour=0, minute=0, second=0,
+                                                        microsecond=0)
+            last_modified = max(last_modified, today).replace(microsecond=0)
+            etag = hashlib.sha1(json.dumps([
+                current_app.config['ETAG_SALT'], kw.get('lang'), _session_state(),
+                today.date().isoformat(), parts,
+            ], ensure_ascii=False, default=str).encode()).hexdigest()[:24]
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and last_modified <= since
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*a, **kw))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            if session.get('user_id'):
+                response.cache_control.private = True
+            return response
+        return wrapper
+    return decorator
@@ -5,15 +5,23 @@ import sqlite3
 import re
 import json
 import os
-from datetime import datetime
+import html
+import base64
+import math
+import time
+import unicodedata
+from datetime import date, datetime
 from flask import Blueprint, render_template, g, request, current_app, session, redirect, url_for, flash, jsonify
 from flask_babel import _
 from werkzeug.utils import secure_filename
+from modules.db import get_db, close_db
+from modules.cache import cached_page, conditional_page, catalog_stamp, catalog_version, parse_stamp
+from modules.gallery import load_gallery
+from modules.fx import (DISPLAY_CURRENCIES, convert_amounts, default_currency,
+                        format_price, latest_rates)
+from modules.migrations import CARD_LANGS
+from modules.teesheet import load_template, template_times
 
-# Determine the path to the SQLite database
-script_path  = Path(__file__).resolve()
-project_root = script_path.parent.parent
-DB_PATH      = project_root / "data" / "teetimevn_dev.db"
 
 # File upload settings
 UPLOAD_FOLDER = 'static/media/reviews'
@@ -30,21 +38,6 @@ COUNTRY_LABELS = {
     'ko': '베트남'
 }
 
-def get_db():
-    """Open a database connection if not already open."""
-    if not DB_PATH.is_file():
-        raise FileNotFoundError(f"Database not found: {DB_PATH}")
-    if "db" not in g:
-        g.db = sqlite3.connect(DB_PATH)
-        g.db.row_factory = sqlite3.Row
-    return g.db
-
-def close_db(_=None):
-    """Close the database connection at the end of request."""
-    db = g.pop("db", None)
-    if db:
-        db.close()
-
 def fetch_i18n(db, cid, lang):
     """
     Fetch the i18n record for a given course ID and language.
@@ -59,6 +52,351 @@ def fetch_i18n(db, cid, lang):
             return row
     return None
 
+def _card_filters(discount=None, location=None, rating=None):
+    """SQL condition + params for the public course filters on course_card."""
+    sql, params = '', []
+
+    # Filter by location (city in any language, matched on the city key)
+    if location:
+        sql += """ AND course_id IN (SELECT course_id FROM golf_course_i18n
+                                     WHERE city_key = ?)"""
+        params.append(normalize_city(location))
+
+    # Filter by discount percentage
+    if discount:
+        sql += ' AND max_discount_pct >= ?'
+        params.append(discount)
+
+    # Filter by average rating
+    if rating:
+        sql += ' AND eval_score >= ?'
+        params.append(rating)
+
+    return sql, params
+
+def _card_row(r):
+    return {
+        'id': r['id'],
+        'slug': r['slug'],
+        'name': r['name'],
+        'address': r['address'] or '',
+        'avg_rating': r['avg_rating'] or None,
+    }
+
+def load_course_cards(db, lang, discount=None, location=None, rating=None,
+                      order_by='id'):
+    """
+    Load every course card (id, slug, name, address, avg_rating) for a
+    language with one range read on the materialized course_card table
+    (see migration 3). The lang -> en -> zh-CN fallback of fetch_i18n() is
+    already resolved there; unknown languages use the English cards.
+    """
+    if lang not in CARD_LANGS:
+        lang = 'en'
+    query = """
+        SELECT course_id AS id, slug, name, address, eval_score AS avg_rating
+        FROM course_card
+        WHERE lang = ?
+    """
+    where, params = _card_filters(discount, location, rating)
+    query += where
+    query += ' ORDER BY name' if order_by == 'name' else ' ORDER BY course_id'
+
+    return [_card_row(r) for r in db.execute(query, [lang, *params]).fetchall()]
+
+# Public list sort modes: sort key expression and direction. The keys match
+# the expression indexes of migration 7, so every page is a range read.
+PAGE_SIZE = 24
+CARD_SORTS = {
+    'rating':   ('IFNULL(c.eval_score, 0)', 'DESC'),
+    'price':    ('IFNULL(c.min_price_vnd, 1e15)', 'ASC'),
+    'discount': ('IFNULL(c.max_discount_pct, 0)', 'DESC'),
+    'name':     ('c.name', 'ASC'),
+    # Equirectangular distance² from ?lat=&lng= (course_geo, see below)
+    'distance': ('IFNULL((gc.lat - ?) * (gc.lat - ?)'
+                 ' + (gc.lng - ?) * (gc.lng - ?) * ?, 1e15)', 'ASC'),
+}
+
+def encode_cursor(key, row_id):
+    """Opaque keyset cursor (?after= of the course list, ?cursor= of reviews.json)."""
+    raw = json.dumps([key, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """(key, row_id) from encode_cursor(), or None if it is not valid."""
+    try:
+        key, row_id = json.loads(
+            base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(row_id, int) or not isinstance(key, (int, float, str)):
+        return None
+    return key, row_id
+
+def load_course_page(db, lang, sort=None, after=None, limit=PAGE_SIZE,
+                     discount=None, location=None, rating=None, origin=None):
+    """
+    One page of course cards ordered by a CARD_SORTS mode, starting after
+    the keyset cursor `after` (None: first page). `origin` is (lat, lng)
+    for the distance sort; without it the page falls back to course id
+    order. Returns (cards, cursor of the next page or None).
+
+    Pages are read with `key <= ? AND (key < ? OR course_id < ?)` rather
+    than a row value: SQLite only turns the former into a range on the
+    expression index, so deep pages cost O(limit) like the first one.
+    The distance key depends on the request and cannot be indexed: its
+    candidates come from the course_geo R*Tree instead, in a circle around
+    the origin that is doubled until it holds a full page (as in
+    nearby_courses()), so a page reads the courses nearer than its last
+    card rather than the whole catalogue. Pages that reach past
+    GEO_MAX_RADIUS_KM (the tail: courses without coordinates) and pages
+    filtered by city (already a small set) read the cards directly.
+    """
+    if lang not in CARD_LANGS:
+        lang = 'en'
+    if sort == 'distance' and not origin:
+        sort = None
+    key_sql, direction = CARD_SORTS.get(sort, ('c.course_id', 'ASC'))
+    key_params = []
+    if sort == 'distance':
+        lat, lng = origin
+        # Longitude degrees shrink by cos(latitude)
+        k = math.cos(math.radians(lat)) ** 2
+        key_params = [lat, lat, lng, lng, k]
+    cmp = '<' if direction == 'DESC' else '>'
+    where, filter_params = _card_filters(discount, location, rating)
+
+    cursor = decode_cursor(after) if after else None
+    if cursor and sort in CARD_SORTS:
+        key, course_id = cursor
+        where += f""" AND {key_sql} {cmp}= ?
+                      AND ({key_sql} {cmp} ? OR c.course_id {cmp} ?)"""
+        filter_params += [*key_params, key, *key_params, key, course_id]
+    elif cursor:
+        where += f' AND c.course_id {cmp} ?'
+        filter_params.append(cursor[1])
+
+    def page_sql(source, bound=''):
+        return f"""
+            SELECT c.course_id AS id, c.slug, c.name, c.address,
+                   c.eval_score AS avg_rating, {key_sql} AS sort_key
+            FROM {source}
+            WHERE c.lang = ? {where} {bound}
+            ORDER BY sort_key {direction}, c.course_id {direction} LIMIT ?
+        """
+    params = [*key_params, lang, *filter_params]
+
+    rows = None
+    if sort == 'distance' and not location:
+        # Circle radius in the key's unit (degrees of latitude); the first
+        # one reaches past the cursor, the tail cursor (1e15) skips the R*Tree
+        after_key = cursor[0] if cursor and isinstance(cursor[0], (int, float)) else 0
+        radius = max(math.degrees(GEO_START_RADIUS_KM / EARTH_RADIUS_KM),
+                     math.sqrt(max(after_key, 0)) * 1.5)
+        max_radius = math.degrees(GEO_MAX_RADIUS_KM / EARTH_RADIUS_KM)
+        geo_sql = page_sql(
+            """course_geo g
+               JOIN course_card c ON c.course_id = g.id
+               JOIN golf_course gc ON gc.id = g.id""",
+            f"""AND g.max_lat >= ? AND g.min_lat <= ?
+                AND g.max_lng >= ? AND g.min_lng <= ? AND {key_sql} <= ?""")
+        while radius < max_radius:
+            dlng = min(radius / max(math.sqrt(k), 1e-6), 180.0)
+            rows = db.execute(geo_sql, [
+                *params, lat - radius, lat + radius, lng - dlng, lng + dlng,
+                *key_params, radius ** 2, limit + 1,
+            ]).fetchall()
+            if len(rows) > limit:
+                break
+            rows = None
+            radius *= 2
+    if rows is None:
+        source = 'course_card c'
+        if sort == 'distance':
+            source += ' JOIN golf_course gc ON gc.id = c.course_id'
+        rows = db.execute(page_sql(source), [*params, limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['sort_key'], rows[-1]['id'])
+    return [_card_row(r) for r in rows], next_cursor
+
+# Total per (lang, filters) for the paged list, recounted at most every
+# COUNT_CACHE_TTL seconds per worker instead of on every page, and at once
+# when the catalog version changes (admin writes, see modules.cache)
+COUNT_CACHE_TTL = 300
+COUNT_CACHE_MAX = 1024
+_count_cache = {}
+
+def count_course_cards(db, lang, discount=None, location=None, rating=None):
+    """Number of course cards matching the filters (cached, see above)."""
+    if lang not in CARD_LANGS:
+        lang = 'en'
+    cache_key = (lang, discount, normalize_city(location) if location else None, rating,
+                 catalog_version(db))
+    now = time.monotonic()
+    hit = _count_cache.get(cache_key)
+    if hit and now - hit[1] < COUNT_CACHE_TTL:
+        return hit[0]
+
+    where, params = _card_filters(discount, location, rating)
+    total = db.execute(
+        "SELECT COUNT(*) FROM course_card WHERE lang = ?" + where, [lang, *params]
+    ).fetchone()[0]
+    if len(_count_cache) >= COUNT_CACHE_MAX:
+        _count_cache.clear()
+    _count_cache[cache_key] = (total, now)
+    return total
+
+# Converted prices of each course, formatted for every display currency.
+# Rebuilt when the course's updated_at changes (course_price triggers),
+# the catalog version changes (fx_rate triggers) or the day rolls over
+PRICE_MATRIX_MAX = 512
+_price_matrix_cache = {}
+
+def load_price_matrix(db, course, prices):
+    """
+    {price id: {currency: display text}} of the effective price of each
+    tier of `course` in DISPLAY_CURRENCIES (cached per worker, see above).
+    """
+    stamp = (course['updated_at'], catalog_version(db), date.today().isoformat())
+    hit = _price_matrix_cache.get(course['id'])
+    if hit and hit[0] == stamp:
+        return hit[1]
+
+    amounts = [p['effective_price_vnd'] or 0 for p in prices]
+    converted = convert_amounts(amounts, latest_rates(db, stamp[2]), DISPLAY_CURRENCIES)
+    matrix = {
+        p['id']: {ccy: format_price(value, ccy) for ccy, value in row.items()}
+        for p, row in zip(prices, converted)
+    }
+    if len(_price_matrix_cache) >= PRICE_MATRIX_MAX:
+        _price_matrix_cache.clear()
+    _price_matrix_cache[course['id']] = (stamp, matrix)
+    return matrix
+
+def load_review_stats(db, course_id):
+    """
+    Review totals of one course from course_review_stats (migration 11):
+    total, avg_rating (0 without reviews), distribution {stars: count},
+    helpful_total and last_review_at.
+    """
+    row = db.execute(
+        "SELECT * FROM course_review_stats WHERE course_id = ?", (course_id,)
+    ).fetchone()
+    if not row:
+        return {'total': 0, 'avg_rating': 0, 'distribution': {i: 0 for i in range(1, 6)},
+                'helpful_total': 0, 'last_review_at': None}
+    return {
+        'total': row['review_count'],
+        'avg_rating': row['rating_sum'] / row['review_count'],
+        'distribution': {i: row[f'star_{i}'] for i in range(1, 6)},
+        'helpful_total': row['helpful_total'],
+        'last_review_at': row['last_review_at'],
+    }
+
+def helpful_review_ids(db, user_id, review_ids):
+    """
+    Set of the given review ids that user_id marked helpful: one lookup
+    on the UNIQUE(review_id, user_id) index for the reviews of one page.
+    """
+    review_ids = list(review_ids)
+    if not user_id or not review_ids:
+        return set()
+    return {
+        r[0] for r in db.execute(f"""
+            SELECT review_id FROM review_helpful
+            WHERE review_id IN ({','.join('?' for _ in review_ids)}) AND user_id = ?
+        """, [*review_ids, user_id]).fetchall()
+    }
+
+REVIEWS_PAGE_SIZE = 10
+# sort -> (key column, direction); each walks a (course_id, key) index
+# of reviews (migrations 2 and 13), whose implicit rowid breaks ties
+REVIEW_SORTS = {
+    'newest':  ('r.created_at', 'DESC'),
+    'highest': ('r.rating', 'DESC'),
+    'lowest':  ('r.rating', 'ASC'),
+    'helpful': ('r.helpful_count', 'DESC'),
+}
+
+def _review_row(r, helpful_ids):
+    review = dict(r)
+    del review['sort_key']
+    review['user_name'] = r['fullname'] or r['username']
+    review['user_found_helpful'] = r['id'] in helpful_ids
+    review['verified_booking'] = bool(r['verified_booking'])
+    if r['created_at_display']:
+        try:
+            dt = datetime.strptime(r['created_at_display'].split(' ')[0], '%Y-%m-%d')
+            review['created_at_display'] = dt.strftime('%d/%m/%Y')
+        except ValueError:
+            review['created_at_display'] = r['created_at_display'].split(' ')[0]
+    try:
+        review['images'] = json.loads(r['images']) if r['images'] else []
+    except ValueError:
+        review['images'] = []
+    return review
+
+def load_reviews_page(db, course_id, sort=None, after=None, user_id=None,
+                      limit=REVIEWS_PAGE_SIZE):
+    """
+    One page of a course's reviews in a REVIEW_SORTS order (default
+    newest), starting after the keyset cursor `after`. user_found_helpful
+    is set for user_id. Returns (reviews, cursor of the next page or None).
+    """
+    if sort not in REVIEW_SORTS:
+        sort = 'newest'
+    key_sql, direction = REVIEW_SORTS[sort]
+    cmp = '<' if direction == 'DESC' else '>'
+
+    query = f"""
+        SELECT r.*, u.username, u.fullname,
+               datetime(r.created_at) AS created_at_display, {key_sql} AS sort_key
+        FROM reviews r
+        JOIN users u ON u.id = r.user_id
+        WHERE r.course_id = ?
+    """
+    params = [course_id]
+    cursor = decode_cursor(after) if after else None
+    if cursor:
+        key, review_id = cursor
+        query += f""" AND {key_sql} {cmp}= ?
+                      AND ({key_sql} {cmp} ? OR r.id {cmp} ?)"""
+        params += [key, key, review_id]
+    query += f' ORDER BY {key_sql} {direction}, r.id {direction} LIMIT ?'
+    params.append(limit + 1)
+
+    rows = db.execute(query, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['sort_key'], rows[-1]['id'])
+    helpful_ids = helpful_review_ids(db, user_id, [r['id'] for r in rows])
+    return [_review_row(r, helpful_ids) for r in rows], next_cursor
+
+def rebuild_review_stats(db):
+    """
+    Rebuild course_review_stats from course_review_stats_source (after
+    reviews were written with the triggers bypassed). Returns the number
+    of courses with reviews.
+    """
+    db.execute("DELETE FROM course_review_stats")
+    db.execute("INSERT INTO course_review_stats SELECT * FROM course_review_stats_source")
+    db.commit()
+    return db.execute("SELECT COUNT(*) FROM course_review_stats").fetchone()[0]
+
+def rebuild_course_cards(db):
+    """
+    Rebuild course_card from course_card_source (backfills, or after data
+    was loaded with the triggers bypassed). Returns the number of cards.
+    """
+    db.execute("DELETE FROM course_card")
+    db.execute("INSERT INTO course_card SELECT * FROM course_card_source")
+    db.commit()
+    return db.execute("SELECT COUNT(*) FROM course_card").fetchone()[0]
+
 def extract_city(addr: str, lang: str) -> str:
     """
     Extract city name from a full address string, handling
@@ -99,6 +437,352 @@ def extract_city(addr: str, lang: str) -> str:
     # Default: return full string
     return addr
 
+def normalize_city(city: str) -> str:
+    """
+    Lookup key for a city name: lower-case, Latin diacritics and đ folded,
+    punctuation/spaces dropped, so 'Hà Nội' and 'Hanoi' share the key
+    'hanoi'. Non-Latin scripts keep their characters.
+    """
+    out = []
+    for ch in unicodedata.normalize('NFKD', (city or '').lower().replace('đ', 'd')):
+        if unicodedata.combining(ch) and out and out[-1] < '\u0250':
+            continue
+        out.append(ch)
+    return ''.join(ch for ch in unicodedata.normalize('NFC', ''.join(out)) if ch.isalnum())
+
+def refresh_cities(db, only_stale=True):
+    """
+    Fill golf_course_i18n.city / city_key from the address (write-time
+    extraction, migration 5). New rows and rows whose address changed have
+    city NULL (trigger) and are picked up here. Does not commit.
+    """
+    query = "SELECT id, lang, address FROM golf_course_i18n"
+    if only_stale:
+        query += " WHERE city IS NULL"
+    updates = []
+    for row_id, row_lang, address in db.execute(query).fetchall():
+        city = extract_city(address or '', row_lang)
+        updates.append((city, normalize_city(city), row_id))
+    db.executemany("UPDATE golf_course_i18n SET city=?, city_key=? WHERE id=?", updates)
+    return len(updates)
+
+def load_city_facets(db, lang):
+    """Cities of the localized course cards with their course counts."""
+    if lang not in CARD_LANGS:
+        lang = 'en'
+    return [
+        {'city': r['city'], 'count': r['n']}
+        for r in db.execute("""
+            SELECT city, COUNT(*) AS n FROM course_card
+            WHERE lang = ? AND city IS NOT NULL AND city != ''
+            GROUP BY city ORDER BY city
+        """, (lang,)).fetchall()
+    ]
+
+# bm25 column weights: name, address, designer_name, overview, content
+SEARCH_WEIGHTS = (10.0, 4.0, 4.0, 1.0, 1.0)
+
+def search_terms(q: str):
+    """Whitespace separated terms of 3+ characters (shorter ones have no trigram)."""
+    return [t for t in (q or '').split() if len(t) >= 3]
+
+def fts_query(q: str):
+    """
+    Turn user input into an FTS5 MATCH expression: every whitespace
+    separated term becomes a quoted phrase (substring match with the
+    trigram tokenizer). Terms shorter than 3 characters cannot be matched
+    by trigrams; returns None when no usable term is left.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+    return ' AND '.join('"' + t.replace('"', '""') + '"' for t in terms)
+
+# Lookup prefilter: trigrams of the LOOKUP_TERMS longest terms only (the
+# short ones are usually 'Sân', 'Golf', 'Club', in almost every row)
+LOOKUP_TERMS = 2
+LOOKUP_FIELDS = ('name', 'address', 'designer_name')
+
+def lookup_query(terms):
+    """
+    MATCH expression for course_lookup (migration 18): trigrams covering
+    each of the longest terms, ANDed. The index stores no positions, so it
+    returns a superset of the rows containing the terms; callers check
+    the substrings.
+    """
+    grams = []
+    for term in sorted(terms, key=len, reverse=True)[:LOOKUP_TERMS]:
+        term = term.lower()
+        starts = list(range(0, len(term) - 2, 3))
+        if starts[-1] != len(term) - 3:
+            starts.append(len(term) - 3)
+        grams += [term[i:i + 3] for i in starts]
+    return ' AND '.join('"' + g.replace('"', '""') + '"' for g in dict.fromkeys(grams))
+
+def like_pattern(q: str):
+    """'%q%' with LIKE wildcards escaped, for `LIKE ? ESCAPE '\\'`."""
+    return '%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def mark_terms(text, terms):
+    """Wrap case-insensitive matches of the terms in \\x02 / \\x03 (see search_courses)."""
+    pattern = '|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+    return re.sub(pattern, lambda m: f'\x02{m.group(0)}\x03', text or '', flags=re.I)
+
+def lookup_courses(db, terms, limit):
+    """
+    Rows of golf_course_i18n whose name / address / designer contain every
+    term, name matches first, then shorter names; 'text' joins the fields
+    that matched. At most `limit`
+    candidates are read from course_lookup before they are ranked, so a
+    broad term costs the same as a precise one.
+    """
+    candidates = [r[0] for r in db.execute("""
+        SELECT rowid FROM course_lookup
+        WHERE course_lookup MATCH ?
+        LIMIT ?
+    """, (lookup_query(terms), limit)).fetchall()]
+    if not candidates:
+        return []
+    folded = [t.casefold() for t in terms]
+    hits = []
+    for r in db.execute(f"""
+        SELECT id AS rowid, course_id, lang, name, address, designer_name
+        FROM golf_course_i18n
+        WHERE id IN ({','.join('?' for _ in candidates)})
+    """, candidates).fetchall():
+        fields = [r[f] or '' for f in LOOKUP_FIELDS]
+        folded_fields = [f.casefold() for f in fields]
+        if not all(any(t in f for f in folded_fields) for t in folded):
+            continue
+        in_name = all(t in folded_fields[0] for t in folded)
+        found = [f for f, ff in zip(fields, folded_fields) if any(t in ff for t in folded)]
+        hits.append(((not in_name, len(fields[0]), r['rowid']), {
+            'rowid': r['rowid'], 'course_id': r['course_id'], 'lang': r['lang'],
+            'text': ' · '.join(found),
+        }))
+    return [h for _, h in sorted(hits, key=lambda h: h[0])]
+
+def search_courses(db, lang, q, limit=20):
+    """
+    Course search over every translation, best hit per course, returned as
+    localized cards with an HTML-escaped snippet where matches are wrapped
+    in <mark>.
+
+    Names, cities and designers are looked up first (lookup_courses(),
+    sub-millisecond at 10k courses). Only when none of them matches is the
+    full index ranked with bm25 (course_search, migration 6, which also
+    covers the overview and content texts).
+    """
+    q = (q or '').strip()
+    if not q:
+        return []
+    terms = search_terms(q)
+    looked_up = False
+    if terms:
+        hits = lookup_courses(db, terms, limit * len(CARD_LANGS))
+        looked_up = bool(hits)
+        if not hits:
+            # Rank first, snippet() only for the rows that are returned
+            hits = db.execute(f"""
+                SELECT rowid, course_id, lang FROM course_search
+                WHERE course_search MATCH ?
+                ORDER BY bm25(course_search, {', '.join(map(str, SEARCH_WEIGHTS))})
+                LIMIT ?
+            """, (fts_query(q), limit * len(CARD_LANGS))).fetchall()
+    else:
+        # 1-2 character queries (e.g. 2-character CJK names): plain LIKE
+        hits = db.execute("""
+            SELECT id AS rowid, course_id, lang FROM golf_course_i18n
+            WHERE name LIKE ? ESCAPE '\\' OR address LIKE ? ESCAPE '\\'
+            LIMIT ?
+        """, (like_pattern(q), like_pattern(q), limit * len(CARD_LANGS))).fetchall()
+
+    # Best hit per course, preferring a translation in the requested language
+    best = {}
+    for h in hits:
+        cid = h['course_id']
+        if cid not in best:
+            if len(best) < limit:
+                best[cid] = h
+        elif best[cid]['lang'] != lang and h['lang'] == lang:
+            best[cid] = h
+    if not best:
+        return []
+
+    rowids = [h['rowid'] for h in best.values()]
+    marks = ','.join('?' for _ in rowids)
+    if looked_up:
+        snippets = {h['rowid']: mark_terms(h['text'], terms) for h in best.values()}
+    elif terms:
+        snippets = dict(db.execute(f"""
+            SELECT rowid, snippet(course_search, -1, char(2), char(3), '…', 32)
+            FROM course_search
+            WHERE course_search MATCH ? AND rowid IN ({marks})
+        """, [fts_query(q), *rowids]).fetchall())
+    else:
+        snippets = dict(db.execute(
+            f"SELECT id, name FROM golf_course_i18n WHERE id IN ({marks})", rowids
+        ).fetchall())
+
+    card_lang = lang if lang in CARD_LANGS else 'en'
+    cards = {
+        r['course_id']: r
+        for r in db.execute(f"""
+            SELECT course_id, slug, name, address, city FROM course_card
+            WHERE lang = ? AND course_id IN ({','.join('?' for _ in best)})
+        """, [card_lang, *best]).fetchall()
+    }
+    return [
+        {
+            'id': cid,
+            'slug': cards[cid]['slug'],
+            'name': cards[cid]['name'],
+            'address': cards[cid]['address'] or '',
+            'city': cards[cid]['city'] or '',
+            'snippet': html.escape(snippets.get(h['rowid']) or '')
+                           .replace('\x02', '<mark>').replace('\x03', '</mark>'),
+        }
+        for cid, h in best.items() if cid in cards
+    ]
+
+EARTH_RADIUS_KM = 6371.0088
+# First bounding box half-size; doubled until k courses lie inside the circle
+GEO_START_RADIUS_KM = 2.0
+GEO_MAX_RADIUS_KM = 2000.0
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def nearby_courses(db, lang, lat, lng, k=10, radius_km=None, exclude_id=None):
+    """
+    The k courses nearest to (lat, lng) as localized cards with
+    'distance_km', optionally within radius_km. Candidates come from the
+    course_geo R*Tree (migration 8) with a bounding box that is doubled
+    until k of them lie inside its inscribed circle (so no closer course
+    can be outside the box), then they are ranked by exact haversine.
+    Boxes do not wrap the antimeridian (courses are in Vietnam).
+    """
+    if lang not in CARD_LANGS:
+        lang = 'en'
+    max_radius = min(radius_km or GEO_MAX_RADIUS_KM, GEO_MAX_RADIUS_KM)
+    radius = min(GEO_START_RADIUS_KM, max_radius)
+    while True:
+        # Box around the circle; longitude span taken at its poleward edge
+        dlat = math.degrees(radius / EARTH_RADIUS_KM)
+        cos_edge = math.cos(math.radians(min(abs(lat) + dlat, 89.0)))
+        dlng = min(dlat / cos_edge, 180.0)
+        candidates = db.execute("""
+            SELECT gc.id, gc.lat, gc.lng
+            FROM course_geo g JOIN golf_course gc ON gc.id = g.id
+            WHERE g.max_lat >= ? AND g.min_lat <= ?
+              AND g.max_lng >= ? AND g.min_lng <= ?
+        """, (lat - dlat, lat + dlat, lng - dlng, lng + dlng)).fetchall()
+        hits = sorted(
+            (d, r['id'])
+            for r in candidates if r['id'] != exclude_id
+            for d in [haversine_km(lat, lng, r['lat'], r['lng'])]
+            if d <= radius
+        )
+        if len(hits) >= k or radius >= max_radius:
+            break
+        radius = min(radius * 2, max_radius)
+    hits = hits[:k]
+    if not hits:
+        return []
+
+    cards = {
+        r['course_id']: r
+        for r in db.execute(f"""
+            SELECT course_id, slug, name, address, eval_score FROM course_card
+            WHERE lang = ? AND course_id IN ({','.join('?' for _ in hits)})
+        """, [lang, *(cid for _, cid in hits)]).fetchall()
+    }
+    return [
+        {
+            'id': cid,
+            'slug': cards[cid]['slug'],
+            'name': cards[cid]['name'],
+            'address': cards[cid]['address'] or '',
+            'avg_rating': cards[cid]['eval_score'] or None,
+            'distance_km': round(d, 2),
+        }
+        for d, cid in hits if cid in cards
+    ]
+
+def city_center(db, city):
+    """Mean lat/lng of the courses in a city (any language), or None."""
+    row = db.execute("""
+        SELECT AVG(gc.lat) AS lat, AVG(gc.lng) AS lng FROM golf_course gc
+        WHERE gc.id IN (SELECT course_id FROM golf_course_i18n WHERE city_key = ?)
+          AND gc.lat IS NOT NULL AND gc.lng IS NOT NULL
+    """, (normalize_city(city),)).fetchone()
+    return (row['lat'], row['lng']) if row and row['lat'] is not None else None
+
+# Query parameters of the public course list (page cache key, paging links)
+LIST_ARGS = ('location', 'discount', 'rating', 'sort', 'lat', 'lng', 'after')
+
+def page_request_args():
+    """Sort / cursor / origin query parameters of the paged course list."""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    return {
+        'sort': request.args.get('sort', type=str),
+        'after': request.args.get('after', type=str),
+        'origin': (lat, lng) if lat is not None and lng is not None else None,
+    }
+
+def next_page_url(lang, cursor):
+    """Current URL with ?after= set to the next page cursor (None: last page)."""
+    if not cursor:
+        return None
+    args = {k: v for k, v in request.args.items() if k in LIST_ARGS}
+    args['after'] = cursor
+    return url_for(request.endpoint, lang=lang, **args)
+
+def course_stamp(db, lang, slug):
+    """
+    conditional_page() stamp of a course page: the course's updated_at
+    (stamped by the triggers of migration 10 for its translations, prices,
+    evaluation and reviews) and the catalog version (admin writes, fx).
+    For a logged-in user it also covers what the page renders for them:
+    their confirmed bookings of the course (the review form) and their
+    helpful votes on its reviews, neither of which touches the course.
+    """
+    row = db.execute("""
+        SELECT gc.id, gc.updated_at, cv.updated_at AS catalog_at, cv.version
+        FROM golf_course gc, catalog_version cv
+        WHERE gc.slug = ? AND cv.id = 1
+    """, (slug,)).fetchone()
+    if not row:
+        return None
+    stamps = [parse_stamp(row['updated_at']), parse_stamp(row['catalog_at'])]
+    parts = [row['updated_at'], row['version']]
+
+    user_id = session.get('user_id')
+    if user_id:
+        user = db.execute("""
+            SELECT (SELECT MAX(updated_at) FROM bookings
+                    WHERE user_id = ? AND course_id = ?
+                      AND status IN ('confirmed', 'completed')) AS booked_at,
+                   (SELECT COUNT(*) FROM bookings
+                    WHERE user_id = ? AND course_id = ?
+                      AND status IN ('confirmed', 'completed')) AS bookings,
+                   (SELECT MAX(rh.id) FROM review_helpful rh
+                    JOIN reviews r ON r.id = rh.review_id
+                    WHERE rh.user_id = ? AND r.course_id = ?) AS last_vote,
+                   (SELECT COUNT(*) FROM review_helpful rh
+                    JOIN reviews r ON r.id = rh.review_id
+                    WHERE rh.user_id = ? AND r.course_id = ?) AS votes
+        """, (user_id, row['id']) * 4).fetchone()
+        stamps.append(parse_stamp(user['booked_at']))
+        parts.append([user['booked_at'], user['bookings'],
+                      user['last_vote'], user['votes']])
+    return max(filter(None, stamps)), parts
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -114,82 +798,82 @@ def get_course_slug(course_id):
 def create_bp():
     bp = Blueprint('courses', __name__, url_prefix='/<lang>/courses')
 
-    @bp.before_app_request
-    def before():
-        get_db()
-
-    @bp.teardown_app_request
-    def after(exc):
-        close_db()
-
     @bp.route('/')
+    @conditional_page(catalog_stamp)
+    @cached_page(args=LIST_ARGS, skip_args=('lat', 'lng'))
     def course_list(lang):
         db = get_db()
         discount = request.args.get('discount', type=int)
         location = request.args.get('location', type=str)
         rating   = request.args.get('rating', type=float)
 
-        # Build base query
-        query = 'SELECT DISTINCT gc.id, gc.slug FROM golf_course gc'
-        conds, params = [], []
-
-        # Filter by location
-        if location:
-            query += ' JOIN golf_course_i18n gci ON gc.id = gci.course_id'
-            conds.append('gci.address LIKE ?')
-            params.append(f'%{location}%')
-
-        # Filter by discount percentage
-        if discount:
-            query += ' JOIN course_price cp ON gc.id = cp.course_id'
-            conds.append('(100 - (cp.discount_price_vnd * 100.0 / cp.rack_price_vnd)) >= ?')
-            params.append(discount)
-
-        # Filter by average rating
-        if rating:
-            query += ' JOIN course_evaluation ce ON gc.id = ce.course_id'
-            avg_expr = '(ce.design_layout + ce.turf_maintenance + ce.facilities_services + ce.landscape_environment + ce.playability_access) / 5.0'
-            conds.append(f'{avg_expr} >= ?')
-            params.append(rating)
-
-        if conds:
-            query += ' WHERE ' + ' AND '.join(conds)
-        query += ' ORDER BY gc.id'
-
-        rows = db.execute(query, params).fetchall()
-
-        # Prepare list of courses with localized name, address and avg rating
-        courses = []
-        for r in rows:
-            rec = fetch_i18n(db, r['id'], lang)
-            name = rec['name'] if rec else r['slug']
-            address = rec['address'] if rec else ''
-            avg_row = db.execute("""
-                SELECT ROUND(AVG(design_layout + turf_maintenance + facilities_services + landscape_environment + playability_access)/5.0, 1) AS avg_rating
-                FROM course_evaluation WHERE course_id=?
-            """, (r['id'],)).fetchone()
-            avg_rating = avg_row['avg_rating'] if avg_row and avg_row['avg_rating'] else None
-            courses.append({
-                'slug': r['slug'],
-                'name': name,
-                'address': address,
-                'avg_rating': avg_rating
-            })
-
-        # Extract distinct city list for filter dropdown
-        loc_rows = db.execute(
-            "SELECT address FROM golf_course_i18n WHERE lang=?", (lang,)
-        ).fetchall()
-        locations = { extract_city(r['address'], lang) for r in loc_rows }
+        # One page of localized cards, keyset-paginated (see load_course_page)
+        courses, cursor = load_course_page(
+            db, lang, discount=discount, location=location, rating=rating,
+            **page_request_args()
+        )
 
         return render_template(
             'courses.html',
             lang=lang,
             rows=courses,
-            locations=sorted(locations)
+            total=count_course_cards(db, lang, discount, location, rating),
+            sorts=CARD_SORTS,
+            next_url=next_page_url(lang, cursor),
+            locations=load_city_facets(db, lang)
         )
 
+    @bp.route('/search')
+    def course_search(lang):
+        """Full-text course search (JSON): ?q=...&limit=20"""
+        q = request.args.get('q', '', type=str)
+        limit = max(1, min(request.args.get('limit', 20, type=int), 50))
+        results = search_courses(get_db(), lang, q, limit)
+        for r in results:
+            r['url'] = url_for('courses.course_detail', lang=lang, slug=r['slug'])
+        return jsonify({'query': q, 'count': len(results), 'results': results})
+
+    @bp.route('/nearby')
+    def course_nearby(lang):
+        """
+        Nearest courses (JSON) to ?lat=&lng=, ?course=<slug> or ?city=,
+        with &k= (default 10, max 50) and optional &radius= in km.
+        """
+        db = get_db()
+        k = max(1, min(request.args.get('k', 10, type=int), 50))
+        radius = request.args.get('radius', type=float)
+        exclude_id = None
+        if request.args.get('course'):
+            course = db.execute(
+                "SELECT id, lat, lng FROM golf_course WHERE slug = ?",
+                (request.args['course'],)
+            ).fetchone()
+            if not course or course['lat'] is None or course['lng'] is None:
+                return jsonify({'error': 'course not found'}), 404
+            origin, exclude_id = (course['lat'], course['lng']), course['id']
+        elif request.args.get('city'):
+            origin = city_center(db, request.args['city'])
+            if not origin:
+                return jsonify({'error': 'city not found'}), 404
+        else:
+            lat = request.args.get('lat', type=float)
+            lng = request.args.get('lng', type=float)
+            if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                return jsonify({'error': 'lat/lng, course or city required'}), 400
+            origin = (lat, lng)
+
+        results = nearby_courses(db, lang, *origin, k=k, radius_km=radius,
+                                 exclude_id=exclude_id)
+        for r in results:
+            r['url'] = url_for('courses.course_detail', lang=lang, slug=r['slug'])
+        return jsonify({
+            'origin': {'lat': origin[0], 'lng': origin[1]},
+            'count': len(results),
+            'results': results,
+        })
+
     @bp.route('/<slug>/')
+    @conditional_page(course_stamp)
     def course_detail(lang, slug):
         db = get_db()
         course = db.execute('SELECT * FROM golf_course WHERE slug=?', (slug,)).fetchone()
@@ -207,33 +891,22 @@ def create_bp():
         lat, lng = course['lat'], course['lng']
         map_link = f'https://www.google.com/maps/search/?api=1&query={lat},{lng}'
 
-        # Load gallery images
-        gallery_dir = Path(current_app.static_folder) / 'media' / slug / 'gallery'
-        images = []
-        if gallery_dir.is_dir():
-            images = sorted([
-                fn.name for fn in gallery_dir.iterdir()
-                if fn.suffix.lower() in ('.jpg', '.jpeg', '.png', '.gif')
-            ])
+        # Gallery images (file_name, width, height) from the manifest
+        images = load_gallery(db, course['id'])
 
         # Fetch evaluation scores
         evaluation = db.execute(
             'SELECT * FROM course_evaluation WHERE course_id=?', (course['id'],)
         ).fetchone()
 
-        # Get the latest exchange rates from fx_rate table
-        fx_rate_rows = db.execute('SELECT currency, rate_to_vnd FROM fx_rate').fetchall()
-        fx_rates = {row['currency']: row['rate_to_vnd'] for row in fx_rate_rows}
+        # Prices in every display currency (cached per worker, see
+        # load_price_matrix); rendered in the language's currency
+        price_matrix = load_price_matrix(db, course, prices)
+        currency = default_currency(lang)
 
-        # Generate time slots every 30 minutes from 05:30 to 18:00
-        time_slots = []
-        h, m = 5, 30
-        while h < 18 or (h == 18 and m == 0):
-            time_slots.append(f"{h:02d}:{m:02d}")
-            m += 30
-            if m == 60:
-                m = 0
-                h += 1
+        # Tee times from the course's tee sheet template (modules/teesheet.py);
+        # the booking form loads the remaining places of the chosen day
+        time_slots = template_times(load_template(db, course['id']))
 
         # Define additional amenities for booking form
         amenities = [
@@ -242,15 +915,11 @@ def create_bp():
             ('cart',       _('Golf cart')),
         ]
 
-        # Compute discounted prices by tier: weekday, weekend, twilight
-        tier_prices = {}
-        for p in prices:
-            key = p['tier_type'].lower()   # expecting 'weekday','weekend','twilight'
-            orig     = p['rack_price_vnd'] or 0
-            disc_txt = p['discount_note'] or '0%'
-            disc_num = float(disc_txt.replace('%','').replace('-',''))
-            disc_rate= disc_num / 100
-            tier_prices[key] = int(orig * (1 - disc_rate))
+        # Discounted prices by tier: weekday, weekend, twilight
+        tier_prices = {
+            p['tier_type'].lower(): p['effective_price_vnd'] or 0
+            for p in prices
+        }
 
         # Static service prices (VND)
         service_prices = {
@@ -264,47 +933,21 @@ def create_bp():
         today_date = datetime.now().strftime('%Y-%m-%d')
 
         # ========== PHẦN MỚI: XỬ LÝ REVIEWS ==========
-        # Get reviews với pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = 10
+        # Trang review đầu tiên; các trang sau do /<slug>/reviews.json trả về
+        review_sort = request.args.get('review_sort')
+        if review_sort not in REVIEW_SORTS:
+            review_sort = 'newest'
+        reviews, reviews_cursor = load_reviews_page(
+            db, course['id'], review_sort, user_id=session.get('user_id'))
         
-        # Query reviews với thông tin user
-        reviews_query = db.execute("""
-            SELECT r.*, u.username, u.fullname,
-                   datetime(r.created_at) as created_at_display
-            FROM reviews r
-            JOIN users u ON r.user_id = u.id
-            WHERE r.course_id = ?
-            ORDER BY r.created_at DESC
-            LIMIT ? OFFSET ?
-        """, (course['id'], per_page, (page - 1) * per_page)).fetchall()
-        
-        # Đếm tổng số reviews
-        total_reviews_row = db.execute(
-            "SELECT COUNT(*) as count FROM reviews WHERE course_id = ?", 
-            (course['id'],)
-        ).fetchone()
-        total_reviews = total_reviews_row['count'] if total_reviews_row else 0
-        
-        # Tính điểm trung bình
-        avg_rating_row = db.execute(
-            "SELECT AVG(rating) as avg FROM reviews WHERE course_id = ?",
-            (course['id'],)
-        ).fetchone()
-        avg_rating = avg_rating_row['avg'] if avg_rating_row and avg_rating_row['avg'] else 0
-        
-        # Phân bố đánh giá theo sao
-        rating_distribution = {}
-        for i in range(1, 6):
-            count_row = db.execute(
-                "SELECT COUNT(*) as count FROM reviews WHERE course_id = ? AND rating = ?",
-                (course['id'], i)
-            ).fetchone()
-            rating_distribution[i] = count_row['count'] if count_row else 0
+        # Tổng số, điểm trung bình, phân bố sao: 1 dòng course_review_stats
+        review_stats = load_review_stats(db, course['id'])
+        total_reviews = review_stats['total']
+        avg_rating = review_stats['avg_rating']
+        rating_distribution = review_stats['distribution']
         
         # Kiểm tra xem user hiện tại có thể review không
         can_review = False
-        user_found_helpful_ids = []
         
         if session.get('user_id'):
             # Kiểm tra đã có booking và đã hoàn thành chưa
@@ -322,52 +965,6 @@ def create_bp():
             ).fetchone()
             
             can_review = has_booking and not existing_review
-            
-            # Lấy danh sách review_id mà user đã mark helpful
-            helpful_rows = db.execute(
-                "SELECT review_id FROM review_helpful WHERE user_id = ?",
-                (session['user_id'],)
-            ).fetchall()
-            user_found_helpful_ids = [row['review_id'] for row in helpful_rows]
-        
-        # Format reviews để hiển thị
-        reviews = []
-        for review in reviews_query:
-            review_dict = dict(review)
-            review_dict['user_name'] = review['fullname'] or review['username']
-            review_dict['user_found_helpful'] = review['id'] in user_found_helpful_ids
-            
-            # Format date cho hiển thị
-            if review['created_at_display']:
-                try:
-                    # Parse string date và format lại
-                    dt = datetime.strptime(review['created_at_display'].split(' ')[0], '%Y-%m-%d')
-                    review_dict['created_at_display'] = dt.strftime('%d/%m/%Y')
-                except:
-                    review_dict['created_at_display'] = review['created_at_display'].split(' ')[0]
-            
-            # Parse JSON images nếu có
-            if review['images']:
-                try:
-                    review_dict['images'] = json.loads(review['images'])
-                except:
-                    review_dict['images'] = []
-            else:
-                review_dict['images'] = []
-                
-            # Kiểm tra verified booking
-            verified = db.execute("""
-                SELECT id FROM bookings 
-                WHERE user_id = ? AND course_id = ? 
-                AND status IN ('confirmed', 'completed')
-                LIMIT 1
-            """, (review['user_id'], course['id'])).fetchone()
-            review_dict['verified_booking'] = bool(verified)
-            
-            reviews.append(review_dict)
-        
-        # Tính số trang
-        total_pages = (total_reviews + per_page - 1) // per_page
 
         return render_template(
             'course_detail.html',
@@ -379,7 +976,9 @@ def create_bp():
             embed=embed,
             map_link=map_link,
             images=images,
-            fx_rates=fx_rates,
+            price_matrix=price_matrix,
+            currencies=DISPLAY_CURRENCIES,
+            currency=currency,
             time_slots=time_slots,
             amenities=amenities,
             tier_prices=tier_prices,
@@ -391,10 +990,46 @@ def create_bp():
             avg_rating=avg_rating,
             rating_distribution=rating_distribution,
             can_review=can_review,
-            current_page=page,
-            total_pages=total_pages
+            review_sort=review_sort,
+            reviews_cursor=reviews_cursor
         )
 
+    @bp.route('/<slug>/reviews.json')
+    def course_reviews(lang, slug):
+        """Trang review tiếp theo (?sort=&cursor=) cho nút "Load more" """
+        db = get_db()
+        course = db.execute('SELECT id FROM golf_course WHERE slug = ?', (slug,)).fetchone()
+        if not course:
+            return jsonify({'error': 'Course not found'}), 404
+
+        sort = request.args.get('sort')
+        if sort not in REVIEW_SORTS:
+            sort = 'newest'
+        reviews, next_cursor = load_reviews_page(
+            db, course['id'], sort, request.args.get('cursor'),
+            user_id=session.get('user_id'))
+
+        response = jsonify({
+            'reviews': [{
+                'id': r['id'],
+                'user_name': r['user_name'],
+                'rating': r['rating'],
+                'comment': r['comment'],
+                'images': r['images'],
+                'helpful_count': r['helpful_count'],
+                'verified_booking': r['verified_booking'],
+                'created_at': r['created_at'],
+                'user_found_helpful': r['user_found_helpful'],
+            } for r in reviews],
+            'html': render_template('course_review_items.html', lang=lang,
+                                    reviews=reviews),
+            'sort': sort,
+            'next_cursor': next_cursor,
+        })
+        # Nội dung phụ thuộc user (menu sửa/xóa, đã mark helpful)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
     @bp.route('/<slug>/add_review', methods=['POST'])
     def add_review(lang, slug):
         """Thêm hoặc cập nhật review cho course"""
@@ -513,10 +1148,12 @@ def create_bp():
             else:
                 # Create new review
                 db.execute("""
-                    INSERT INTO reviews (course_id, user_id, rating, comment, images, created_at)
-                    VALUES (?, ?, ?, ?, ?, datetime('now'))
+                    INSERT INTO reviews (course_id, user_id, rating, comment, images,
+                                         verified_booking, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
                 """, (course_id, user_id, rating, comment, 
-                      json.dumps(images) if images else None))
+                      json.dumps(images) if images else None,
+                      1 if has_booking else 0))
             
             db.commit()
             flash(_('Review submitted successfully!'), 'success')
@@ -588,6 +1225,18 @@ def create_bp():
             print(f"Delete review error: {e}")
             return jsonify({'success': False, 'message': 'Error deleting review'}), 500
 
+    @bp.route('/api/reviews/helpful')
+    def helpful_state(lang):
+        """
+        Helpful state of the current user for ?ids=1,2,3 (max 50), so pages
+        rendered for anonymous visitors can be hydrated client-side.
+        """
+        ids = [int(i) for i in request.args.get('ids', '').split(',')[:50] if i.isdigit()]
+        helpful = helpful_review_ids(get_db(), session.get('user_id'), ids)
+        response = jsonify({'helpful': sorted(helpful)})
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+
     @bp.route('/api/review/<int:review_id>/helpful', methods=['POST'])
     def toggle_helpful(lang, review_id):
         """API để đánh dấu review hữu ích"""
@@ -0,0 +1,307 @@
+# modules/db.py
+
+"""
+SQLite connection manager.
+
+Each gunicorn worker keeps a small, bounded pool of warm connections. A
+connection is configured once when it is opened (row_factory, PRAGMAs) and
+then reused by later requests, instead of connect/close on every request.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from flask import g, current_app
+
+from modules.migrations import migrate
+
+# Determine the path to the SQLite database
+script_path  = Path(__file__).resolve()
+project_root = script_path.parent.parent
+DB_PATH      = project_root / "data" / "teetimevn_dev.db"
+
+
+# Durability / concurrency profiles, applied in order when a connection opens.
+# busy_timeout comes first so that switching journal_mode waits for locks.
+#   production: WAL so readers never block behind booking/review writers
+#   bulk-load:  data/ scripts importing or rewriting many rows
+#   test:       throwaway copies of the DB, durability not needed
+DB_PROFILES = {
+    'production': [
+        ('busy_timeout', 5000),
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', 256 * 1024 * 1024),
+        ('cache_size', -16000),          # KiB, ~16 MB per connection
+        ('temp_store', 'MEMORY'),
+    ],
+    'bulk-load': [
+        ('busy_timeout', 30000),
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'OFF'),
+        ('mmap_size', 256 * 1024 * 1024),
+        ('cache_size', -200000),         # ~200 MB for index builds
+        ('temp_store', 'MEMORY'),
+    ],
+    'test': [
+        ('busy_timeout', 5000),
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'OFF'),
+        ('mmap_size', 0),
+        ('cache_size', -2000),
+        ('temp_store', 'MEMORY'),
+    ],
+}
+DEFAULT_PROFILE = os.environ.get('DB_PROFILE', 'production')
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection is released within the checkout timeout."""
+
+
+def profile_pragmas(profile):
+    """Return the ordered PRAGMA list for a named profile."""
+    try:
+        return list(DB_PROFILES[profile])
+    except KeyError:
+        raise ValueError(
+            f"Unknown DB profile '{profile}' "
+            f"(expected one of: {', '.join(DB_PROFILES)})"
+        )
+
+
+def connect(path=DB_PATH, profile=None, pragmas=None, check_same_thread=True):
+    """
+    Open a configured connection: Row factory + PRAGMAs applied once.
+    Used by the pool and by standalone scripts in data/, e.g.
+        conn = connect(DB_PATH, profile='bulk-load')
+    """
+    conn = sqlite3.connect(str(path), check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    settings = profile_pragmas(profile) if profile else []
+    settings += list(dict(pragmas or {}).items())
+    for name, value in settings:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+class ConnectionPool:
+    """
+    Bounded LIFO pool of SQLite connections for one worker process.
+
+    - max_size:     maximum number of connections open at the same time
+    - timeout:      seconds to wait for a free connection before PoolTimeout
+    - max_lifetime: connections older than this (seconds) are recycled
+    - profile:      name of a DB_PROFILES entry applied to new connections
+    """
+
+    def __init__(self, path=DB_PATH, max_size=4, timeout=10.0,
+                 max_lifetime=3600, profile=DEFAULT_PROFILE, pragmas=None):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        profile_pragmas(profile)         # fail fast on a typo in config
+        self.profile = profile
+        self.pragmas = dict(pragmas or {})
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Connections must never cross a fork (gunicorn --preload)
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._opened_at = {}
+        self._size = 0
+        self._metrics = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+            'opened': 0,
+            'recycled': 0,
+            'discarded': 0,
+        }
+
+    def _open(self):
+        conn = connect(self.path, self.profile, self.pragmas,
+                       check_same_thread=False)
+        with self._lock:
+            self._opened_at[id(conn)] = time.monotonic()
+            self._metrics['opened'] += 1
+        return conn
+
+    def _expired(self, conn):
+        with self._lock:
+            opened = self._opened_at.get(id(conn), 0)
+        return time.monotonic() - opened > self.max_lifetime
+
+    def _drop(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._opened_at.pop(id(conn), None)
+            self._size -= 1
+
+    def acquire(self):
+        """Check out a connection, opening a new one while under max_size."""
+        if os.getpid() != self._pid:
+            self._reset()
+
+        with self._lock:
+            self._metrics['checkouts'] += 1
+            can_open = self._idle.empty() and self._size < self.max_size
+            if can_open:
+                self._size += 1
+
+        if can_open:
+            try:
+                return self._open()
+            except sqlite3.Error:
+                with self._lock:
+                    self._size -= 1
+                raise
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            start = time.monotonic()
+            with self._lock:
+                self._metrics['waits'] += 1
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._metrics['timeouts'] += 1
+                raise PoolTimeout(
+                    f"No SQLite connection available after {self.timeout}s "
+                    f"(pool size {self.max_size})"
+                )
+            finally:
+                with self._lock:
+                    self._metrics['wait_seconds'] += time.monotonic() - start
+
+        if self._expired(conn):
+            # Replace the stale connection in place; pool size is unchanged
+            with self._lock:
+                self._metrics['recycled'] += 1
+                self._opened_at.pop(id(conn), None)
+            conn.close()
+            try:
+                return self._open()
+            except sqlite3.Error:
+                with self._lock:
+                    self._size -= 1
+                raise
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, rolling back any open transaction."""
+        if os.getpid() != self._pid:
+            return
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                discard = True
+        if discard:
+            with self._lock:
+                self._metrics['discarded'] += 1
+            self._drop(conn)
+        else:
+            self._idle.put(conn)
+
+    def close_all(self):
+        """Close every idle connection (e.g. before a worker exits)."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._drop(conn)
+
+    def stats(self):
+        """Snapshot of pool metrics for monitoring."""
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - t for t in self._opened_at.values()]
+            data = dict(self._metrics)
+            data.update({
+                'pid': self._pid,
+                'profile': self.profile,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': self._idle.qsize(),
+                'in_use': self._size - self._idle.qsize(),
+                'max_lifetime': self.max_lifetime,
+                'oldest_connection_age': round(max(ages), 3) if ages else 0,
+            })
+        data['wait_seconds'] = round(data['wait_seconds'], 6)
+        return data
+
+
+def get_pool(app=None):
+    app = app or current_app
+    return app.extensions['db_pool']
+
+
+def get_db():
+    """Check out a pooled connection for this request if not already held."""
+    if "db" not in g:
+        pool = get_pool()
+        if not pool.path.is_file():
+            raise FileNotFoundError(f"Database not found: {pool.path}")
+        g.db = pool.acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    """Return the request's connection to the pool."""
+    db = g.pop("db", None)
+    if db is not None:
+        get_pool().release(db)
+
+
+def init_app(app):
+    """
+    Create the worker's pool from app config and register the teardown hook
+    once for the whole app; the pool's idle connections close at exit.
+    """
+    app.config.setdefault('DATABASE', str(DB_PATH))
+    app.config.setdefault('DB_POOL_SIZE', 4)
+    app.config.setdefault('DB_POOL_TIMEOUT', 10.0)
+    app.config.setdefault('DB_CONN_MAX_LIFETIME', 3600)
+    app.config.setdefault('DB_PROFILE', DEFAULT_PROFILE)
+    app.config.setdefault('DB_AUTO_MIGRATE', True)
+
+    app.extensions['db_pool'] = ConnectionPool(
+        app.config['DATABASE'],
+        max_size=app.config['DB_POOL_SIZE'],
+        timeout=app.config['DB_POOL_TIMEOUT'],
+        max_lifetime=app.config['DB_CONN_MAX_LIFETIME'],
+        profile=app.config['DB_PROFILE'],
+    )
+    # Close the idle connections when the worker exits, so the last one
+    # checkpoints the WAL instead of leaving it to the next process
+    atexit.register(app.extensions['db_pool'].close_all)
+
+    # Bring the schema up to date before the first request
+    if app.config['DB_AUTO_MIGRATE'] and Path(app.config['DATABASE']).is_file():
+        conn = connect(app.config['DATABASE'], app.config['DB_PROFILE'])
+        try:
+            for version, name in migrate(conn):
+                app.logger.info("Applied migration %03d: %s", version, name)
+        finally:
+            conn.close()
+
+    # Connections are checked out lazily by get_db(): static files, 304s
+    # and redirects that never query do not take one from the pool
+    app.teardown_appcontext(close_db)
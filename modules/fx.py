@@ -1,16 +1,193 @@
-from flask import Blueprint, jsonify
-import sqlite3, datetime
-from pathlib import Path
+# modules/fx.py
+
+"""
+FX rates: latest rate per currency as of a date, cached per worker.
+
+latest_rates() resolves every currency with one query that probes
+idx_fx_rate_currency_date (migration 15) once per currency. Resolved maps
+are cached per worker for FX_CACHE_TTL seconds and dropped as soon as the
+catalog version changes (fx_rate writes bump it through the triggers of
+migration 10); admin.fx_edit also clears the cache of its own worker.
+
+/api/fx/latest and /api/fx/convert expose the rates and convert a batch
+of VND amounts into the display currencies in one call; format_price()
+and LANG_CURRENCY are what the course page renders prices with.
+"""
+
+import math
+import threading
+import time
+from datetime import date
+
+from flask import Blueprint, jsonify, request
+
+from modules.cache import catalog_version
+from modules.db import get_db
 
 fx_bp = Blueprint("fx", __name__, url_prefix="/api/fx")
-DB = Path("data/teetimevn_dev.db")
+
+# Currencies offered in the course page currency selector
+DISPLAY_CURRENCIES = ('VND', 'USD', 'CNY', 'JPY', 'KRW', 'TWD', 'EUR')
+CURRENCY_SYMBOLS = {
+    'VND': 'đ', 'USD': '$', 'CNY': '¥', 'JPY': '¥', 'KRW': '₩', 'TWD': 'NT$', 'EUR': '€'
+}
+# Currency a course page is rendered in for each site language
+LANG_CURRENCY = {
+    'vi': 'VND', 'en': 'USD', 'zh-CN': 'CNY', 'zh-TW': 'TWD', 'ja': 'JPY', 'ko': 'KRW'
+}
+WHOLE_CURRENCIES = ('VND', 'JPY', 'KRW')
+FX_CACHE_TTL = 300
+MAX_AMOUNTS = 200
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_latest_rates(db, as_of):
+    """
+    {currency: (rate_to_vnd, rate_date)} of the last rate on or before
+    as_of. The currencies are enumerated by seeking from one to the next
+    on the index (a loose index scan), then each gets one LIMIT 1 probe.
+    """
+    rows = db.execute("""
+        WITH RECURSIVE c(currency) AS (
+            SELECT MIN(currency) FROM fx_rate
+            UNION ALL
+            SELECT (SELECT MIN(currency) FROM fx_rate WHERE currency > c.currency)
+            FROM c WHERE c.currency IS NOT NULL
+        )
+        SELECT f.currency, f.rate_to_vnd, f.rate_date
+        FROM c
+        JOIN fx_rate f ON f.id = (
+            SELECT id FROM fx_rate
+            WHERE currency = c.currency AND rate_date <= ?
+            ORDER BY rate_date DESC LIMIT 1)
+    """, (as_of,)).fetchall()
+    return {r['currency']: (r['rate_to_vnd'], r['rate_date']) for r in rows}
+
+
+def latest_rates(db, as_of=None):
+    """Cached load_latest_rates() (default: today)."""
+    as_of = as_of or date.today().isoformat()
+    version = catalog_version(db)
+    now = time.monotonic()
+    hit = _cache.get(as_of)
+    if hit and hit[0] == version and now - hit[1] < FX_CACHE_TTL:
+        return hit[2]
+
+    rates = load_latest_rates(db, as_of)
+    with _cache_lock:
+        # Keys are dates: keep today's and a few historical lookups
+        if len(_cache) >= 32:
+            _cache.clear()
+        _cache[as_of] = (version, now, rates)
+    return rates
+
+
+def invalidate_fx_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def rate_map(rates):
+    """{currency: rate_to_vnd} with VND itself at 1; unusable rates are skipped."""
+    return {'VND': 1.0, **{ccy: rate for ccy, (rate, _) in rates.items()
+                           if rate is not None and rate > 0}}
+
+
+def convert_amounts(amounts, rates, currencies=DISPLAY_CURRENCIES):
+    """Each VND amount in every currency that has a rate."""
+    to_vnd = rate_map(rates)
+    currencies = [c for c in currencies if c in to_vnd]
+    return [
+        {ccy: round(amount / to_vnd[ccy], 0 if ccy in WHOLE_CURRENCIES else 2)
+         for ccy in currencies}
+        for amount in amounts
+    ]
+
+
+def format_price(amount, ccy):
+    """'1,500,000 đ', '59.20 $': the display text of a converted price."""
+    digits = 0 if ccy in WHOLE_CURRENCIES else 2
+    return f"{amount:,.{digits}f} {CURRENCY_SYMBOLS.get(ccy, ccy)}"
+
+
+def default_currency(lang):
+    return LANG_CURRENCY.get(lang, 'VND')
+
+
+def _as_of_arg():
+    value = request.args.get('as_of')
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        return False
+
+
+def _rates_json(rates):
+    return {ccy: {'rate_to_vnd': rate, 'rate_date': rate_date}
+            for ccy, (rate, rate_date) in sorted(rates.items())}
+
+
+@fx_bp.route("/latest")
+def latest():
+    """Latest rate of every currency (?as_of=YYYY-MM-DD, default today)."""
+    as_of = _as_of_arg()
+    if as_of is False:
+        return jsonify({"error": "as_of must be YYYY-MM-DD"}), 400
+    rates = latest_rates(get_db(), as_of)
+    return jsonify({"base": "VND", "as_of": as_of or date.today().isoformat(),
+                    "rates": _rates_json(rates)})
+
+
+@fx_bp.route("/convert", methods=["GET", "POST"])
+def convert():
+    """
+    Convert VND amounts into the display currencies:
+        GET  /api/fx/convert?amounts=1500000,2300000&currencies=USD,EUR
+        POST /api/fx/convert  {"amounts": [1500000, 2300000], "currencies": ["USD"]}
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "body must be a JSON object"}), 400
+        amounts, currencies = data.get("amounts"), data.get("currencies")
+    else:
+        amounts = [a for a in request.args.get("amounts", "").split(",") if a.strip()]
+        currencies = [c for c in request.args.get("currencies", "").split(",") if c.strip()]
+    if not isinstance(amounts or [], list):
+        return jsonify({"error": "amounts must be a list of numbers"}), 400
+    if (not isinstance(currencies or [], list)
+            or not all(isinstance(c, str) for c in currencies or [])):
+        return jsonify({"error": "currencies must be a list of currency codes"}), 400
+    try:
+        amounts = [float(a) for a in amounts or []]
+    except (TypeError, ValueError):
+        return jsonify({"error": "amounts must be numbers"}), 400
+    if not all(math.isfinite(a) for a in amounts):
+        return jsonify({"error": "amounts must be finite numbers"}), 400
+    if not amounts or len(amounts) > MAX_AMOUNTS:
+        return jsonify({"error": f"give 1 to {MAX_AMOUNTS} amounts"}), 400
+    currencies = [c.strip().upper() for c in currencies or []] or DISPLAY_CURRENCIES
+
+    as_of = _as_of_arg()
+    if as_of is False:
+        return jsonify({"error": "as_of must be YYYY-MM-DD"}), 400
+    rates = latest_rates(get_db(), as_of)
+    return jsonify({"base": "VND", "as_of": as_of or date.today().isoformat(),
+                    "rates": _rates_json(rates),
+                    "results": [{"vnd": amount, "converted": converted} for amount, converted
+                                in zip(amounts, convert_amounts(amounts, rates, currencies))]})
+
 
 @fx_bp.route("/<ccy>")
 def latest_rate(ccy):
+    """Latest rate of one currency as of today."""
     ccy = ccy.upper()
-    today = datetime.date.today().isoformat()
-    sql = "SELECT rate_to_vnd FROM fx_rate WHERE rate_date=? AND currency=?"
-    rate = sqlite3.connect(DB).execute(sql, (today, ccy)).fetchone()
-    if not rate:
+    found = latest_rates(get_db()).get(ccy)
+    if not found:
         return jsonify({"error": "rate not found"}), 404
-    return jsonify({"currency": ccy, "rate_to_vnd": rate[0]})
\ No newline at end of file
+    rate, rate_date = found
+    return jsonify({"currency": ccy, "rate_to_vnd": rate, "rate_date": rate_date})
@@ -0,0 +1,120 @@
+# modules/gallery.py
+
+"""
+Gallery manifest: the images of static/media/<slug>/gallery recorded in
+the course_gallery table (migration 14) with their size, pixel dimensions
+and mtime. Course pages read the manifest instead of listing the folder.
+
+sync_gallery() compares the folder with the manifest by (size, mtime) and
+only opens new or changed images to read their dimensions. It runs for
+every course at startup, for one course when an admin saves it, and from
+data/build_gallery_manifest.py after files are copied in by hand.
+"""
+
+import os
+from pathlib import Path
+
+from modules.db import connect
+
+try:
+    from PIL import Image
+except ImportError:  # width/height stay NULL without Pillow
+    Image = None
+
+GALLERY_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+
+def gallery_dir(static_folder, slug):
+    return os.path.join(static_folder, 'media', str(slug), 'gallery')
+
+
+def image_size(path):
+    """(width, height) in pixels, or (None, None) if it cannot be read."""
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except (OSError, ValueError):
+        return None, None
+
+
+def scan_gallery(static_folder, slug):
+    """{file_name: os.stat_result} of the images in a course's gallery folder."""
+    folder = gallery_dir(static_folder, slug)
+    try:
+        entries = os.scandir(folder)
+    except OSError:
+        return {}
+    with entries:
+        return {
+            e.name: e.stat() for e in entries
+            if e.is_file() and os.path.splitext(e.name)[1].lower() in GALLERY_EXTENSIONS
+        }
+
+
+def sync_gallery(db, static_folder, course_id, slug):
+    """
+    Bring one course's manifest in line with its folder. Returns the
+    number of rows added, changed or removed. Does not commit.
+    """
+    stored = {
+        r['file_name']: (r['size_bytes'], r['mtime_ns'])
+        for r in db.execute(
+            "SELECT file_name, size_bytes, mtime_ns FROM course_gallery WHERE course_id = ?",
+            (course_id,))
+    }
+    found = scan_gallery(static_folder, slug)
+
+    changed = 0
+    for name, st in found.items():
+        if stored.get(name) == (st.st_size, st.st_mtime_ns):
+            continue
+        width, height = image_size(os.path.join(gallery_dir(static_folder, slug), name))
+        db.execute("""
+            INSERT OR REPLACE INTO course_gallery
+                (course_id, file_name, size_bytes, width, height, mtime_ns)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (course_id, name, st.st_size, width, height, st.st_mtime_ns))
+        changed += 1
+
+    gone = [name for name in stored if name not in found]
+    if gone:
+        db.execute(
+            f"DELETE FROM course_gallery WHERE course_id = ?"
+            f" AND file_name IN ({','.join('?' for _ in gone)})",
+            [course_id, *gone])
+        changed += len(gone)
+    return changed
+
+
+def sync_all_galleries(db, static_folder):
+    """sync_gallery() for every course, committed. Returns rows changed."""
+    changed = sum(
+        sync_gallery(db, static_folder, r['id'], r['slug'])
+        for r in db.execute("SELECT id, slug FROM golf_course").fetchall()
+    )
+    db.commit()
+    return changed
+
+
+def load_gallery(db, course_id):
+    """Manifest rows of a course (file_name, width, height), by file name."""
+    return [dict(r) for r in db.execute("""
+        SELECT file_name, width, height FROM course_gallery
+        WHERE course_id = ? ORDER BY file_name
+    """, (course_id,))]
+
+
+def init_app(app):
+    """Sync every course's manifest once when the worker starts."""
+    app.config.setdefault('GALLERY_SYNC_ON_START', True)
+    if not app.config['GALLERY_SYNC_ON_START'] or not Path(app.config['DATABASE']).is_file():
+        return
+    conn = connect(app.config['DATABASE'], app.config['DB_PROFILE'])
+    try:
+        changed = sync_all_galleries(conn, app.static_folder)
+        if changed:
+            app.logger.info("Gallery manifest: %d image(s) updated", changed)
+    finally:
+        conn.close()
@@ -0,0 +1,287 @@
+# modules/images.py
+
+"""
+Responsive image derivatives for static/media.
+
+build_derivatives() resizes every source image (course hero images
+media/<slug>.jpg, galleries media/<slug>/gallery/*, review uploads
+media/reviews/*) to the WIDTHS ladder in each available format and writes
+static/media/_derived/manifest.json. Derivative files are named after the
+SHA-256 of the source, so a rebuild only encodes images whose content
+changed; sources whose size and mtime match the manifest are not even
+re-hashed. Sources are encoded in batches across a process pool.
+
+Each manifest entry also carries a placeholder: a PLACEHOLDER_WIDTH px
+wide WebP (JPEG without WebP support) as a data: URI of a few hundred
+bytes, inlined as the <img> background so the slot shows a blurred
+preview until the image arrives, without an extra request.
+
+Templates call image_variants('media/...') (a Jinja global) to get the
+srcset of each format and the placeholder, or None when the image has no
+derivatives yet and the original is served as before.
+"""
+
+import base64
+import glob
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import url_for
+
+try:
+    from PIL import Image, ImageFilter, ImageOps, features
+except ImportError:
+    Image = None
+
+WIDTHS = (320, 640, 1280)
+PLACEHOLDER_WIDTH = 16
+BATCH_SIZE = 8
+DERIVED_DIR = 'media/_derived'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_PATTERNS = ('media/*.jpg', 'media/*/gallery/*', 'media/reviews/*')
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+# format -> (file extension, Pillow save options); <picture> lists them in
+# this order, so the smallest encodings come first and JPEG is the fallback
+FORMATS = {
+    'avif': ('avif', {'quality': 55}),
+    'webp': ('webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def available_formats():
+    """FORMATS this Pillow build can encode (AVIF needs Pillow >= 11.3)."""
+    if Image is None:
+        return []
+    return [fmt for fmt in FORMATS if fmt == 'jpeg' or features.check(fmt)]
+
+
+def find_sources(static_folder):
+    """Paths of the source images relative to static_folder, sorted."""
+    sources = set()
+    for pattern in SOURCE_PATTERNS:
+        for path in glob.glob(os.path.join(static_folder, pattern)):
+            rel = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if (os.path.splitext(rel)[1].lower() in SOURCE_EXTENSIONS
+                    and not rel.startswith(DERIVED_DIR + '/') and os.path.isfile(path)):
+                sources.add(rel)
+    return sorted(sources)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ladder(width):
+    """Target widths for a source `width` pixels wide (never upscaled)."""
+    widths = [w for w in WIDTHS if w < width]
+    return widths + [width] if width <= WIDTHS[-1] else widths
+
+
+def derivative_name(digest, width, fmt):
+    return f"{DERIVED_DIR}/{digest[:20]}-{width}.{FORMATS[fmt][0]}"
+
+
+def placeholder_uri(img, formats):
+    """Tiny blurred preview of `img` as a data: URI."""
+    w = min(PLACEHOLDER_WIDTH, img.width)
+    tiny = img.resize((w, max(1, round(img.height * w / img.width))), Image.BOX)
+    tiny = tiny.filter(ImageFilter.GaussianBlur(0.6))
+    fmt = 'webp' if 'webp' in formats else 'jpeg'
+    buf = io.BytesIO()
+    (tiny if fmt == 'webp' else tiny.convert('RGB')).save(buf, format=fmt.upper(), quality=40)
+    return f"data:image/{fmt};base64,{base64.b64encode(buf.getvalue()).decode()}"
+
+
+def build_image(static_folder, rel, digest, formats):
+    """
+    Encode the missing derivatives of one source (runs in a worker
+    process). Returns (manifest entry without the stat fields, number of
+    files written).
+    """
+    src = os.path.join(static_folder, rel)
+    written = 0
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+        width, height = img.size
+
+        variants = {fmt: [] for fmt in formats}
+        for w in ladder(width):
+            resized = None
+            for fmt in formats:
+                name = derivative_name(digest, w, fmt)
+                variants[fmt].append([w, name])
+                dest = os.path.join(static_folder, name)
+                if os.path.exists(dest):
+                    continue
+                if resized is None:
+                    resized = img if w == width else img.resize(
+                        (w, round(height * w / width)), Image.LANCZOS)
+                out = resized.convert('RGB') if fmt == 'jpeg' else resized
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    out.save(f, format=fmt.upper(), **FORMATS[fmt][1])
+                os.replace(tmp, dest)
+                written += 1
+
+        placeholder = placeholder_uri(img, formats)
+
+    return ({'sha256': digest, 'width': width, 'height': height,
+             'placeholder': placeholder, 'variants': variants}, written)
+
+
+def _build_batch_item(args):
+    """build_image() for ProcessPoolExecutor.map: errors become results."""
+    static_folder, rel, digest, formats = args
+    try:
+        return build_image(static_folder, rel, digest, formats), None
+    except (OSError, ValueError) as e:
+        return None, e
+
+
+def manifest_path(static_folder):
+    return os.path.join(static_folder, DERIVED_DIR, MANIFEST_NAME)
+
+
+def read_manifest(static_folder):
+    try:
+        with open(manifest_path(static_folder), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'images': {}}
+
+
+def write_manifest(static_folder, manifest):
+    path = manifest_path(static_folder)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def build_derivatives(static_folder, jobs=None, force=False, prune=True, log=print):
+    """
+    Bring static/media/_derived and its manifest up to date. `force`
+    re-encodes every derivative; `prune` deletes derivative files no
+    source refers to any more. Returns (sources in the manifest, files
+    encoded, sources that failed).
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required to build image derivatives")
+    os.makedirs(os.path.join(static_folder, DERIVED_DIR), exist_ok=True)
+    formats = available_formats()
+    old = read_manifest(static_folder)['images']
+    images, todo, failed, encoded = {}, [], [], 0
+
+    for rel in find_sources(static_folder):
+        st = os.stat(os.path.join(static_folder, rel))
+        entry = old.get(rel)
+        if (not force and entry and entry['size'] == st.st_size
+                and entry['mtime_ns'] == st.st_mtime_ns
+                and list(entry['variants']) == formats and 'placeholder' in entry
+                and all([w for w, _ in names] == ladder(entry['width'])
+                        for names in entry['variants'].values())
+                and all(os.path.exists(os.path.join(static_folder, name))
+                        for names in entry['variants'].values() for _, name in names)):
+            images[rel] = entry
+            continue
+        digest = file_sha256(os.path.join(static_folder, rel))
+        if force:
+            for names in (entry or {}).get('variants', {}).values():
+                for _, name in names:
+                    try:
+                        os.remove(os.path.join(static_folder, name))
+                    except OSError:
+                        pass
+        todo.append((rel, digest, st))
+
+    # Sources are handed to the workers in batches of BATCH_SIZE
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(_build_batch_item,
+                           [(static_folder, rel, digest, formats) for rel, digest, _ in todo],
+                           chunksize=BATCH_SIZE)
+        for (rel, _, st), (result, error) in zip(todo, results):
+            if error:
+                log(f"  ⚠️  {rel}: {error}")
+                failed.append(rel)
+                continue
+            entry, written = result
+            entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+            images[rel] = entry
+            encoded += written
+
+    write_manifest(static_folder, {'widths': list(WIDTHS), 'formats': formats,
+                                   'images': images})
+
+    if prune:
+        keep = {name for e in images.values()
+                for names in e['variants'].values() for _, name in names}
+        for path in glob.glob(os.path.join(static_folder, DERIVED_DIR, '*')):
+            rel = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if rel not in keep and not rel.endswith('/' + MANIFEST_NAME):
+                os.remove(path)
+    return len(images), encoded, len(failed)
+
+
+# ---------------------------------------------------------------------------
+# Template side: the manifest is read once per worker and re-read at most
+# every MANIFEST_TTL seconds if the file changed.
+# ---------------------------------------------------------------------------
+MANIFEST_TTL = 60
+
+_manifest = {'images': {}, 'mtime_ns': None, 'checked': None}
+_manifest_lock = threading.Lock()
+
+
+def _current_images(static_folder):
+    now = time.monotonic()
+    if _manifest['checked'] is None or now - _manifest['checked'] >= MANIFEST_TTL:
+        with _manifest_lock:
+            _manifest['checked'] = now
+            try:
+                mtime_ns = os.stat(manifest_path(static_folder)).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns != _manifest['mtime_ns']:
+                _manifest['images'] = read_manifest(static_folder)['images']
+                _manifest['mtime_ns'] = mtime_ns
+    return _manifest['images']
+
+
+def image_variants(static_folder, path):
+    """
+    {'width', 'height', 'placeholder', 'srcset': {format: 'url 320w, ...'}}
+    for a static path such as 'media/<slug>.jpg', or None without
+    derivatives.
+    """
+    entry = _current_images(static_folder).get(path)
+    if not entry:
+        return None
+    return {
+        'width': entry['width'],
+        'height': entry['height'],
+        'placeholder': entry.get('placeholder'),
+        'srcset': {
+            fmt: ', '.join(f"{url_for('static', filename=name)} {w}w" for w, name in names)
+            for fmt, names in entry['variants'].items()
+        },
+    }
+
+
+def init_app(app):
+    """Expose image_variants(path) to the templates."""
+    app.jinja_env.globals['image_variants'] = (
+        lambda path: image_variants(app.static_folder, path))
@@ -0,0 +1,1030 @@
+# modules/migrations.py
+
+"""
+Versioned schema migrations for teetimevn_dev.db.
+
+Applied migrations are recorded in the `schema_version` table. Every
+migration runs in its own BEGIN IMMEDIATE transaction and re-checks the
+current version inside it, so several gunicorn workers starting at the same
+time apply each migration exactly once. All DDL uses IF NOT EXISTS so the
+runner is safe on databases created by the old data/create_*.py scripts.
+
+A migration step is either one SQL statement (str) or a callable(conn) for
+data backfills.
+"""
+
+import re
+import unicodedata
+from datetime import datetime
+
+MIGRATIONS = []
+
+
+def migration(version, name, steps):
+    MIGRATIONS.append((version, name, steps))
+
+
+# ---------------------------------------------------------------------------
+# 1. Baseline: the tables previously created by hand in data/
+# ---------------------------------------------------------------------------
+migration(1, 'baseline schema', [
+    """CREATE TABLE IF NOT EXISTS golf_course (
+      id            INTEGER PRIMARY KEY AUTOINCREMENT,
+      slug          TEXT UNIQUE NOT NULL,
+      holes         INTEGER DEFAULT 18,
+      par           INTEGER,
+      length_yards  INTEGER,
+      opened_year   INTEGER,
+      lat           REAL,
+      lng           REAL,
+      maps_url      TEXT,
+      scorecard_pdf TEXT,
+      created_at    TEXT DEFAULT (datetime('now')),
+      updated_at    TEXT DEFAULT (datetime('now'))
+    )""",
+    """CREATE TABLE IF NOT EXISTS golf_course_i18n (
+      id             INTEGER PRIMARY KEY AUTOINCREMENT,
+      course_id      INTEGER NOT NULL,
+      lang           TEXT NOT NULL,
+      name           TEXT NOT NULL,
+      designer_name  TEXT,
+      address        TEXT,
+      seo_title      TEXT,
+      seo_description TEXT,
+      meta_keywords  TEXT,
+      overview       TEXT,
+      content        TEXT,
+      fee_note       TEXT,
+      best_season    TEXT,
+      tips_note      TEXT,
+      UNIQUE(course_id, lang),
+      FOREIGN KEY(course_id) REFERENCES golf_course(id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS course_price (
+      id                 INTEGER PRIMARY KEY AUTOINCREMENT,
+      course_id          INTEGER NOT NULL,
+      tier_type          TEXT CHECK(tier_type IN ('weekday','weekend','twilight')) NOT NULL,
+      rack_price_vnd     REAL NOT NULL,
+      discount_price_vnd REAL,
+      discount_note      TEXT,
+      inc_caddie         INTEGER DEFAULT 0,
+      inc_cart           INTEGER DEFAULT 0,
+      inc_tax            INTEGER DEFAULT 0,
+      updated_at         TEXT DEFAULT (datetime('now')),
+      FOREIGN KEY(course_id) REFERENCES golf_course(id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS fx_rate (
+      id          INTEGER PRIMARY KEY AUTOINCREMENT,
+      rate_date   TEXT NOT NULL,       -- YYYY-MM-DD
+      currency    TEXT NOT NULL,       -- USD / CNY / …
+      rate_to_vnd REAL NOT NULL,
+      source      TEXT,
+      created_at  TEXT DEFAULT (datetime('now')),
+      UNIQUE(rate_date, currency)
+    )""",
+    """CREATE TABLE IF NOT EXISTS course_evaluation (
+      id                    INTEGER PRIMARY KEY AUTOINCREMENT,
+      course_id             INTEGER NOT NULL UNIQUE,
+      design_layout         INTEGER,
+      turf_maintenance      INTEGER,
+      facilities_services   INTEGER,
+      landscape_environment INTEGER,
+      playability_access    INTEGER,
+      FOREIGN KEY(course_id) REFERENCES golf_course(id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS static_page_i18n (
+      page_id     TEXT NOT NULL,
+      lang        TEXT NOT NULL,
+      title       TEXT,
+      description TEXT,
+      keywords    TEXT,
+      PRIMARY KEY (page_id, lang)
+    )""",
+    """CREATE TABLE IF NOT EXISTS users (
+      id            INTEGER PRIMARY KEY AUTOINCREMENT,
+      email         TEXT NOT NULL UNIQUE,
+      phone         TEXT,
+      username      TEXT NOT NULL UNIQUE,
+      password_hash TEXT NOT NULL,
+      role          TEXT NOT NULL DEFAULT 'user',
+      fullname      TEXT,
+      created_at    DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+      updated_at    DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS bookings (
+      id             INTEGER PRIMARY KEY AUTOINCREMENT,
+      user_id        INTEGER NOT NULL,
+      course_id      INTEGER NOT NULL,
+      play_date      DATE NOT NULL,
+      play_time      TIME NOT NULL,
+      players        INTEGER NOT NULL DEFAULT 1,
+      has_caddy      BOOLEAN DEFAULT 0,
+      has_cart       BOOLEAN DEFAULT 0,
+      has_rent_clubs BOOLEAN DEFAULT 0,
+      green_fee      REAL NOT NULL,
+      services_fee   REAL NOT NULL,
+      insurance_fee  REAL NOT NULL,
+      total_amount   REAL NOT NULL,
+      status         VARCHAR(20) DEFAULT 'pending',
+      notes          TEXT,
+      created_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      updated_at     TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      FOREIGN KEY (user_id) REFERENCES users(id),
+      FOREIGN KEY (course_id) REFERENCES golf_course(id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_user_id ON bookings(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_course_id ON bookings(course_id)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_play_date ON bookings(play_date)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status)",
+    """CREATE TABLE IF NOT EXISTS booking_status_history (
+      id         INTEGER PRIMARY KEY AUTOINCREMENT,
+      booking_id INTEGER NOT NULL,
+      old_status VARCHAR(20),
+      new_status VARCHAR(20),
+      changed_by VARCHAR(100),
+      notes      TEXT,
+      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      FOREIGN KEY (booking_id) REFERENCES bookings(id)
+    )""",
+    """CREATE INDEX IF NOT EXISTS idx_booking_status_history_booking_id
+       ON booking_status_history(booking_id)""",
+    """CREATE TABLE IF NOT EXISTS reviews (
+      id            INTEGER PRIMARY KEY AUTOINCREMENT,
+      course_id     INTEGER NOT NULL,
+      user_id       INTEGER NOT NULL,
+      rating        INTEGER NOT NULL CHECK (rating >= 1 AND rating <= 5),
+      comment       TEXT NOT NULL,
+      images        TEXT,
+      helpful_count INTEGER DEFAULT 0,
+      created_at    DATETIME DEFAULT CURRENT_TIMESTAMP,
+      updated_at    DATETIME DEFAULT CURRENT_TIMESTAMP,
+      FOREIGN KEY (course_id) REFERENCES golf_course (id) ON DELETE CASCADE,
+      FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS review_helpful (
+      id         INTEGER PRIMARY KEY AUTOINCREMENT,
+      review_id  INTEGER NOT NULL,
+      user_id    INTEGER NOT NULL,
+      created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+      FOREIGN KEY (review_id) REFERENCES reviews (id) ON DELETE CASCADE,
+      FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+      UNIQUE(review_id, user_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_course ON reviews(course_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_user ON reviews(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_created ON reviews(created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_helpful_review ON review_helpful(review_id)",
+    "CREATE INDEX IF NOT EXISTS idx_helpful_user ON review_helpful(user_id)",
+    """CREATE TRIGGER IF NOT EXISTS update_reviews_timestamp
+       AFTER UPDATE ON reviews
+       BEGIN
+           UPDATE reviews SET updated_at = datetime('now') WHERE id = NEW.id;
+       END""",
+])
+
+
+# ---------------------------------------------------------------------------
+# 2. Composite indexes for the hot queries in modules/ and app.py
+#    (course_evaluation.course_id and review_helpful(review_id, user_id)
+#    are already covered by their UNIQUE constraints)
+# ---------------------------------------------------------------------------
+migration(2, 'performance indexes', [
+    # course_detail / booking price tiers
+    "CREATE INDEX IF NOT EXISTS idx_course_price_course_tier ON course_price(course_id, tier_type)",
+    # location dropdown: golf_course_i18n WHERE lang=?
+    "CREATE INDEX IF NOT EXISTS idx_i18n_lang_course ON golf_course_i18n(lang, course_id)",
+    # rating histogram + review pages ordered by created_at
+    "CREATE INDEX IF NOT EXISTS idx_reviews_course_rating ON reviews(course_id, rating)",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_course_created ON reviews(course_id, created_at)",
+    # "already reviewed?" check
+    "CREATE INDEX IF NOT EXISTS idx_reviews_user_course ON reviews(user_id, course_id)",
+    # can_review / verified booking lookups
+    "CREATE INDEX IF NOT EXISTS idx_bookings_user_course_status ON bookings(user_id, course_id, status)",
+    # admin dashboard + my-bookings ordered by created_at
+    "CREATE INDEX IF NOT EXISTS idx_bookings_created ON bookings(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_user_created ON bookings(user_id, created_at)",
+    # booking detail status history
+    """CREATE INDEX IF NOT EXISTS idx_booking_status_history_booking_created
+       ON booking_status_history(booking_id, created_at)""",
+    "ANALYZE",
+])
+
+
+# ---------------------------------------------------------------------------
+# 3. Materialized per-language course cards
+#    course_card_source (view) defines a card; course_card stores it and is
+#    kept current by triggers that refresh every card of one course. Later
+#    migrations only redefine the view and rebuild the table, the triggers
+#    stay the same.
+# ---------------------------------------------------------------------------
+CARD_LANGS = ('zh-CN', 'zh-TW', 'en', 'vi', 'ja', 'ko')
+
+
+def _refresh_course_cards(course_expr):
+    return f"""
+        DELETE FROM course_card WHERE course_id = {course_expr};
+        INSERT INTO course_card SELECT * FROM course_card_source
+        WHERE course_id = {course_expr};"""
+
+
+def _course_card_triggers():
+    # (table, event, column holding the course id, row alias)
+    sources = [
+        ('golf_course', 'INSERT', 'id', ['NEW']),
+        ('golf_course', 'UPDATE OF slug', 'id', ['NEW']),
+        ('golf_course', 'DELETE', 'id', ['OLD']),
+        ('golf_course_i18n', 'INSERT', 'course_id', ['NEW']),
+        ('golf_course_i18n', 'UPDATE', 'course_id', ['OLD', 'NEW']),
+        ('golf_course_i18n', 'DELETE', 'course_id', ['OLD']),
+        ('course_price', 'INSERT', 'course_id', ['NEW']),
+        ('course_price', 'UPDATE', 'course_id', ['OLD', 'NEW']),
+        ('course_price', 'DELETE', 'course_id', ['OLD']),
+        ('course_evaluation', 'INSERT', 'course_id', ['NEW']),
+        ('course_evaluation', 'UPDATE', 'course_id', ['OLD', 'NEW']),
+        ('course_evaluation', 'DELETE', 'course_id', ['OLD']),
+        ('reviews', 'INSERT', 'course_id', ['NEW']),
+        ('reviews', 'UPDATE OF rating, course_id', 'course_id', ['OLD', 'NEW']),
+        ('reviews', 'DELETE', 'course_id', ['OLD']),
+    ]
+    triggers = []
+    for table, event, column, rows in sources:
+        name = f"trg_card_{table}_{event.split()[0].lower()}"
+        body = ''.join(_refresh_course_cards(f"{row}.{column}") for row in rows)
+        triggers.append(
+            f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}\n"
+            f"BEGIN{body}\nEND"
+        )
+    return triggers
+
+
+migration(3, 'course_card table', [
+    "CREATE TABLE IF NOT EXISTS course_card_lang (lang TEXT PRIMARY KEY)",
+    "INSERT OR IGNORE INTO course_card_lang (lang) VALUES "
+    + ', '.join(f"('{lang}')" for lang in CARD_LANGS),
+    """CREATE VIEW IF NOT EXISTS course_card_source AS
+    SELECT l.lang, gc.id AS course_id, gc.slug,
+           COALESCE(t1.name, t2.name, t3.name, gc.slug) AS name,
+           CASE WHEN t1.id IS NOT NULL THEN t1.address
+                WHEN t2.id IS NOT NULL THEN t2.address
+                ELSE t3.address END AS address,
+           ROUND((ce.design_layout + ce.turf_maintenance + ce.facilities_services
+                  + ce.landscape_environment + ce.playability_access) / 5.0, 1) AS eval_score,
+           (SELECT COUNT(*) FROM reviews r WHERE r.course_id = gc.id) AS review_count,
+           (SELECT ROUND(AVG(r.rating), 2) FROM reviews r WHERE r.course_id = gc.id) AS review_avg,
+           (SELECT MIN(COALESCE(cp.discount_price_vnd, cp.rack_price_vnd))
+              FROM course_price cp WHERE cp.course_id = gc.id) AS min_price_vnd,
+           (SELECT MAX(100 - (cp.discount_price_vnd * 100.0 / cp.rack_price_vnd))
+              FROM course_price cp WHERE cp.course_id = gc.id) AS max_discount_pct
+    FROM golf_course gc
+    CROSS JOIN course_card_lang l
+    LEFT JOIN golf_course_i18n t1 ON t1.course_id = gc.id AND t1.lang = l.lang
+    LEFT JOIN golf_course_i18n t2 ON t2.course_id = gc.id AND t2.lang = 'en'
+    LEFT JOIN golf_course_i18n t3 ON t3.course_id = gc.id AND t3.lang = 'zh-CN'
+    LEFT JOIN course_evaluation ce ON ce.course_id = gc.id""",
+    """CREATE TABLE IF NOT EXISTS course_card (
+      lang             TEXT NOT NULL,
+      course_id        INTEGER NOT NULL,
+      slug             TEXT NOT NULL,
+      name             TEXT,
+      address          TEXT,
+      eval_score       REAL,
+      review_count     INTEGER,
+      review_avg       REAL,
+      min_price_vnd    REAL,
+      max_discount_pct REAL,
+      PRIMARY KEY (lang, course_id)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_course_card_course ON course_card(course_id)",
+    "CREATE INDEX IF NOT EXISTS idx_course_card_lang_score ON course_card(lang, eval_score)",
+    "CREATE INDEX IF NOT EXISTS idx_course_card_lang_discount ON course_card(lang, max_discount_pct)",
+    *_course_card_triggers(),
+    "DELETE FROM course_card",
+    "INSERT INTO course_card SELECT * FROM course_card_source",
+])
+
+
+# ---------------------------------------------------------------------------
+# 4. Numeric discount percent / effective price per price tier
+#    discount_note ("-10%") stays the admin input: writing it (or the rack
+#    price) sets discount_price_vnd through a trigger. The stored
+#    discount_price_vnd is the price actually charged, so
+#    effective_price_vnd reads it, and discount_pct comes from the note, or
+#    from the two prices when the note is not a clean "NN%". Existing
+#    discount prices are kept; only missing ones are filled from the note.
+# ---------------------------------------------------------------------------
+def _m4_note_pct(row=''):
+    return f"ABS(CAST(REPLACE(TRIM(COALESCE({row}discount_note, '')), '%', '') AS REAL))"
+
+
+def _m4_note_price(row=''):
+    return (f"CAST(ROUND({row}rack_price_vnd * (100 - {_m4_note_pct(row)}) / 100.0)"
+            " AS INTEGER)")
+
+
+migration(4, 'course_price discount columns', [
+    """ALTER TABLE course_price ADD COLUMN effective_price_vnd INTEGER
+       GENERATED ALWAYS AS (
+         CAST(ROUND(CASE WHEN discount_price_vnd > 0
+                          AND discount_price_vnd <= rack_price_vnd
+                         THEN discount_price_vnd
+                         ELSE rack_price_vnd END) AS INTEGER)
+       ) VIRTUAL""",
+    f"""ALTER TABLE course_price ADD COLUMN discount_pct REAL
+       GENERATED ALWAYS AS (
+         CASE WHEN {_m4_note_pct()} > 0 THEN {_m4_note_pct()}
+              WHEN rack_price_vnd > 0
+              THEN ROUND(100.0 * (rack_price_vnd - effective_price_vnd) / rack_price_vnd, 1)
+              ELSE 0 END
+       ) VIRTUAL""",
+    "CREATE INDEX IF NOT EXISTS idx_course_price_discount ON course_price(discount_pct, course_id)",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_course_price_discount_price
+    AFTER INSERT ON course_price
+    WHEN NEW.discount_price_vnd IS NULL
+    BEGIN
+        UPDATE course_price SET discount_price_vnd = {_m4_note_price('NEW.')}
+        WHERE id = NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_course_price_discount_price_update
+    AFTER UPDATE OF rack_price_vnd, discount_note ON course_price
+    WHEN NEW.rack_price_vnd IS NOT OLD.rack_price_vnd
+      OR NEW.discount_note IS NOT OLD.discount_note
+    BEGIN
+        UPDATE course_price SET discount_price_vnd = {_m4_note_price('NEW.')}
+        WHERE id = NEW.id;
+    END""",
+    f"""UPDATE course_price SET discount_price_vnd = {_m4_note_price()}
+       WHERE discount_price_vnd IS NULL""",
+    "DROP VIEW IF EXISTS course_card_source",
+    """CREATE VIEW course_card_source AS
+    SELECT l.lang, gc.id AS course_id, gc.slug,
+           COALESCE(t1.name, t2.name, t3.name, gc.slug) AS name,
+           CASE WHEN t1.id IS NOT NULL THEN t1.address
+                WHEN t2.id IS NOT NULL THEN t2.address
+                ELSE t3.address END AS address,
+           ROUND((ce.design_layout + ce.turf_maintenance + ce.facilities_services
+                  + ce.landscape_environment + ce.playability_access) / 5.0, 1) AS eval_score,
+           (SELECT COUNT(*) FROM reviews r WHERE r.course_id = gc.id) AS review_count,
+           (SELECT ROUND(AVG(r.rating), 2) FROM reviews r WHERE r.course_id = gc.id) AS review_avg,
+           (SELECT MIN(cp.effective_price_vnd)
+              FROM course_price cp WHERE cp.course_id = gc.id) AS min_price_vnd,
+           (SELECT MAX(cp.discount_pct)
+              FROM course_price cp WHERE cp.course_id = gc.id) AS max_discount_pct
+    FROM golf_course gc
+    CROSS JOIN course_card_lang l
+    LEFT JOIN golf_course_i18n t1 ON t1.course_id = gc.id AND t1.lang = l.lang
+    LEFT JOIN golf_course_i18n t2 ON t2.course_id = gc.id AND t2.lang = 'en'
+    LEFT JOIN golf_course_i18n t3 ON t3.course_id = gc.id AND t3.lang = 'zh-CN'
+    LEFT JOIN course_evaluation ce ON ce.course_id = gc.id""",
+    "DELETE FROM course_card",
+    "INSERT INTO course_card SELECT * FROM course_card_source",
+])
+
+
+# ---------------------------------------------------------------------------
+# 5. City extracted at write time
+#    golf_course_i18n.city is extract_city(address) and city_key its
+#    normalize_city() key (shared by 'Hà Nội' / 'Hanoi'). Changing an
+#    address resets city to NULL; modules.courses.refresh_cities() fills
+#    those rows (admin writes, data/rebuild_course_cards.py).
+#    The backfill below is a frozen copy of extract_city / normalize_city as
+#    of this migration, so later edits to modules.courses cannot change what
+#    migration 5 writes on an old database.
+# ---------------------------------------------------------------------------
+_M5_COUNTRY_LABELS = {'zh-CN': '越南', 'zh-TW': '越南'}
+
+
+def _m5_extract_city(addr, lang):
+    addr = addr.strip()
+    if ',' in addr:
+        parts = [p.strip() for p in addr.split(',')]
+        return parts[1] if len(parts) > 1 else parts[0]
+    if lang in ('zh-CN', 'zh-TW'):
+        country = _M5_COUNTRY_LABELS[lang]
+        tokens = re.findall(r'.+?(?:省|市|区|县)', addr)
+        if tokens:
+            city_tok = tokens[0]
+            if city_tok.startswith(country):
+                city_tok = city_tok[len(country):]
+            return city_tok
+        return addr
+    if lang in ('ja', 'ko'):
+        suffixes = ('市', '県') if lang == 'ja' else ('시', '군', '도')
+        tokens = addr.split()
+        for tok in tokens:
+            if tok.endswith(suffixes):
+                return tok
+        return tokens[-2] if len(tokens) >= 2 else tokens[-1]
+    return addr
+
+
+def _m5_normalize_city(city):
+    out = []
+    for ch in unicodedata.normalize('NFKD', (city or '').lower().replace('đ', 'd')):
+        if unicodedata.combining(ch) and out and out[-1] < '\u0250':
+            continue
+        out.append(ch)
+    return ''.join(ch for ch in unicodedata.normalize('NFC', ''.join(out)) if ch.isalnum())
+
+
+def _backfill_cities(conn):
+    updates = []
+    for row_id, row_lang, address in conn.execute(
+            "SELECT id, lang, address FROM golf_course_i18n").fetchall():
+        city = _m5_extract_city(address or '', row_lang)
+        updates.append((city, _m5_normalize_city(city), row_id))
+    conn.executemany("UPDATE golf_course_i18n SET city=?, city_key=? WHERE id=?", updates)
+
+
+migration(5, 'golf_course_i18n city columns', [
+    "ALTER TABLE golf_course_i18n ADD COLUMN city TEXT",
+    "ALTER TABLE golf_course_i18n ADD COLUMN city_key TEXT",
+    "CREATE INDEX IF NOT EXISTS idx_i18n_city_key ON golf_course_i18n(city_key, course_id)",
+    "CREATE INDEX IF NOT EXISTS idx_i18n_city_pending ON golf_course_i18n(id) WHERE city IS NULL",
+    """CREATE TRIGGER IF NOT EXISTS trg_i18n_address_city
+    AFTER UPDATE OF address ON golf_course_i18n
+    WHEN NEW.address IS NOT OLD.address
+    BEGIN
+        UPDATE golf_course_i18n SET city = NULL, city_key = NULL WHERE id = NEW.id;
+    END""",
+    _backfill_cities,
+    "DROP VIEW IF EXISTS course_card_source",
+    """CREATE VIEW course_card_source AS
+    SELECT l.lang, gc.id AS course_id, gc.slug,
+           COALESCE(t1.name, t2.name, t3.name, gc.slug) AS name,
+           CASE WHEN t1.id IS NOT NULL THEN t1.address
+                WHEN t2.id IS NOT NULL THEN t2.address
+                ELSE t3.address END AS address,
+           CASE WHEN t1.id IS NOT NULL THEN t1.city
+                WHEN t2.id IS NOT NULL THEN t2.city
+                ELSE t3.city END AS city,
+           CASE WHEN t1.id IS NOT NULL THEN t1.city_key
+                WHEN t2.id IS NOT NULL THEN t2.city_key
+                ELSE t3.city_key END AS city_key,
+           ROUND((ce.design_layout + ce.turf_maintenance + ce.facilities_services
+                  + ce.landscape_environment + ce.playability_access) / 5.0, 1) AS eval_score,
+           (SELECT COUNT(*) FROM reviews r WHERE r.course_id = gc.id) AS review_count,
+           (SELECT ROUND(AVG(r.rating), 2) FROM reviews r WHERE r.course_id = gc.id) AS review_avg,
+           (SELECT MIN(cp.effective_price_vnd)
+              FROM course_price cp WHERE cp.course_id = gc.id) AS min_price_vnd,
+           (SELECT MAX(cp.discount_pct)
+              FROM course_price cp WHERE cp.course_id = gc.id) AS max_discount_pct
+    FROM golf_course gc
+    CROSS JOIN course_card_lang l
+    LEFT JOIN golf_course_i18n t1 ON t1.course_id = gc.id AND t1.lang = l.lang
+    LEFT JOIN golf_course_i18n t2 ON t2.course_id = gc.id AND t2.lang = 'en'
+    LEFT JOIN golf_course_i18n t3 ON t3.course_id = gc.id AND t3.lang = 'zh-CN'
+    LEFT JOIN course_evaluation ce ON ce.course_id = gc.id""",
+    "DROP TABLE IF EXISTS course_card",
+    """CREATE TABLE course_card (
+      lang             TEXT NOT NULL,
+      course_id        INTEGER NOT NULL,
+      slug             TEXT NOT NULL,
+      name             TEXT,
+      address          TEXT,
+      city             TEXT,
+      city_key         TEXT,
+      eval_score       REAL,
+      review_count     INTEGER,
+      review_avg       REAL,
+      min_price_vnd    REAL,
+      max_discount_pct REAL,
+      PRIMARY KEY (lang, course_id)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_course_card_course ON course_card(course_id)",
+    "CREATE INDEX IF NOT EXISTS idx_course_card_lang_score ON course_card(lang, eval_score)",
+    "CREATE INDEX IF NOT EXISTS idx_course_card_lang_discount ON course_card(lang, max_discount_pct)",
+    "CREATE INDEX IF NOT EXISTS idx_course_card_lang_city ON course_card(lang, city)",
+    "INSERT INTO course_card SELECT * FROM course_card_source",
+])
+
+
+# ---------------------------------------------------------------------------
+# 6. Full-text course search (FTS5)
+#    External-content index over golf_course_i18n, all languages in one
+#    table. The trigram tokenizer matches substrings of 3+ characters, which
+#    works for CJK text without word segmentation.
+# ---------------------------------------------------------------------------
+_SEARCH_COLUMNS = 'name, address, designer_name, overview, content, lang, course_id'
+
+
+def _search_row(alias, columns=_SEARCH_COLUMNS):
+    return ', '.join(f'{alias}.{c.strip()}' for c in columns.split(','))
+
+
+migration(6, 'course_search FTS5 index', [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS course_search USING fts5(
+      name, address, designer_name, overview, content,
+      lang UNINDEXED, course_id UNINDEXED,
+      content='golf_course_i18n', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_search_i18n_insert
+    AFTER INSERT ON golf_course_i18n
+    BEGIN
+        INSERT INTO course_search (rowid, {_SEARCH_COLUMNS})
+        VALUES (NEW.id, {_search_row('NEW')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_search_i18n_delete
+    AFTER DELETE ON golf_course_i18n
+    BEGIN
+        INSERT INTO course_search (course_search, rowid, {_SEARCH_COLUMNS})
+        VALUES ('delete', OLD.id, {_search_row('OLD')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_search_i18n_update
+    AFTER UPDATE OF {_SEARCH_COLUMNS} ON golf_course_i18n
+    BEGIN
+        INSERT INTO course_search (course_search, rowid, {_SEARCH_COLUMNS})
+        VALUES ('delete', OLD.id, {_search_row('OLD')});
+        INSERT INTO course_search (rowid, {_SEARCH_COLUMNS})
+        VALUES (NEW.id, {_search_row('NEW')});
+    END""",
+    "INSERT INTO course_search (course_search) VALUES ('rebuild')",
+])
+
+
+# ---------------------------------------------------------------------------
+# 7. Sort indexes for the paged public course list
+#    One index per keyset sort mode of modules.courses.CARD_SORTS; the
+#    expressions must stay identical to the sort keys there.
+# ---------------------------------------------------------------------------
+migration(7, 'course_card sort indexes', [
+    """CREATE INDEX IF NOT EXISTS idx_course_card_sort_rating
+       ON course_card(lang, IFNULL(eval_score, 0), course_id)""",
+    """CREATE INDEX IF NOT EXISTS idx_course_card_sort_price
+       ON course_card(lang, IFNULL(min_price_vnd, 1e15), course_id)""",
+    """CREATE INDEX IF NOT EXISTS idx_course_card_sort_discount
+       ON course_card(lang, IFNULL(max_discount_pct, 0), course_id)""",
+    "CREATE INDEX IF NOT EXISTS idx_course_card_sort_name ON course_card(lang, name, course_id)",
+    "ANALYZE",
+])
+
+
+# ---------------------------------------------------------------------------
+# 8. R*Tree index on golf_course lat/lng (proximity search)
+#    One point box per course with coordinates; triggers keep it in sync.
+#    The R*Tree stores 32-bit floats, so queries read the exact lat/lng back
+#    from golf_course.
+# ---------------------------------------------------------------------------
+_GEO_INSERT = """
+        INSERT INTO course_geo (id, min_lat, max_lat, min_lng, max_lng)
+        SELECT NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng
+        WHERE NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL;"""
+
+
+migration(8, 'course_geo R*Tree index', [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS course_geo USING rtree(
+      id, min_lat, max_lat, min_lng, max_lng
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_geo_golf_course_insert
+    AFTER INSERT ON golf_course
+    BEGIN{_GEO_INSERT}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_geo_golf_course_update
+    AFTER UPDATE OF id, lat, lng ON golf_course
+    BEGIN
+        DELETE FROM course_geo WHERE id = OLD.id;{_GEO_INSERT}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_geo_golf_course_delete
+    AFTER DELETE ON golf_course
+    BEGIN
+        DELETE FROM course_geo WHERE id = OLD.id;
+    END""",
+    "DELETE FROM course_geo",
+    """INSERT INTO course_geo (id, min_lat, max_lat, min_lng, max_lng)
+       SELECT id, lat, lat, lng, lng FROM golf_course
+       WHERE lat IS NOT NULL AND lng IS NOT NULL""",
+])
+
+
+# ---------------------------------------------------------------------------
+# 9. Catalog version for the page cache (modules/cache.py)
+#    Single row, bumped by every admin write.
+# ---------------------------------------------------------------------------
+migration(9, 'catalog_version', [
+    """CREATE TABLE IF NOT EXISTS catalog_version (
+      id      INTEGER PRIMARY KEY CHECK (id = 1),
+      version INTEGER NOT NULL
+    )""",
+    "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)",
+])
+
+
+# ---------------------------------------------------------------------------
+# 10. Last-modified stamps for conditional GET (modules/cache.py)
+#    golf_course.updated_at becomes the last change of anything shown on
+#    the course page: triggers stamp it from golf_course itself and from
+#    its translations, prices, evaluation and reviews. catalog_version
+#    gets the time of its last bump; fx_rate writes bump it too.
+# ---------------------------------------------------------------------------
+_NOW_MS = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def _course_touch_triggers():
+    triggers = [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_touch_golf_course_update
+        AFTER UPDATE ON golf_course
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE golf_course SET updated_at = {_NOW_MS} WHERE id = NEW.id;
+        END""",
+    ]
+    for table in ('golf_course_i18n', 'course_price', 'course_evaluation', 'reviews'):
+        triggers += _touch_course_triggers(table)
+    return triggers
+
+
+def _touch_course_triggers(table):
+    """Stamp golf_course.updated_at on every write to a per-course table."""
+    triggers = []
+    for event, rows in (('INSERT', ['NEW']), ('UPDATE', ['OLD', 'NEW']),
+                        ('DELETE', ['OLD'])):
+        ids = ', '.join(f"{row}.course_id" for row in rows)
+        triggers.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_touch_{table}_{event.lower()}"
+            f" AFTER {event} ON {table}\n"
+            f"BEGIN\n    UPDATE golf_course SET updated_at = {_NOW_MS}"
+            f" WHERE id IN ({ids});\nEND"
+        )
+    return triggers
+
+
+def _catalog_bump_triggers():
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_catalog_fx_rate_{event.lower()}
+        AFTER {event} ON fx_rate
+        BEGIN
+            UPDATE catalog_version
+            SET version = version + 1, updated_at = {_NOW_MS} WHERE id = 1;
+        END"""
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+migration(10, 'last-modified stamps', [
+    "ALTER TABLE catalog_version ADD COLUMN updated_at TEXT",
+    f"UPDATE catalog_version SET updated_at = {_NOW_MS}",
+    "CREATE INDEX IF NOT EXISTS idx_golf_course_updated ON golf_course(updated_at)",
+    *_course_touch_triggers(),
+    *_catalog_bump_triggers(),
+])
+
+
+# ---------------------------------------------------------------------------
+# 11. Per-course review statistics
+#    course_review_stats holds count / sum / star histogram / helpful total
+#    / last review per course, updated by triggers on reviews in the same
+#    transaction as the review write. course_review_stats_source (view)
+#    computes the same rows from reviews for rebuilds and consistency checks
+#    (data/rebuild_review_stats.py).
+# ---------------------------------------------------------------------------
+def _review_stats_apply(row, sign):
+    """Add (+) or remove (-) one review row to its course's stats."""
+    stars = ',\n            '.join(
+        f"star_{n} = star_{n} {sign} ({row}.rating = {n})" for n in range(1, 6)
+    )
+    if sign == '+':
+        last = f"MAX(COALESCE(last_review_at, ''), {row}.created_at)"
+    else:
+        last = (f"(SELECT MAX(created_at) FROM reviews"
+                f" WHERE course_id = {row}.course_id)")
+    # A course has a stats row exactly while it has reviews
+    if sign == '+':
+        before = (f"\n        INSERT OR IGNORE INTO course_review_stats (course_id)"
+                  f" VALUES ({row}.course_id);")
+        after = ''
+    else:
+        before = ''
+        after = (f"\n        DELETE FROM course_review_stats"
+                 f" WHERE course_id = {row}.course_id AND review_count = 0;")
+    return f"""{before}
+        UPDATE course_review_stats SET
+            review_count = review_count {sign} 1,
+            rating_sum = rating_sum {sign} {row}.rating,
+            {stars},
+            helpful_total = helpful_total {sign} COALESCE({row}.helpful_count, 0),
+            last_review_at = {last}
+        WHERE course_id = {row}.course_id;{after}"""
+
+
+migration(11, 'course_review_stats', [
+    """CREATE TABLE IF NOT EXISTS course_review_stats (
+      course_id      INTEGER PRIMARY KEY,
+      review_count   INTEGER NOT NULL DEFAULT 0,
+      rating_sum     INTEGER NOT NULL DEFAULT 0,
+      star_1         INTEGER NOT NULL DEFAULT 0,
+      star_2         INTEGER NOT NULL DEFAULT 0,
+      star_3         INTEGER NOT NULL DEFAULT 0,
+      star_4         INTEGER NOT NULL DEFAULT 0,
+      star_5         INTEGER NOT NULL DEFAULT 0,
+      helpful_total  INTEGER NOT NULL DEFAULT 0,
+      last_review_at TEXT
+    )""",
+    """CREATE VIEW IF NOT EXISTS course_review_stats_source AS
+    SELECT course_id,
+           COUNT(*) AS review_count,
+           SUM(rating) AS rating_sum,
+           SUM(rating = 1) AS star_1,
+           SUM(rating = 2) AS star_2,
+           SUM(rating = 3) AS star_3,
+           SUM(rating = 4) AS star_4,
+           SUM(rating = 5) AS star_5,
+           SUM(COALESCE(helpful_count, 0)) AS helpful_total,
+           MAX(created_at) AS last_review_at
+    FROM reviews
+    GROUP BY course_id""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_review_stats_insert
+    AFTER INSERT ON reviews
+    BEGIN{_review_stats_apply('NEW', '+')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_review_stats_delete
+    AFTER DELETE ON reviews
+    BEGIN{_review_stats_apply('OLD', '-')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_review_stats_update
+    AFTER UPDATE OF course_id, rating, helpful_count, created_at ON reviews
+    BEGIN{_review_stats_apply('OLD', '-')}{_review_stats_apply('NEW', '+')}
+    END""",
+    "DELETE FROM course_review_stats",
+    "INSERT INTO course_review_stats SELECT * FROM course_review_stats_source",
+])
+
+
+# ---------------------------------------------------------------------------
+# 12. reviews.verified_booking
+#    1 when the reviewer has a confirmed/completed booking at the course.
+#    Set by the INSERT in add_review, kept current by triggers when a
+#    booking enters or leaves those statuses. The reviews timestamp trigger
+#    now lists its columns so that flag changes are not shown as edits.
+# ---------------------------------------------------------------------------
+VERIFIED_STATUSES = "('confirmed', 'completed')"
+
+
+def _verified_refresh(row):
+    return f"""
+        UPDATE reviews SET verified_booking = EXISTS (
+            SELECT 1 FROM bookings
+            WHERE user_id = {row}.user_id AND course_id = {row}.course_id
+              AND status IN {VERIFIED_STATUSES}
+        )
+        WHERE user_id = {row}.user_id AND course_id = {row}.course_id;"""
+
+
+migration(12, 'reviews verified_booking', [
+    "ALTER TABLE reviews ADD COLUMN verified_booking INTEGER NOT NULL DEFAULT 0",
+    "DROP TRIGGER IF EXISTS update_reviews_timestamp",
+    """CREATE TRIGGER update_reviews_timestamp
+       AFTER UPDATE OF id, course_id, user_id, rating, comment, images,
+                       helpful_count, created_at ON reviews
+       BEGIN
+           UPDATE reviews SET updated_at = datetime('now') WHERE id = NEW.id;
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_verified_bookings_insert
+    AFTER INSERT ON bookings
+    WHEN NEW.status IN {VERIFIED_STATUSES}
+    BEGIN{_verified_refresh('NEW')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_verified_bookings_update
+    AFTER UPDATE OF status, user_id, course_id ON bookings
+    WHEN (OLD.status IN {VERIFIED_STATUSES}) OR (NEW.status IN {VERIFIED_STATUSES})
+    BEGIN{_verified_refresh('OLD')}{_verified_refresh('NEW')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_verified_bookings_delete
+    AFTER DELETE ON bookings
+    WHEN OLD.status IN {VERIFIED_STATUSES}
+    BEGIN{_verified_refresh('OLD')}
+    END""",
+    f"""UPDATE reviews SET verified_booking = EXISTS (
+        SELECT 1 FROM bookings b
+        WHERE b.user_id = reviews.user_id AND b.course_id = reviews.course_id
+          AND b.status IN {VERIFIED_STATUSES}
+    )""",
+])
+
+
+# ---------------------------------------------------------------------------
+# 13. Index for the "most helpful" review sort
+#    Keyset pages of /<slug>/reviews.json walk (course_id, key) indexes:
+#    newest uses idx_reviews_course_created, highest/lowest
+#    idx_reviews_course_rating. helpful_count must not be NULL for the
+#    cursor, so old NULLs become 0 (the column default).
+# ---------------------------------------------------------------------------
+migration(13, 'reviews helpful sort index', [
+    "UPDATE reviews SET helpful_count = 0 WHERE helpful_count IS NULL",
+    "CREATE INDEX IF NOT EXISTS idx_reviews_course_helpful ON reviews(course_id, helpful_count)",
+])
+
+
+# ---------------------------------------------------------------------------
+# 14. Gallery manifest
+#    One row per image in static/media/<slug>/gallery: size, pixel
+#    dimensions and mtime, so course pages never list or open the folder.
+#    Kept in sync by modules/gallery.py (startup, admin course saves,
+#    data/build_gallery_manifest.py); writes stamp the course's updated_at.
+# ---------------------------------------------------------------------------
+migration(14, 'course_gallery manifest', [
+    """CREATE TABLE IF NOT EXISTS course_gallery (
+      course_id  INTEGER NOT NULL,
+      file_name  TEXT NOT NULL,
+      size_bytes INTEGER NOT NULL,
+      width      INTEGER,
+      height     INTEGER,
+      mtime_ns   INTEGER NOT NULL,
+      PRIMARY KEY (course_id, file_name),
+      FOREIGN KEY(course_id) REFERENCES golf_course(id) ON DELETE CASCADE
+    ) WITHOUT ROWID""",
+    *_touch_course_triggers('course_gallery'),
+])
+
+
+# ---------------------------------------------------------------------------
+# 15. Latest FX rate per currency as of a date (modules/fx.py): one
+#    descending index probe per currency instead of reading the table
+# ---------------------------------------------------------------------------
+migration(15, 'fx_rate currency/date index', [
+    "CREATE INDEX IF NOT EXISTS idx_fx_rate_currency_date ON fx_rate(currency, rate_date DESC)",
+])
+
+
+# ---------------------------------------------------------------------------
+# 16. Tee sheet (modules/teesheet.py)
+#    tee_sheet_template: tee times of a course (interval, first and last
+#    tee, players per slot); courses without a row use the defaults.
+#    tee_sheet_blackout: closed date ranges, whole days or a time window.
+#    tee_slot_inventory: capacity and players booked per (course, date,
+#    tee time), opened a day at a time. Template writes stamp the
+#    course's updated_at since the course page lists its tee times.
+# ---------------------------------------------------------------------------
+migration(16, 'tee sheet inventory', [
+    """CREATE TABLE IF NOT EXISTS tee_sheet_template (
+      course_id        INTEGER PRIMARY KEY,
+      interval_min     INTEGER NOT NULL DEFAULT 30 CHECK (interval_min BETWEEN 5 AND 120),
+      first_tee        TEXT NOT NULL DEFAULT '05:30',
+      last_tee         TEXT NOT NULL DEFAULT '18:00',
+      players_per_slot INTEGER NOT NULL DEFAULT 4 CHECK (players_per_slot > 0),
+      updated_at       TEXT DEFAULT (datetime('now')),
+      CHECK (last_tee >= first_tee),
+      FOREIGN KEY (course_id) REFERENCES golf_course(id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS tee_sheet_blackout (
+      id         INTEGER PRIMARY KEY AUTOINCREMENT,
+      course_id  INTEGER NOT NULL,
+      start_date TEXT NOT NULL,
+      end_date   TEXT NOT NULL,
+      start_time TEXT,
+      end_time   TEXT,
+      reason     TEXT,
+      CHECK (end_date >= start_date),
+      FOREIGN KEY (course_id) REFERENCES golf_course(id) ON DELETE CASCADE
+    )""",
+    """CREATE INDEX IF NOT EXISTS idx_tee_sheet_blackout_course
+       ON tee_sheet_blackout(course_id, end_date)""",
+    """CREATE TABLE IF NOT EXISTS tee_slot_inventory (
+      course_id INTEGER NOT NULL,
+      play_date TEXT NOT NULL,
+      tee_time  TEXT NOT NULL,
+      capacity  INTEGER NOT NULL,
+      booked    INTEGER NOT NULL DEFAULT 0 CHECK (booked >= 0),
+      PRIMARY KEY (course_id, play_date, tee_time),
+      FOREIGN KEY (course_id) REFERENCES golf_course(id) ON DELETE CASCADE
+    ) WITHOUT ROWID""",
+    # players already booked per slot when a day is opened
+    "CREATE INDEX IF NOT EXISTS idx_bookings_course_date ON bookings(course_id, play_date)",
+    *_touch_course_triggers('tee_sheet_template'),
+])
+
+
+# ---------------------------------------------------------------------------
+# 17. Tee sheet version per course
+#    Bumped by every booking write that can change a course's availability
+#    and by blackout writes, so the cached month calendars of every worker
+#    (teesheet.month_availability) notice without a shared cache.
+# ---------------------------------------------------------------------------
+def _bump_tee_sheet(course_id):
+    return (f"INSERT INTO tee_sheet_version (course_id, version) VALUES ({course_id}, 1)"
+            f" ON CONFLICT(course_id) DO UPDATE SET version = version + 1;")
+
+
+def _tee_sheet_version_triggers():
+    triggers = []
+    for table, update_of in (('bookings', ' OF course_id, play_date, play_time, players, status'),
+                             ('tee_sheet_blackout', '')):
+        for event, rows in (('INSERT', ['NEW']), (f'UPDATE{update_of}', ['OLD', 'NEW']),
+                            ('DELETE', ['OLD'])):
+            body = '\n    '.join(_bump_tee_sheet(f"{row}.course_id") for row in rows)
+            triggers.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_tee_sheet_{table}_{event.split()[0].lower()}"
+                f" AFTER {event} ON {table}\nBEGIN\n    {body}\nEND"
+            )
+    return triggers
+
+
+migration(17, 'tee sheet version', [
+    """CREATE TABLE IF NOT EXISTS tee_sheet_version (
+      course_id INTEGER PRIMARY KEY,
+      version   INTEGER NOT NULL DEFAULT 0
+    )""",
+    *_tee_sheet_version_triggers(),
+])
+
+
+# ---------------------------------------------------------------------------
+# 18. Course lookup index (name, address, designer)
+#    Trigram index of the short golf_course_i18n fields without positions
+#    (detail=none): a compact rowid list per trigram, so a course name, city
+#    or designer lookup never reads the large doclists of course_search.
+#    Queries AND a few trigrams of the terms and check the substrings on the
+#    candidates (modules.courses.search_courses).
+# ---------------------------------------------------------------------------
+_LOOKUP_COLUMNS = 'name, address, designer_name'
+
+
+migration(18, 'course_lookup FTS5 index', [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS course_lookup USING fts5(
+      {_LOOKUP_COLUMNS},
+      content='golf_course_i18n', content_rowid='id', tokenize='trigram', detail='none'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_lookup_i18n_insert
+    AFTER INSERT ON golf_course_i18n
+    BEGIN
+        INSERT INTO course_lookup (rowid, {_LOOKUP_COLUMNS})
+        VALUES (NEW.id, {_search_row('NEW', _LOOKUP_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_lookup_i18n_delete
+    AFTER DELETE ON golf_course_i18n
+    BEGIN
+        INSERT INTO course_lookup (course_lookup, rowid, {_LOOKUP_COLUMNS})
+        VALUES ('delete', OLD.id, {_search_row('OLD', _LOOKUP_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_lookup_i18n_update
+    AFTER UPDATE OF id, {_LOOKUP_COLUMNS} ON golf_course_i18n
+    BEGIN
+        INSERT INTO course_lookup (course_lookup, rowid, {_LOOKUP_COLUMNS})
+        VALUES ('delete', OLD.id, {_search_row('OLD', _LOOKUP_COLUMNS)});
+        INSERT INTO course_lookup (rowid, {_LOOKUP_COLUMNS})
+        VALUES (NEW.id, {_search_row('NEW', _LOOKUP_COLUMNS)});
+    END""",
+    "INSERT INTO course_lookup (course_lookup) VALUES ('rebuild')",
+])
+
+
+def ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    """)
+
+
+def current_version(conn):
+    ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def pending_migrations(conn):
+    version = current_version(conn)
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m[0]) if m[0] > version]
+
+
+def migrate(conn, target=None, log=None):
+    """
+    Apply all pending migrations up to `target` (default: latest).
+    Returns the list of (version, name) applied by this call.
+    """
+    applied = []
+    isolation = conn.isolation_level
+    conn.isolation_level = None          # explicit transaction control
+    try:
+        ensure_version_table(conn)
+        for version, name, steps in sorted(MIGRATIONS, key=lambda m: m[0]):
+            if target is not None and version > target:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another worker may have applied it while we waited for the lock
+                done = conn.execute(
+                    "SELECT 1 FROM schema_version WHERE version=?", (version,)
+                ).fetchone()
+                if done:
+                    conn.execute("ROLLBACK")
+                    continue
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append((version, name))
+            if log:
+                log(f"Applied migration {version:03d}: {name}")
+    finally:
+        conn.isolation_level = isolation
+    return applied
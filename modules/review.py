@@ -1,8 +1,8 @@
 # modules/review.py
 
-from flask import Blueprint, request, redirect, url_for, flash, jsonify, session, g, current_app
+from flask import Blueprint, request, redirect, url_for, flash, jsonify, session, current_app
 from flask_babel import _
-from modules.courses import get_db, close_db
+from modules.db import get_db
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import os
@@ -18,14 +18,6 @@ MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@review_bp.before_app_request
-def before():
-    get_db()
-
-@review_bp.teardown_app_request
-def after(exc):
-    close_db()
-
 @review_bp.route('/add', methods=['POST'])
 def add_review(lang):
     """Thêm hoặc cập nhật review"""
@@ -37,7 +29,7 @@ def add_review(lang):
         flash(_('Administrators cannot write reviews'), 'error')
         return redirect(url_for('index', lang=lang))
     
-    db = g.db
+    db = get_db()
     course_id = request.form.get('course_id')
     rating = request.form.get('rating')
     comment = request.form.get('comment')
@@ -112,10 +104,12 @@ def add_review(lang):
         else:
             # Create new review
             db.execute("""
-                INSERT INTO reviews (course_id, user_id, rating, comment, images, created_at)
-                VALUES (?, ?, ?, ?, ?, datetime('now'))
+                INSERT INTO reviews (course_id, user_id, rating, comment, images,
+                                     verified_booking, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
             """, (course_id, session['user_id'], int(rating), comment, 
-                  json.dumps(images) if images else None))
+                  json.dumps(images) if images else None,
+                  1 if has_booking else 0))
         
         db.commit()
         flash(_('Review submitted successfully!'), 'success')
@@ -132,7 +126,7 @@ def add_review(lang):
 @review_bp.route('/api/<int:review_id>')
 def get_review(lang, review_id):
     """API để lấy thông tin review"""
-    db = g.db
+    db = get_db()
     review = db.execute(
         "SELECT * FROM reviews WHERE id = ?", (review_id,)
     ).fetchone()
@@ -153,7 +147,7 @@ def delete_review(lang, review_id):
     if not session.get('user_id'):
         return jsonify({'success': False, 'message': 'Login required'}), 401
     
-    db = g.db
+    db = get_db()
     review = db.execute(
         "SELECT * FROM reviews WHERE id = ? AND user_id = ?",
         (review_id, session['user_id'])
@@ -193,7 +187,7 @@ def toggle_helpful(lang, review_id):
     if not session.get('user_id'):
         return jsonify({'success': False, 'message': 'Login required'}), 401
     
-    db = g.db
+    db = get_db()
     
     # Kiểm tra review tồn tại
     review = db.execute(
@@ -253,7 +247,7 @@ def toggle_helpful(lang, review_id):
 
 def get_course_slug(course_id):
     """Helper function để lấy slug của course"""
-    db = g.db
+    db = get_db()
     course = db.execute(
         "SELECT slug FROM golf_course WHERE id = ?", (course_id,)
     ).fetchone()
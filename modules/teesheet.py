@@ -0,0 +1,328 @@
+# modules/teesheet.py
+
+"""
+Tee sheet: the bookable tee times of each course and their capacity.
+
+A course's tee times come from its tee_sheet_template row (migration 16),
+or DEFAULT_TEMPLATE without one; tee_sheet_blackout closes whole days or
+a time window over a date range.
+
+tee_slot_inventory has one row per (course, date, tee time) with its
+capacity and the players booked. A day is opened (its rows inserted,
+counting the bookings already made) the first time someone books on it;
+until then its availability is computed from the template without
+writing. reserve_slot() books with a single conditional UPDATE inside a
+BEGIN IMMEDIATE transaction (reservation()), so concurrent workers can
+never both take the last places of a slot.
+
+month_availability() summarises a whole month per day (places left,
+cheapest tier, twilight) from one grouped query over bookings and the
+template, computed on a days x tee times NumPy grid. Results are cached
+per worker by (course, month) and checked against tee_sheet_version
+(migration 17), which booking and blackout writes bump.
+"""
+
+import calendar
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_TEMPLATE = {
+    'interval_min': 30,
+    'first_tee': '05:30',
+    'last_tee': '18:00',
+    'players_per_slot': 4,
+}
+# Tee times from TWILIGHT_FROM are sold at the twilight tier
+TWILIGHT_FROM = '14:00'
+# Bookings must be made at least this long before the tee time
+MIN_LEAD_MINUTES = 30
+
+
+class SlotUnavailable(RuntimeError):
+    """Raised when a tee time is full, closed or not on the tee sheet."""
+
+
+@lru_cache(maxsize=64)
+def tee_times(interval_min, first_tee, last_tee):
+    """('05:30', '06:00', ...) every interval_min minutes, last_tee included."""
+    t = datetime.strptime(first_tee, '%H:%M')
+    end = datetime.strptime(last_tee, '%H:%M')
+    times = []
+    while t <= end:
+        times.append(t.strftime('%H:%M'))
+        t += timedelta(minutes=interval_min)
+    return tuple(times)
+
+
+def load_template(db, course_id):
+    row = db.execute("""
+        SELECT interval_min, first_tee, last_tee, players_per_slot
+        FROM tee_sheet_template WHERE course_id = ?
+    """, (course_id,)).fetchone()
+    return dict(row) if row else dict(DEFAULT_TEMPLATE)
+
+
+def template_times(template):
+    return tee_times(template['interval_min'], template['first_tee'], template['last_tee'])
+
+
+def day_slots(db, course_id, play_date):
+    """
+    [(tee_time, capacity, booked)] of a day from the template, blackouts
+    (capacity 0) and the bookings made so far. Booked times that are not
+    on the template any more are kept with capacity 0.
+    """
+    template = load_template(db, course_id)
+    blackouts = db.execute("""
+        SELECT start_time, end_time FROM tee_sheet_blackout
+        WHERE course_id = ? AND end_date >= ? AND start_date <= ?
+    """, (course_id, play_date, play_date)).fetchall()
+    booked = {
+        r['play_time']: r['players'] for r in db.execute("""
+            SELECT play_time, SUM(players) AS players FROM bookings
+            WHERE course_id = ? AND play_date = ? AND status != 'cancelled'
+            GROUP BY play_time
+        """, (course_id, play_date))
+    }
+
+    def closed(t):
+        return any((b['start_time'] or '00:00') <= t < (b['end_time'] or '24:00')
+                   for b in blackouts)
+
+    slots = {t: 0 if closed(t) else template['players_per_slot']
+             for t in template_times(template)}
+    for t in booked:
+        slots.setdefault(t, 0)
+    return [(t, slots[t], booked.get(t, 0)) for t in sorted(slots)]
+
+
+def _insert_day(db, course_id, play_date):
+    db.executemany("""
+        INSERT INTO tee_slot_inventory (course_id, play_date, tee_time, capacity, booked)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(course_id, play_date, *slot) for slot in day_slots(db, course_id, play_date)])
+
+
+def open_day(db, course_id, play_date):
+    """
+    Insert the inventory rows of a day unless it is open already; runs in
+    the caller's reservation(). Returns True if the day was opened.
+    """
+    if db.execute("""
+        SELECT 1 FROM tee_slot_inventory WHERE course_id = ? AND play_date = ? LIMIT 1
+    """, (course_id, play_date)).fetchone():
+        return False
+    _insert_day(db, course_id, play_date)
+    return True
+
+
+def refresh_day(db, course_id, play_date):
+    """
+    Rebuild an open day from the current template, blackouts and bookings
+    (after a template change, or to repair drift). Returns the number of
+    inventory rows whose capacity or booked count changed.
+    """
+    old = {r['tee_time']: (r['capacity'], r['booked']) for r in db.execute("""
+        SELECT tee_time, capacity, booked FROM tee_slot_inventory
+        WHERE course_id = ? AND play_date = ?
+    """, (course_id, play_date))}
+    if not old:
+        return 0
+    new = {t: (capacity, booked) for t, capacity, booked in day_slots(db, course_id, play_date)}
+    db.execute("DELETE FROM tee_slot_inventory WHERE course_id = ? AND play_date = ?",
+               (course_id, play_date))
+    _insert_day(db, course_id, play_date)
+    return sum(old.get(t) != new.get(t) for t in old.keys() | new.keys())
+
+
+def load_availability(db, course_id, play_date):
+    """
+    [{'time', 'capacity', 'remaining'}] of the open tee times of a day:
+    one range read on the inventory primary key once the day is open.
+    """
+    rows = db.execute("""
+        SELECT tee_time, capacity, booked FROM tee_slot_inventory
+        WHERE course_id = ? AND play_date = ?
+        ORDER BY tee_time
+    """, (course_id, play_date)).fetchall()
+    slots = [tuple(r) for r in rows] or day_slots(db, course_id, play_date)
+    return [{'time': t, 'capacity': capacity, 'remaining': max(capacity - booked, 0)}
+            for t, capacity, booked in slots if capacity > 0]
+
+
+@contextmanager
+def reservation(db):
+    """
+    BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error). The write lock is
+    taken up front, so opening a day and the capacity check never race
+    another worker.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    db.commit()
+
+
+def reserve_slot(db, course_id, play_date, tee_time, players):
+    """
+    Take `players` places of a tee time; raises SlotUnavailable when they
+    are not free. Runs in the caller's reservation().
+    """
+    if players < 1:
+        raise SlotUnavailable(f"invalid number of players: {players}")
+    open_day(db, course_id, play_date)
+    cur = db.execute("""
+        UPDATE tee_slot_inventory SET booked = booked + ?
+        WHERE course_id = ? AND play_date = ? AND tee_time = ?
+          AND booked + ? <= capacity
+    """, (players, course_id, play_date, tee_time, players))
+    if cur.rowcount != 1:
+        raise SlotUnavailable(f"{tee_time} on {play_date} is not available "
+                              f"for {players} player(s)")
+
+
+def release_slot(db, course_id, play_date, tee_time, players):
+    """Give back the places of a cancelled booking (no-op if the day is not open)."""
+    db.execute("""
+        UPDATE tee_slot_inventory SET booked = MAX(booked - ?, 0)
+        WHERE course_id = ? AND play_date = ? AND tee_time = ?
+    """, (players, course_id, play_date, tee_time))
+
+
+def slot_tier(play_date, tee_time):
+    """Price tier of a tee time: twilight, else weekend on Sat/Sun, else weekday."""
+    if tee_time >= TWILIGHT_FROM:
+        return 'twilight'
+    return 'weekend' if date.fromisoformat(play_date).weekday() >= 5 else 'weekday'
+
+
+def _minutes(hhmm):
+    h, m = hhmm.split(':')
+    return int(h) * 60 + int(m)
+
+
+def compute_month(db, course_id, month, now=None):
+    """
+    Per-day summary of `month` ('YYYY-MM'): [{'date', 'remaining',
+    'open_slots', 'twilight', 'cheapest_vnd', 'cheapest_tier'}]. Tee
+    times closer than MIN_LEAD_MINUTES to `now` count as gone.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required for the month availability calendar")
+    now = now or datetime.now()
+    first = date.fromisoformat(month + '-01')
+    ndays = calendar.monthrange(first.year, first.month)[1]
+    last = first + timedelta(days=ndays - 1)
+
+    template = load_template(db, course_id)
+    times = template_times(template)
+    column = {t: j for j, t in enumerate(times)}
+    minutes = np.array([_minutes(t) for t in times])
+    ordinals = np.arange(first.toordinal(), last.toordinal() + 1)
+
+    # Players booked per (day, tee time): one grouped query, scattered into the grid
+    booked = np.zeros((ndays, len(times)), dtype=np.int64)
+    rows = [r for r in db.execute("""
+        SELECT play_date, play_time, SUM(players) AS players FROM bookings
+        WHERE course_id = ? AND play_date BETWEEN ? AND ? AND status != 'cancelled'
+        GROUP BY play_date, play_time
+    """, (course_id, first.isoformat(), last.isoformat())) if r['play_time'] in column]
+    if rows:
+        np.add.at(booked,
+                  ([date.fromisoformat(r['play_date']).toordinal() - ordinals[0] for r in rows],
+                   [column[r['play_time']] for r in rows]),
+                  [r['players'] for r in rows])
+
+    # Blackouts close a date range x time window of the grid
+    closed = np.zeros_like(booked, dtype=bool)
+    for b in db.execute("""
+        SELECT start_date, end_date, start_time, end_time FROM tee_sheet_blackout
+        WHERE course_id = ? AND end_date >= ? AND start_date <= ?
+    """, (course_id, first.isoformat(), last.isoformat())):
+        days = ((ordinals >= date.fromisoformat(b['start_date']).toordinal())
+                & (ordinals <= date.fromisoformat(b['end_date']).toordinal()))
+        window = ((minutes >= _minutes(b['start_time'] or '00:00'))
+                  & (minutes < _minutes(b['end_time'] or '24:00')))
+        closed |= days[:, None] & window[None, :]
+
+    remaining = np.clip(np.where(closed, 0, template['players_per_slot']) - booked, 0, None)
+    cutoff = now.date().toordinal() * 1440 + now.hour * 60 + now.minute + MIN_LEAD_MINUTES
+    remaining[ordinals[:, None] * 1440 + minutes[None, :] < cutoff] = 0
+
+    # Cheapest tier still on sale each day
+    prices = {
+        r['tier_type'].lower(): r['effective_price_vnd']
+        for r in db.execute(
+            "SELECT tier_type, effective_price_vnd FROM course_price WHERE course_id = ?",
+            (course_id,))
+        if r['effective_price_vnd']
+    }
+    inf = float('inf')
+    open_slot = remaining > 0
+    twilight_cols = minutes >= _minutes(TWILIGHT_FROM)
+    twilight = open_slot[:, twilight_cols].any(axis=1)
+    daytime = open_slot[:, ~twilight_cols].any(axis=1)
+    weekend = (ordinals - 1) % 7 >= 5            # date.toordinal(): 1 is a Monday
+    day_price = np.where(weekend, prices.get('weekend', inf), prices.get('weekday', inf))
+    day_price = np.where(daytime, day_price, inf)
+    twilight_price = np.where(twilight, prices.get('twilight', inf), inf)
+    cheapest = np.minimum(day_price, twilight_price)
+    tiers = np.where(twilight_price < day_price, 'twilight',
+                     np.where(weekend, 'weekend', 'weekday'))
+
+    per_day = remaining.sum(axis=1)
+    slots = open_slot.sum(axis=1)
+    return [
+        {
+            'date': date.fromordinal(int(ordinals[i])).isoformat(),
+            'remaining': int(per_day[i]),
+            'open_slots': int(slots[i]),
+            'twilight': bool(twilight[i]),
+            'cheapest_vnd': None if cheapest[i] == inf else float(cheapest[i]),
+            'cheapest_tier': None if cheapest[i] == inf else str(tiers[i]),
+        }
+        for i in range(ndays)
+    ]
+
+
+# Month calendars per (course, month), recomputed when the course (prices,
+# template) or its tee sheet version (bookings, blackouts) changes, or at
+# most every CALENDAR_CACHE_TTL seconds as tee times fall inside the lead time
+CALENDAR_CACHE_TTL = 60
+CALENDAR_CACHE_MAX = 256
+_calendar_cache = {}
+_calendar_lock = threading.Lock()
+
+
+def month_availability(db, course_id, month):
+    """Cached compute_month(); None if the course does not exist."""
+    row = db.execute("""
+        SELECT gc.updated_at, IFNULL(v.version, 0) AS version
+        FROM golf_course gc LEFT JOIN tee_sheet_version v ON v.course_id = gc.id
+        WHERE gc.id = ?
+    """, (course_id,)).fetchone()
+    if not row:
+        return None
+    stamp = (row['updated_at'], row['version'])
+    now = time.monotonic()
+    hit = _calendar_cache.get((course_id, month))
+    if hit and hit[0] == stamp and now - hit[1] < CALENDAR_CACHE_TTL:
+        return hit[2]
+
+    days = compute_month(db, course_id, month)
+    with _calendar_lock:
+        if len(_calendar_cache) >= CALENDAR_CACHE_MAX:
+            _calendar_cache.clear()
+        _calendar_cache[(course_id, month)] = (stamp, now, days)
+    return days